@@ -1,22 +1,64 @@
 import os
-import json
-import re
 import random
-from pathlib import Path
+import time
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
 import streamlit as st
 
 # ✅ page_config는 st import 직후, 딱 1번
 st.set_page_config(page_title="성향 프로필 + 연애 상담 챗봇", page_icon="💬", layout="wide")
-from streamlit.errors import StreamlitSecretNotFoundError
+_RERUN_T0 = time.perf_counter()
 
-def get_secret(key: str, default=None):
-    """secrets.toml이 없어도 터지지 않게 안전하게 읽기"""
-    try:
-        return st.secrets.get(key, default)
-    except StreamlitSecretNotFoundError:
-        return default
+import matplotlib.pyplot as plt
+from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_chroma import Chroma
+from langchain_core.prompts import ChatPromptTemplate
+
+# ✅ 정적 정의(설정/문항/유형/프롬프트/위험 패턴/폰트)는 모듈로 분리 → 프로세스당 1번만 실행
+#    rerun 마다 이 스크립트는 라우팅과 렌더링만 수행
+from config import (
+    DATA_DIR, DATA_BUNDLE_PATH, FONT_PATH, get_secret,
+    COL_USER_PROFILE, COL_COUNSEL_DB, COL_RISK_PROTOCOL, PERSIST_USER, PERSIST_COUNSEL, PERSIST_RISK,
+    MMAP_ROOT, PARTITION_ROOT,
+    EMBED_MODEL, LLM_BACKEND, LLM_HEDGE, LLM_TIMEOUT,
+    CHAT_MODEL_FAST, CHAT_MODEL_STRONG, MODEL_ROUTES, ROUTE_SHORT_TURN_CHARS,
+    LLM_P95_BUDGET_MS, LLM_SPEND_BUDGET_USD, LLM_SPEND_WINDOW_SEC,
+    LLM_MAX_CONCURRENCY, LLM_RPS, EMBED_MAX_CONCURRENCY, EMBED_RPS, SCHEDULER_SHARED_DB, SCHEDULER_WAIT_TIMEOUT,
+    SINGLE_FLIGHT, VECTOR_STORE_MODE, QUANT_DIM, QUANT_KIND, QUANT_OVERSAMPLE, WARMUP_ON_START, WARMUP_EMBEDDING_PROBE, WARMUP_WAIT_TIMEOUT, READY_FILE, HYBRID_RETRIEVAL, LOG_RERUN_TIMING,
+    LOCAL_SUMMARY, SUMMARY_LLM_EVERY, USER_MEMORY, MEMORY_DIR, USER_ID_SECRET,
+    CRISIS_FAST_PATH, CRISIS_FAST_LEVELS, CRISIS_ELABORATE, CRISIS_POLL_SEC,
+    COUNSEL_K, COUNSEL_CANDIDATES, RISK_LEVEL_K, RISK_STEP_K,
+    THRESHOLD_SKETCH, SKETCH_DIR, RESULT_LOG, RESULT_LOG_DIR, RESULT_LOG_COMPACT_INTERVAL,
+    PROFILE_WRITER, PROFILE_JOURNAL_DIR, PROFILE_FLUSH_INTERVAL, PROFILE_MAX_BATCH,
+    MEM_PROFILE, MEM_PROFILE_INTERVAL, MEM_PROFILE_DUMP, MEM_PROFILE_FRAMES,
+)
+from survey import QUESTIONS, compute_scores
+from type_db import get_type_info
+from prompts import FEW_SHOT_BLOCK, FINAL_SUMMARY_FORMAT, FINAL_SUMMARY_FORMAT_WITH_SAFETY, SUMMARY_LABELS, SYSTEM_POLICY
+from risk import RISK_BADGE, detect_risk_mode, extract_level, get_required_steps
+from charts import FP, draw_quadrant, draw_score_bar, get_font_prop, score_to_pct_0_100
+from lexical_index import PlaybookLexicalIndex, hybrid_search
+from local_summary import LocalSummarizer, should_use_llm_summary
+from memory_store import MemoryStore, verify_user_token
+from mem_profile import MemProfiler
+from profile_writer import SUMMARY_CHARS, ProfileWriter
+from llm_client import AsyncLLMClient
+from data_bundle import DataBundle, load_dataset, open_bundle
+from crisis_path import crisis_response, crisis_summary, load_crisis_templates
+from model_router import TIER_FAST, TIER_STRONG, ModelRouter, parse_routes
+from shared_index import load_mmap_store
+from quant_index import load_quant_store
+from partitioned_store import load_partitioned_store
+from warmup import WarmupTask, is_ready, start_warmup, wait_ready, warmup_status
+from threshold_sketch import SketchStore
+from result_log import ResultLog, encode_category, encode_level
+from singleflight import SingleFlight, SingleFlightEmbeddings, SingleFlightLLM
+from scheduler import (
+    FairScheduler, ScheduledEmbeddings, ScheduledLLM, SharedTokenBucket, TokenBucket, call_context,
+)
 
 
 def require_password():
@@ -38,78 +80,9 @@ def require_password():
             st.error("비밀번호가 올바르지 않습니다.")
     st.stop()
 
-require_password()
-
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-
-from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_chroma import Chroma
-from langchain_core.prompts import ChatPromptTemplate
-
 
 # =========================================================
-# 0) 경로/설정 (⭐ 여기만 수정)
-# =========================================================
-PROJECT_ROOT = Path(__file__).resolve().parent
-
-ENV_PATH = PROJECT_ROOT / ".env"
-PERSONA_JSON_PATH = PROJECT_ROOT / "data" / "persona_rules.json"
-PERSIST_ROOT = PROJECT_ROOT / "chroma_store"
-DATA_DIR = str(PERSONA_JSON_PATH.parent)
-
-# 폰트는 있으면 사용, 없으면 fallback
-FONT_PATH = str(PROJECT_ROOT / "assets" / "Freesentation-6SemiBold.ttf")
-
-COL_USER_PROFILE = "user_profile"
-COL_COUNSEL_DB = "counsel_db"
-COL_RISK_PROTOCOL = "risk_protocol"
-
-PERSIST_USER = str(PERSIST_ROOT / COL_USER_PROFILE)
-PERSIST_COUNSEL = str(PERSIST_ROOT / COL_COUNSEL_DB)
-PERSIST_RISK = str(PERSIST_ROOT / COL_RISK_PROTOCOL)
-
-EMBED_MODEL = "text-embedding-3-large"
-CHAT_MODEL = "gpt-5-mini"
-CUT = 4.5           # (기존 4.0 → 4.5)
-GRAY = 0.35         # 애매 구간 폭(±)
-
-def hi_lo(score: float) -> str:
-    # 1~7 평균 기준: 4.5 이상이면 높음, 4.5 미만이면 낮음
-    return "높음" if score >= CUT else "낮음"
-
-def expr_style(expr_score: float) -> str:
-    # 애매하면 상담에서만 참고하고, 결과는 한쪽으로 확정(강제 분류)
-    # 원하시면 '중간형' 표시로 바꿀 수도 있습니다.
-    return "표현형" if expr_score >= CUT else "억제형"
-# ✅ 배포/로컬 겸용: 환경변수 주입
-# - 로컬: .env 사용
-# - 배포(Streamlit Cloud): st.secrets 사용
-openai_key = get_secret("OPENAI_API_KEY", None)
-if openai_key:
-    os.environ["OPENAI_API_KEY"] = openai_key
-
-load_dotenv(dotenv_path=str(ENV_PATH))
-
-
-# =========================================================
-# 2) 폰트
-# =========================================================
-def get_font_prop(font_path: str) -> fm.FontProperties:
-    try:
-        if os.path.isfile(font_path):
-            return fm.FontProperties(fname=font_path)
-    except Exception:
-        pass
-    return fm.FontProperties()  # fallback
-
-
-FP = get_font_prop(FONT_PATH)
-
-
-# =========================================================
-# 3) 공통 CSS
+# 3) 공통 CSS (요소라서 rerun 마다 다시 보내야 유지됨)
 # =========================================================
 st.markdown(
     """
@@ -147,390 +120,19 @@ div[data-testid="stRadio"] div[role="radiogroup"] label {
 )
 
 
-# =========================================================
-# 4) 설문: TYPE_DB
-# =========================================================
-TYPE_DB = {
-    ("안정형", "표현형", "높음"): {
-        "emoji": "🦦",
-        "name": "따뜻한 수달",
-        "headline": "안정형 · 표현형 · 효능감 높음",
-        "desc": (
-            "이 유형은 자신과 타인을 모두 긍정적으로 보며, 감정을 자연스럽게 표현하는 편이에요. "
-            "자신의 능력에 대한 확신도 있어 관계와 목표 모두에서 안정적인 기반을 가지고 움직입니다.\n\n"
-            "갈등이 발생해도 과도하게 흔들리기보다 맥락을 설명하며 차분히 조율하려는 태도가 강해요.\n\n"
-            "어려움이 와도 회피하기보다 해결을 향해 접근하고, “할 수 있다”는 믿음으로 조용히 지속해 나갑니다.\n\n"
-            "모든 상황을 혼자 정리하려 하기보다, 필요할 땐 도움을 받아들이면 더 여유로운 관계를 만들 수 있어요."
-        ),
-    },
-    ("안정형", "표현형", "낮음"): {
-        "emoji": "🐑",
-        "name": "잔잔한 양",
-        "headline": "안정형 · 표현형 · 효능감 낮음",
-        "desc": (
-            "감정을 자연스럽게 드러내며 관계를 소중히 여기지만, 새로운 상황 앞에서는 자신감이 흔들릴 수 있어요.\n\n"
-            "관계에서는 따뜻하고 일관된 분위기를 유지하지만, 도전 앞에서는 “내가 해낼 수 있을까”가 먼저 떠오를 때가 있어요.\n\n"
-            "작은 성공 경험을 촘촘히 쌓고 스스로를 격려하는 습관이 생기면 행동 폭이 크게 넓어질 수 있습니다."
-        ),
-    },
-    ("안정형", "억제형", "높음"): {
-        "emoji": "🐻",
-        "name": "숲을 지키는 곰",
-        "headline": "안정형 · 억제형 · 효능감 높음",
-        "desc": (
-            "감정 표현은 절제하지만 자기·타인에 대한 긍정이 탄탄하고, 문제를 침착하게 해결하는 능력이 돋보입니다.\n\n"
-            "다만 감정 공유가 적어 오해가 생길 수 있어요. 감정을 조금만 더 나누면 관계의 깊이가 훨씬 풍부해집니다."
-        ),
-    },
-    ("안정형", "억제형", "낮음"): {
-        "emoji": "🦊",
-        "name": "바람을 지켜보는 사막여우",
-        "headline": "안정형 · 억제형 · 효능감 낮음",
-        "desc": (
-            "타인에 대한 신뢰는 있으나 자기 확신은 조심스러운 편이에요. 감정을 억제하며 혼자 해결하려는 경향이 있습니다.\n\n"
-            "점진적인 성공 경험을 쌓으면 자신감이 크게 상승하는 유형입니다."
-        ),
-    },
-    ("불안형", "표현형", "높음"): {
-        "emoji": "🐹",
-        "name": "민감한 귀염둥이 햄스터",
-        "headline": "불안형 · 표현형 · 효능감 높음",
-        "desc": (
-            "감정 반응은 빠르지만 ‘불안을 행동으로 전환’하는 힘이 있어 추진력이 강합니다.\n\n"
-            "민감성을 단점이 아닌 ‘연결의 능력’으로 쓰는 방향이 도움이 됩니다."
-        ),
-    },
-    ("불안형", "표현형", "낮음"): {
-        "emoji": "🐦",
-        "name": "감정 많은 참새",
-        "headline": "불안형 · 표현형 · 효능감 낮음",
-        "desc": (
-            "감정 폭이 넓고 변화가 빠르며 인정 욕구가 강하지만 자기 확신이 약해 쉽게 흔들릴 수 있어요.\n\n"
-            "감정을 깊이 느끼고 진심으로 관계를 대한다는 강점이 있으니, 스스로를 격려하는 연습이 관계 안정에 도움이 됩니다."
-        ),
-    },
-    ("불안형", "억제형", "높음"): {
-        "emoji": "🦌",
-        "name": "고요한 사슴",
-        "headline": "불안형 · 억제형 · 효능감 높음",
-        "desc": (
-            "불안을 예민하게 느끼지만 드러내지 않고 스스로 해결하려 합니다. 효능감이 높아 문제를 다루지만, 표현 억제로 거리감이 생길 수 있어요.\n\n"
-            "안전한 방식의 감정 표현 연습이 큰 도움이 됩니다."
-        ),
-    },
-    ("불안형", "억제형", "낮음"): {
-        "emoji": "🐱",
-        "name": "숨어 있는 고양이",
-        "headline": "불안형 · 억제형 · 효능감 낮음",
-        "desc": (
-            "불안은 크지만 표현은 조용해 내부 스트레스가 오래 쌓일 수 있어요.\n\n"
-            "감정을 안전하게 나누는 경험 + 작은 성취 반복이 매우 중요합니다."
-        ),
-    },
-    ("회피형", "표현형", "높음"): {
-        "emoji": "🐺",
-        "name": "떠돌이 늑대",
-        "headline": "회피형 · 표현형 · 효능감 높음",
-        "desc": (
-            "표현은 자연스럽지만 깊은 관계엔 조심스러울 수 있어요. 혼자 해결 능력은 강합니다.\n\n"
-            "관계를 끊기보다 ‘경계를 조절하는 기술’을 익히면 균형이 좋아집니다."
-        ),
-    },
-    ("회피형", "표현형", "낮음"): {
-        "emoji": "🐨",
-        "name": "하품하는 코알라",
-        "headline": "회피형 · 표현형 · 효능감 낮음",
-        "desc": (
-            "관계가 깊어질 때 불안과 회피가 동시에 올라올 수 있어요.\n\n"
-            "안정적인 성공경험과 지지 경험을 천천히 쌓는 것이 변화의 핵심입니다."
-        ),
-    },
-    ("회피형", "억제형", "높음"): {
-        "emoji": "🐆",
-        "name": "독립적인 표범",
-        "headline": "회피형 · 억제형 · 효능감 높음",
-        "desc": (
-            "표현은 절제하고 관계는 조심스럽게 유지하지만, 혼자 해결에 강합니다.\n\n"
-            "감정을 드러내는 것이 약점이라는 신념을 내려놓는 순간 관계의 질이 달라집니다."
-        ),
-    },
-    ("회피형", "억제형", "낮음"): {
-        "emoji": "🐢",
-        "name": "바위 틈의 거북",
-        "headline": "회피형 · 억제형 · 효능감 낮음",
-        "desc": (
-            "자기 확신이 낮고 타인을 쉽게 신뢰하지 않아 관계와 도전 모두에 조심스럽습니다.\n\n"
-            "작게 구조화된 목표부터 성공경험을 쌓는 접근이 잘 맞습니다."
-        ),
-    },
-    ("거부형", "표현형", "높음"): {
-        "emoji": "🦅",
-        "name": "대담한 매",
-        "headline": "거부형 · 표현형 · 효능감 높음",
-        "desc": (
-            "자기 믿음은 강하지만 타인 신뢰는 낮아 관계는 가볍게 유지될 수 있어요.\n\n"
-            "깊은 정서 교류가 부담스러울 때, ‘가능한 범위’부터 합의하는 방식이 유효합니다."
-        ),
-    },
-    ("거부형", "표현형", "낮음"): {
-        "emoji": "🐦‍⬛",
-        "name": "새벽 까마귀",
-        "headline": "거부형 · 표현형 · 효능감 낮음",
-        "desc": (
-            "표현은 하지만 타인 신뢰가 낮아 일정 선을 유지하려는 경향이 있습니다.\n\n"
-            "작은 성공경험을 쌓아 ‘할 수 있다’ 감각을 회복하는 게 중요합니다."
-        ),
-    },
-    ("거부형", "억제형", "높음"): {
-        "emoji": "🐈‍⬛",
-        "name": "고독한 전략가 흑호",
-        "headline": "거부형 · 억제형 · 효능감 높음",
-        "desc": (
-            "감정 표현은 거의 없고 자기 지탱 힘이 강합니다.\n\n"
-            "표현을 조금만 허용하면 연결이 부드러워지고 피로감이 줄 수 있어요."
-        ),
-    },
-    ("거부형", "억제형", "낮음"): {
-        "emoji": "🦉",
-        "name": "고목 위 부엉이",
-        "headline": "거부형 · 억제형 · 효능감 낮음",
-        "desc": (
-            "자기·타인 긍정 모두 낮아 관계를 매우 신중하게 대합니다.\n\n"
-            "작은 성공 경험 + 신뢰할 수 있는 한 사람의 확보가 회복에 큰 도움이 됩니다."
-        ),
-    },
-}
-
-
-def get_type_info(base: str, style: str, eff: str) -> Dict[str, Any]:
-    return TYPE_DB.get(
-        (base, style, eff),
-        {"emoji": "🐾", "name": "임시 유형", "headline": f"{base} · {style} · 효능감 {eff}", "desc": "이 유형 설명은 준비 중입니다."},
-    )
-
-
-# =========================================================
-# 5) 설문 문항 구성
-# =========================================================
-def rev7(x: int) -> int:
-    return 8 - x
-
-
-def mean(xs: List[float]) -> float:
-    return sum(xs) / len(xs) if xs else 4.0
-
-
-def safe_mean(xs: List[Optional[float]]) -> float:
-    xs2 = [x for x in xs if x is not None]
-    return sum(xs2) / len(xs2) if xs2 else 0.0
-
-
-def internal_ratio(pos_vals: List[float], neg_raw_vals: List[float], eps: float = 1e-9) -> float:
-    """pos / (pos + neg)  -> 0~1"""
-    P = safe_mean(pos_vals)
-    N = safe_mean(neg_raw_vals)
-    return P / (P + N + eps)
-
-
-def base_type(self_m_pct: float, other_m_pct: float) -> str:
-    x = self_m_pct >= 50
-    y = other_m_pct >= 50
-    if x and y:
-        return "안정형"
-    if (not x) and y:
-        return "불안형"
-    if x and (not y):
-        return "회피형"
-    return "거부형"
-
-
-QUESTIONS: List[Dict[str, Any]] = []
-
-# -----------------------------
-# 1) Self Model (5문항)
-# - pos 3개, neg 2개(역채점)
-# -----------------------------
-self_pos_texts = [
-    "실수해도 ‘내가 무가치해진 건 아니다’라고 비교적 빨리 정리하는 편이다.",
-    "중요한 결정을 앞두면, 결국은 내가 감당할 수 있다는 쪽에 더 무게가 실린다.",
-    "비판을 들어도, 내 전체를 부정당한 느낌보단 ‘부분 피드백’으로 받아들이려 한다.",
-]
-self_neg_texts = [
-    "상대 반응이 차가우면 ‘내가 문제라서’라는 해석이 먼저 떠오르는 편이다.",
-    "사랑받으려면 ‘지금의 나’로는 부족하다는 생각이 종종 든다.",
-]
-
-for i, t in enumerate(self_pos_texts, start=1):
-    QUESTIONS.append({"key": f"s{i}", "text": t, "scale": "self_pos", "reverse": False})
-for j, t in enumerate(self_neg_texts, start=4):
-    QUESTIONS.append({"key": f"s{j}", "text": t, "scale": "self_neg", "reverse": True})
-
-
-# -----------------------------
-# 2) Other Model (5문항)
-# - pos 3개, neg 2개(역채점)
-# -----------------------------
-other_pos_texts = [
-    "도움을 요청하면, 대체로 사람들은 나를 해치기보다 도우려 했던 경험이 더 많다.",
-    "관계가 깊어질수록 ‘연결이 생긴다’는 기대가 비교적 자연스럽다.",
-    "내가 솔직히 말해도, 상대가 전부 공격으로 받진 않을 거라고 생각하는 편이다.",
-]
-other_neg_texts = [
-    "가까워질수록 ‘언젠가 상처받을 것 같다’는 경계가 먼저 올라오는 편이다.",
-    "호의를 받아도 ‘속에 다른 의도가 있을 수 있다’는 의심이 스치는 편이다.",
-]
-
-for i, t in enumerate(other_pos_texts, start=1):
-    QUESTIONS.append({"key": f"o{i}", "text": t, "scale": "other_pos", "reverse": False})
-for j, t in enumerate(other_neg_texts, start=4):
-    QUESTIONS.append({"key": f"o{j}", "text": t, "scale": "other_neg", "reverse": True})
-
-
-# -----------------------------
-# 3) Emotion Reg (6문항)
-# - 표현(역채점한 억제) 3문항
-# - 재평가 3문항(참고용, 분류에는 직접 안 쓰더라도 상담에 도움됨)
-# -----------------------------
-expr_supp_texts = [
-    "감정이 커져도 ‘티 안 나게’ 정리하려는 편이다.",
-    "좋아도 싫어도 표정/말투가 크게 드러나지 않게 조절하는 편이다.",
-    "갈등이 생기면 감정을 말하기보다 일단 눌러두고 넘어가려 한다.",
-]
-reapp_texts = [
-    "기분이 가라앉으면, 일부러 의미/좋은 점을 찾아 해석을 바꿔보는 편이다.",
-    "상대 말에 상처받아도 ‘그럴 수도 있지’로 마음을 정리하려 한다.",
-    "스트레스가 오면, 상황을 더 차분한 관점으로 다시 보는 편이다.",
-]
-
-# 억제문항을 역채점해서 '표현 점수'로 만듦
-for i, t in enumerate(expr_supp_texts, start=1):
-    QUESTIONS.append({"key": f"e{i}", "text": t, "scale": "erq_expr", "reverse": True})
-for i, t in enumerate(reapp_texts, start=4):
-    QUESTIONS.append({"key": f"e{i}", "text": t, "scale": "erq_reapp", "reverse": False})
-
-
-# -----------------------------
-# 4) Self-efficacy (6문항)
-# -----------------------------
-eff_texts = [
-    "불안해도 ‘일단 해보자’로 시작하는 편이다.",
-    "막히면 포기보다 ‘다른 방법’을 찾아보는 쪽이 더 빠르다.",
-    "실패해도 ‘내 능력 전체’로 일반화하기보다 다음 시도를 준비하는 편이다.",
-    "조언을 들으면 ‘비판’보다 ‘업그레이드 기회’로 받아들이려 한다.",
-    "부담이 커도 도망치기보다 ‘작게 쪼개서’ 처리하려 한다.",
-    "긴장해도 해야 할 일의 핵심만 잡고 계속 진행할 수 있는 편이다.",
-]
-for i, t in enumerate(eff_texts, start=1):
-    QUESTIONS.append({"key": f"g{i}", "text": t, "scale": "eff", "reverse": False})
-
-
-def get_vals(scale: str, answers: Dict[str, int]) -> List[int]:
-    vals: List[int] = []
-    for q in QUESTIONS:
-        if q["scale"] == scale:
-            v = answers.get(q["key"], 4)
-            if q["reverse"]:
-                v = rev7(v)
-            vals.append(v)
-    return vals
-
-
-def get_vals_raw(scale: str, answers: Dict[str, int]) -> List[int]:
-    vals: List[int] = []
-    for q in QUESTIONS:
-        if q["scale"] == scale:
-            vals.append(answers.get(q["key"], 4))
-    return vals
-
-
 # =========================================================
 # 6) persona_rules + RAG 유틸
 # =========================================================
-SYSTEM_POLICY = """
-[챗봇 정체성]
-본 챗봇은 연애 및 관계에 대한 고민을 함께 정리하는 AI 상담 파트너이며,
-전문 상담사·의료·법률 전문가가 아닙니다.
-모든 조언은 참고용 관점 제시에 해당합니다.
-
-[상담 원칙 / 윤리 기준]
-1. 관계 갈등을 옳고 그름의 문제로 판단하지 않고, 욕구·기대·상황의 충돌로 해석합니다.
-2. 감정은 평가하지 않고 이해의 대상으로 다루며, 감정보다 감정을 다루는 방식에 주목합니다.
-3. 과도한 희생이나 집착을 관계의 건강 신호로 해석하지 않습니다.
-4. 자율성을 관계의 위협이 아닌 핵심 요소로 존중합니다.
-5. 제한된 정보로 상대의 의도·성격·관계를 단정하지 않습니다.
-6. 공감하되, 감정에서 비롯된 모든 행동을 정당화하지 않습니다.
-7. 빠른 결론보다 사고의 확장과 맥락 이해를 우선합니다.
-8. 의료적·법적 조언이나 진단을 하지 않으며, 사용자의 선택을 대신 결정하거나 강요하지 않습니다.
-9. 윤리적·관계적 위험이 있는 요청은 수행하지 않으며, 대화를 더 안전한 방향으로 전환합니다.
-10. 공감은 사실 기반으로 유지하고, 한쪽에 치우치지 않는 중립적 균형을 지킵니다.
-11. 실명·연락처·위치 등 민감한 정보를 요구하거나 활용하지 않습니다.
-
-[안전 대응 원칙]
-- 자해·자살·폭력·즉각적 안전 위협 신호가 감지될 경우, 공감과 안전 확보를 최우선으로 안내합니다.
-- 불법·감시·통제·조작을 돕는 구체적 방법은 제공하지 않습니다.
-""".strip()
-
-RISK_BADGE = "🚨 위험신호 발견"
-RISK_PATTERNS = [
-    r"자해", r"자살", r"죽고\s*싶", r"살\s*의미", r"폭력", r"때리", r"죽여",
-    r"스토킹", r"위치\s*추적", r"감시", r"통제", r"협박", r"가스라이팅",
-    r"숨이\s*막혀", r"패닉", r"공황", r"아무것도\s*못\s*하겠",
-]
-
-SUMMARY_LABELS = ["[감정]", "[핵심 고민]", "[오늘 정리된 방향]", "[다음 한 걸음]", "[안전/경계]"]
-
-FINAL_SUMMARY_FORMAT = """\
-[감정] ...
-[핵심 고민] ...
-[오늘 정리된 방향] ...
-[다음 한 걸음] ...\
-"""
-
-FINAL_SUMMARY_FORMAT_WITH_SAFETY = """\
-[감정] ...
-[핵심 고민] ...
-[오늘 정리된 방향] ...
-[다음 한 걸음] ...
-[안전/경계] ...\
-"""
-
-FEW_SHOT_EXAMPLES = [
-    {
-        "history_summary": "연인이 바쁠 때 연락이 줄어 불안해짐. 추궁하면 갈등이 커질까 걱정함. 상대는 여유가 부족한 상황일 가능성이 큼.",
-        "risk_mode": False,
-        "output": "\n".join([
-            "[감정] 서운함과 불안이 함께 올라오셨습니다.",
-            "[핵심 고민] 연락 빈도를 애정으로 해석하게 되면서 마음이 흔들리는 점이 핵심입니다.",
-            "[오늘 정리된 방향] 추궁 대신 ‘필요한 연결 방식’을 구체적으로 합의하는 쪽이 안전합니다.",
-            "[다음 한 걸음] 오늘은 추가 메시지를 멈추고, 내일 10분 통화 루틴을 제안해 보세요.",
-        ])
-    },
-    {
-        "history_summary": "상대가 위치 추적을 원하거나 감시/통제를 요구하는 맥락이 있었고, 사용자가 불안을 크게 느낌. 안전과 경계가 우선 필요함.",
-        "risk_mode": True,
-        "output": "\n".join([
-            "[감정] 불안과 압박감이 크게 느껴지셨습니다.",
-            "[핵심 고민] 관계에서 ‘통제/감시’가 안전감을 해치고 있습니다.",
-            "[오늘 정리된 방향] 상대의 요구를 즉시 수용하기보다 경계를 명확히 세우는 것이 우선입니다.",
-            "[다음 한 걸음] 위치/비밀번호 공유는 중단하고, ‘이건 불편해서 못 한다’는 한 문장만 전달하세요.",
-            "[안전/경계] 위협·협박이 느껴지면 주변 도움(지인/기관)으로 안전을 먼저 확보하세요.",
-        ])
-    },
-]
-
-
-def detect_risk_mode(user_message: str) -> bool:
-    return any(re.search(p, user_message or "") for p in RISK_PATTERNS)
+@st.cache_resource(show_spinner=False)
+def get_data_bundle(bundle_path: str, data_dir: str) -> Optional[DataBundle]:
+    # ✅ data_bundle.py build 결과를 mmap (없으면 None → 각 로더가 JSON 검증 경로 사용)
+    return open_bundle(bundle_path, data_dir)
 
 
 @st.cache_resource(show_spinner=False)
 def load_persona_rules_cached(data_dir: str) -> List[Dict[str, Any]]:
-    path = os.path.join(data_dir, "persona_rules.json")
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    if not isinstance(data, list) or not data:
-        raise ValueError("persona_rules.json은 비어있지 않은 list여야 합니다.")
-    return data
+    # 번들이 최신이면 검증/정규화가 끝난 데이터를 그대로, 아니면 JSON 을 읽어 같은 검증 적용
+    return load_dataset(data_dir, "persona_rules", get_data_bundle(DATA_BUNDLE_PATH, data_dir))
 
 
 def pick_persona_rule_from_json(profile: Dict[str, Any], rules: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -573,9 +175,66 @@ def make_counselor_state_from_rule(rule: Dict[str, Any]) -> str:
 """.strip()
 
 
+@st.cache_resource(show_spinner=False)
+def get_schedulers() -> Dict[str, FairScheduler]:
+    def bucket(name: str, rate: float):
+        if SCHEDULER_SHARED_DB:
+            return SharedTokenBucket(SCHEDULER_SHARED_DB, name, rate)
+        return TokenBucket(rate)
+
+    return {
+        "llm": FairScheduler("llm", LLM_MAX_CONCURRENCY, bucket("llm", LLM_RPS)),
+        "embed": FairScheduler("embed", EMBED_MAX_CONCURRENCY, bucket("embed", EMBED_RPS)),
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def get_singleflight_groups() -> Dict[str, SingleFlight]:
+    # 이름 → 합치기 그룹 (프로세스 공용, ?ops=1 지표)
+    return {}
+
+
+def singleflight_group(name: str) -> SingleFlight:
+    return get_singleflight_groups().setdefault(name, SingleFlight(name))
+
+
 @st.cache_resource(show_spinner=True)
 def load_vectorstores_only() -> Dict[str, Chroma]:
-    embeddings = OpenAIEmbeddings(model=EMBED_MODEL)
+    embeddings = ScheduledEmbeddings(
+        OpenAIEmbeddings(model=EMBED_MODEL), get_schedulers()["embed"], timeout=SCHEDULER_WAIT_TIMEOUT
+    )
+    if SINGLE_FLIGHT:
+        # ✅ 같은 질의 임베딩이 동시에 오면 1번만 호출 (스케줄러 바깥: 기다리는 쪽은 슬롯을 쓰지 않음)
+        embeddings = SingleFlightEmbeddings(embeddings, singleflight_group("embed"))
+
+    if VECTOR_STORE_MODE == "quant":
+        # ✅ 양자화 배열만 상주, 원본 float 는 후보 재정렬 때만 mmap 으로 읽음
+        def quant(name: str):
+            return load_quant_store(
+                MMAP_ROOT, name, embeddings, dim=QUANT_DIM, kind=QUANT_KIND, oversample=QUANT_OVERSAMPLE
+            )
+
+        return {
+            "user_profile_db": quant(COL_USER_PROFILE),
+            "counsel_db": quant(COL_COUNSEL_DB),
+            "risk_db": quant(COL_RISK_PROTOCOL),
+        }
+
+    if VECTOR_STORE_MODE == "partitioned":
+        # ✅ doc_type 마다 작은 단일 종류 색인 → filter 검색도 항상 k개, 사후 필터 없음
+        return {
+            "user_profile_db": load_partitioned_store(PARTITION_ROOT, COL_USER_PROFILE, embeddings),
+            "counsel_db": load_partitioned_store(PARTITION_ROOT, COL_COUNSEL_DB, embeddings),
+            "risk_db": load_partitioned_store(PARTITION_ROOT, COL_RISK_PROTOCOL, embeddings),
+        }
+
+    if VECTOR_STORE_MODE == "mmap":
+        # ✅ 모든 워커가 같은 mmap 파일을 공유 (SQLite/HNSW 로딩 없음)
+        return {
+            "user_profile_db": load_mmap_store(MMAP_ROOT, COL_USER_PROFILE, embeddings),
+            "counsel_db": load_mmap_store(MMAP_ROOT, COL_COUNSEL_DB, embeddings),
+            "risk_db": load_mmap_store(MMAP_ROOT, COL_RISK_PROTOCOL, embeddings),
+        }
 
     for p in (PERSIST_USER, PERSIST_COUNSEL, PERSIST_RISK):
         if not os.path.isdir(p):
@@ -599,39 +258,129 @@ def load_vectorstores_only() -> Dict[str, Chroma]:
         persist_directory=PERSIST_RISK,
         embedding_function=embeddings,
     )
+    # HNSW 파라미터(ef_search 포함)는 hnsw_tuner.py rebuild / tune --apply 로 색인에 저장됨 → 로드는 읽기 전용
+
     return {"user_profile_db": user_profile_db, "counsel_db": counsel_db, "risk_db": risk_db}
 
 
 @st.cache_resource(show_spinner=False)
-def get_llm() -> ChatOpenAI:
-    return ChatOpenAI(model=CHAT_MODEL, temperature=0.6)
+def get_llm(model: str) -> ChatOpenAI:
+    if LLM_BACKEND == "async":
+        # ✅ 공용 커넥션 풀 + 동시성 제한 + 지터 재시도 + (옵션) p95 헤지 요청
+        #    (모델/티어별 클라이언트도 같은 base_url 이면 풀과 동시성 한도를 함께 씀)
+        llm = AsyncLLMClient(model=model, temperature=0.6, timeout=LLM_TIMEOUT, hedge=LLM_HEDGE)
+    else:
+        llm = ChatOpenAI(model=model, temperature=0.6)
+    # ✅ 모든 세션의 호출이 공용 스케줄러(공정 큐 + 초당 한도)를 거치도록
+    llm = ScheduledLLM(llm, get_schedulers()["llm"], timeout=SCHEDULER_WAIT_TIMEOUT)
+    if SINGLE_FLIGHT:
+        llm = SingleFlightLLM(llm, singleflight_group(f"llm:{model}"))
+    return llm
+
+
+@st.cache_resource(show_spinner=False)
+def get_model_router() -> ModelRouter:
+    # ✅ 티어별 모델 (같은 모델이면 같은 클라이언트 공유), 지연/지출 통계는 프로세스 공용
+    return ModelRouter(
+        tiers={
+            TIER_FAST: {"llm": get_llm(CHAT_MODEL_FAST), "model": CHAT_MODEL_FAST},
+            TIER_STRONG: {"llm": get_llm(CHAT_MODEL_STRONG), "model": CHAT_MODEL_STRONG},
+        },
+        routes=parse_routes(MODEL_ROUTES),
+        short_turn_chars=ROUTE_SHORT_TURN_CHARS,
+        p95_budget_ms=LLM_P95_BUDGET_MS,
+        spend_budget_usd=LLM_SPEND_BUDGET_USD,
+        window_sec=LLM_SPEND_WINDOW_SEC,
+    )
 
 
 def build_query(history_summary: str, user_message: str) -> str:
     return (history_summary.strip() + "\n" + user_message.strip()).strip()
 
 
-def get_counsel_context(counsel_db: Chroma, history_summary: str, user_message: str, k: int = 4) -> str:
-    q = build_query(history_summary, user_message)
-    docs = counsel_db.similarity_search(q, k=k, filter={"doc_type": "playbook"})
-    return "\n\n---\n\n".join([d.page_content for d in docs]).strip()
+@st.cache_resource(show_spinner=False)
+def get_threshold_sketches() -> SketchStore:
+    # 워커 프로세스마다 자기 파일에만 기록 (리포트 시 merge)
+    return SketchStore(SKETCH_DIR)
+
 
+@st.cache_resource(show_spinner=False)
+def get_result_log() -> ResultLog:
+    return ResultLog(RESULT_LOG_DIR, compact_interval=RESULT_LOG_COMPACT_INTERVAL)
+
+
+@st.cache_resource(show_spinner=False)
+def load_crisis_templates_cached(data_dir: str) -> Dict[str, Dict[str, Any]]:
+    # Level → t07 Step 문장 템플릿 (data JSON 만 읽음, VectorDB/LLM 불필요)
+    return load_crisis_templates(data_dir, get_data_bundle(DATA_BUNDLE_PATH, data_dir))
+
+
+@st.cache_resource(show_spinner=False)
+def get_crisis_executor() -> ThreadPoolExecutor:
+    # 위기 즉시 응답 뒤 LLM 보충 답변 (프로세스 공용, 실제 동시 호출 수는 스케줄러가 제한)
+    return ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="crisis-elaborate")
 
-def parse_required_steps_from_text(page_content: str) -> List[str]:
-    m = re.search(r"\[필수Step\]\s*(.+)", page_content)
-    if not m:
-        return []
-    raw = m.group(1).strip()
-    parts = [p.strip() for p in re.split(r"[→>\-]|,", raw) if p.strip()]
-    out: List[str] = []
-    for p in parts:
-        mm = re.search(r"step\s*([0-9]+)", p, flags=re.IGNORECASE)
-        if mm:
-            out.append(f"STEP_{mm.group(1)}")
-    return out
 
+@st.cache_resource(show_spinner=False)
+def get_mem_profiler() -> MemProfiler:
+    # tracemalloc 시작 + 세션별 크기 기록 (프로세스 공용)
+    return MemProfiler(MEM_PROFILE_INTERVAL, MEM_PROFILE_DUMP, MEM_PROFILE_FRAMES)
+
+
+@st.cache_resource(show_spinner=False)
+def get_profile_writer() -> Optional[ProfileWriter]:
+    # mmap/quant/partitioned 는 읽기 전용 사본이므로 원본 Chroma 일 때만 기록
+    if VECTOR_STORE_MODE != "chroma":
+        return None
+
+    def target():
+        db = load_vectorstores_only()["user_profile_db"]
+        return db._collection, db.embeddings
+
+    return ProfileWriter(target, PROFILE_JOURNAL_DIR, PROFILE_FLUSH_INTERVAL, PROFILE_MAX_BATCH)
+
+
+@st.cache_resource(show_spinner=False)
+def load_counsel_lexical_index(_counsel_db: Chroma) -> PlaybookLexicalIndex:
+    return PlaybookLexicalIndex.from_store(_counsel_db, doc_type="playbook")
+
+
+@st.cache_resource(show_spinner=False)
+def load_local_summarizer(_counsel_db: Chroma) -> LocalSummarizer:
+    return LocalSummarizer.from_store(_counsel_db, doc_type="playbook")
 
-def select_risk_level_doc(risk_db: Chroma, history_summary: str, user_message: str, k: int = 3):
+
+@st.cache_resource(show_spinner=False)
+def get_memory_store(_counsel_db: Chroma) -> MemoryStore:
+    # 기억 색인 용어는 로컬 요약과 같은 playbook 감정/키워드 어휘
+    return MemoryStore(MEMORY_DIR, load_local_summarizer(_counsel_db))
+
+
+def current_user_id() -> Optional[str]:
+    # 서명이 맞는 ?uid= 토큰만 사용자로 인정, 없으면 None (기억/user_state 저장 안 함)
+    return verify_user_token(st.query_params.get("uid"), USER_ID_SECRET)
+
+
+def get_counsel_context(
+    counsel_db: Chroma,
+    history_summary: str,
+    user_message: str,
+    k: int = COUNSEL_K,
+    lexical: Optional[PlaybookLexicalIndex] = None,
+) -> str:
+    q = build_query(history_summary, user_message)
+    # ✅ 짧은 발화는 키워드 색인으로 먼저 (확실하면 임베딩 호출 생략), 아니면 벡터 결과와 결합
+    docs = hybrid_search(
+        lexical,
+        lambda n: counsel_db.similarity_search(q, k=n, filter={"doc_type": "playbook"}),
+        lexical_text=user_message,
+        k=k,
+        candidates=COUNSEL_CANDIDATES,
+    )
+    return "\n\n---\n\n".join([d.page_content for d in docs]).strip()
+
+
+def select_risk_level_doc(risk_db: Chroma, history_summary: str, user_message: str, k: int = RISK_LEVEL_K):
     q = build_query(history_summary, user_message)
     docs = risk_db.similarity_search(q, k=k, filter={"doc_type": "risk_level_example"})
     if not docs:
@@ -639,56 +388,41 @@ def select_risk_level_doc(risk_db: Chroma, history_summary: str, user_message: s
     return docs[0]
 
 
-def get_required_steps(level_doc) -> List[str]:
-    md = level_doc.metadata or {}
-    rs = md.get("required_steps")
-    if isinstance(rs, list) and rs:
-        if len(rs) == 1 and isinstance(rs[0], str) and "Step" in rs[0]:
-            return parse_required_steps_from_text(f"[필수Step] {rs[0]}")
-        out = [x.upper() for x in rs if isinstance(x, str) and x.upper().startswith("STEP_")]
-        if out:
-            return out
-    return parse_required_steps_from_text(level_doc.page_content)
+@st.cache_resource(show_spinner=False)
+def load_risk_step_index(_risk_db: Chroma) -> Dict[str, str]:
+    # step_id → t07 본문 (메타데이터 조회만, 임베딩 호출 없음)
+    got = _risk_db.get(where={"doc_type": "risk_step"}, include=["documents", "metadatas"])
+    index: Dict[str, str] = {}
+    for doc, md in zip(got.get("documents") or [], got.get("metadatas") or []):
+        sid = (md or {}).get("step_id")
+        if sid and doc:
+            index.setdefault(str(sid).upper(), doc)
+    return index
 
 
 def fetch_risk_steps_context(risk_db: Chroma, step_ids: List[str]) -> str:
+    step_index = load_risk_step_index(risk_db)
     blocks: List[str] = []
     for sid in step_ids:
+        # ✅ 인덱스에 있으면 검색 없이 바로 사용
+        if sid in step_index:
+            blocks.append(step_index[sid])
+            continue
         try:
             docs = risk_db.similarity_search(
                 query=f"{sid} risk step",
-                k=2,
+                k=RISK_STEP_K,
                 filter={"doc_type": "risk_step", "step_id": sid},
             )
         except Exception:
             docs = []
         if not docs:
-            docs = risk_db.similarity_search(query=f"{sid} 단계", k=2, filter={"doc_type": "risk_step"})
+            docs = risk_db.similarity_search(query=f"{sid} 단계", k=RISK_STEP_K, filter={"doc_type": "risk_step"})
             docs = docs[:1]
         blocks.extend([d.page_content for d in docs[:1]])
     return "\n\n---\n\n".join(blocks).strip()
 
 
-def extract_level(md: Dict[str, Any]) -> str:
-    keys = md.get("keys")
-    if isinstance(keys, dict):
-        lvl = keys.get("level")
-        if lvl is not None:
-            return str(lvl)
-    if isinstance(keys, str):
-        try:
-            parsed = json.loads(keys)
-            if isinstance(parsed, dict) and parsed.get("level") is not None:
-                return str(parsed.get("level"))
-        except Exception:
-            pass
-    if md.get("level") is not None:
-        return str(md.get("level"))
-    if md.get("row_id") is not None:
-        return str(md.get("row_id"))
-    return "UNKNOWN"
-
-
 def build_risk_pack(risk_db: Chroma, history_summary: str, user_message: str) -> Dict[str, Any]:
     level_doc = select_risk_level_doc(risk_db, history_summary, user_message)
     required_steps = get_required_steps(level_doc)
@@ -705,15 +439,44 @@ def build_risk_pack(risk_db: Chroma, history_summary: str, user_message: str) ->
     }
 
 
+def invoke_text(llm: ChatOpenAI, prompt: Any, usage: Optional[Dict[str, int]] = None) -> str:
+    """LLM 호출 → 본문 문자열 (usage 가 주어지면 토큰 수를 누적)"""
+    msg = llm.invoke(prompt)
+    if usage is not None:
+        meta = getattr(msg, "usage_metadata", None) or {}
+        usage["input_tokens"] = usage.get("input_tokens", 0) + int(meta.get("input_tokens") or 0)
+        usage["output_tokens"] = usage.get("output_tokens", 0) + int(meta.get("output_tokens") or 0)
+    return (msg.content or "").strip()
+
+
 def generate_answer(
-    llm: ChatOpenAI,
+    router: ModelRouter,
     counselor_state: str,
     counsel_context: str,
     risk_mode: bool,
     risk_pack: Optional[Dict[str, Any]],
     history_summary: str,
     user_message: str,
+    usage: Optional[Dict[str, int]] = None,
+    memory_context: str = "",
+    already_sent: str = "",
 ) -> str:
+    sent_block = ""
+    if already_sent:
+        sent_block = f"""
+[이미 전달한 안전 안내 / already_sent]
+{already_sent}
+- 위 안내는 이미 사용자에게 전달되었습니다. 같은 문장을 반복하지 말고, 사용자 발화에 맞춰 이어서 답하세요.
+""".strip()
+
+    memory_block = ""
+    if memory_context:
+        memory_block = f"""
+[지난 상담 기억 / memory]
+{memory_context}
+- 이번 대화와 이어질 때만 자연스럽게 참고하고, 그대로 인용하지 마세요.
+""".strip()
+
     risk_block = ""
     if risk_mode and risk_pack:
         risk_block = f"""
@@ -737,6 +500,10 @@ def generate_answer(
 
 {risk_block}
 
+{sent_block}
+
+{memory_block}
+
 [대화 요약 / history_summary]
 {history_summary}
 
@@ -751,13 +518,20 @@ def generate_answer(
 - 항상 존댓말 사용하세요.
 """.strip()
 
-    answer = (llm.invoke(prompt).content or "").strip()
-    if risk_mode:
+    llm = router.pick("answer_risk" if risk_mode else "answer", risk=risk_mode, user_message=user_message)
+    answer = invoke_text(llm, prompt, usage)
+    if risk_mode and not already_sent:
         answer = f"{RISK_BADGE}\n\n{answer}"
     return answer
 
 
-def update_history_summary(llm: ChatOpenAI, prev_summary: str, user_message: str, assistant_answer: str) -> str:
+def update_history_summary(
+    router: ModelRouter,
+    prev_summary: str,
+    user_message: str,
+    assistant_answer: str,
+    usage: Optional[Dict[str, int]] = None,
+) -> str:
     prompt = f"""
 아래 정보를 바탕으로 '대화 요약'을 3~5줄 한국어로 갱신하세요.
 
@@ -773,7 +547,7 @@ def update_history_summary(llm: ChatOpenAI, prev_summary: str, user_message: str
 [출력]
 - 3~5줄 요약(줄바꿈 포함)
 """.strip()
-    return (llm.invoke(prompt).content or "").strip()
+    return invoke_text(router.pick("history_summary"), prompt, usage)
 
 
 def enforce_linebreaks(text: str) -> str:
@@ -785,17 +559,7 @@ def enforce_linebreaks(text: str) -> str:
     return "\n".join(lines)
 
 
-def final_summary_fewshot(llm: ChatOpenAI, history_summary: str, risk_mode: bool) -> str:
-    shots_txt = []
-    for ex in FEW_SHOT_EXAMPLES:
-        shots_txt.append(
-            "### 예시 입력\n"
-            f"[대화 요약]\n{ex['history_summary']}\n"
-            f"[risk_mode]\n{ex['risk_mode']}\n\n"
-            "### 예시 출력(정답 형식)\n"
-            f"{ex['output']}\n"
-        )
-    shots_block = "\n\n".join(shots_txt).strip()
+def final_summary_fewshot(router: ModelRouter, history_summary: str, risk_mode: bool) -> str:
     format_block = FINAL_SUMMARY_FORMAT_WITH_SAFETY if risk_mode else FINAL_SUMMARY_FORMAT
 
     prompt = ChatPromptTemplate.from_messages([
@@ -806,7 +570,7 @@ def final_summary_fewshot(llm: ChatOpenAI, history_summary: str, risk_mode: bool
          "출력은 오직 요약 본문만 반환하세요(설명/서문/코드 금지)."),
         ("human",
          f"[지정 양식]\n{format_block}\n\n"
-         f"[few-shot 예시]\n{shots_block}\n\n"
+         f"[few-shot 예시]\n{FEW_SHOT_BLOCK}\n\n"
          f"[실제 입력]\n[대화 요약]\n{history_summary}\n[risk_mode]\n{risk_mode}\n\n"
          "[작성 규칙]\n"
          "- 총 3~5줄(위험모드면 4~5줄)\n"
@@ -816,30 +580,96 @@ def final_summary_fewshot(llm: ChatOpenAI, history_summary: str, risk_mode: bool
          )
     ])
 
-    text = (llm.invoke(prompt.format_messages()).content or "").strip()
+    text = invoke_text(router.pick("final_summary", risk=risk_mode), prompt.format_messages())
     return enforce_linebreaks(text)
 
 
 def run_turn(
-    llm: ChatOpenAI,
+    router: ModelRouter,
     persona_rule: Dict[str, Any],
     counsel_db: Chroma,
     risk_db: Chroma,
     history_summary: str,
     user_message: str,
+    counsel_lexical: Optional[PlaybookLexicalIndex] = None,
+    summarizer: Optional[LocalSummarizer] = None,
+    turn_index: int = 0,
+    memory_context: str = "",
+    crisis_templates: Optional[Dict[str, Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    usage: Dict[str, int] = {}
+    risk_mode = detect_risk_mode(user_message)
+
+    # ✅ 고위험 Level 은 검색/LLM 없이 t07 Step 템플릿으로 즉시 응답 (보충 답변은 호출 측에서 비동기)
+    crisis = None
+    if risk_mode and crisis_templates:
+        crisis = crisis_response(user_message, crisis_templates, CRISIS_FAST_LEVELS)
+    if crisis:
+        if summarizer is not None:
+            new_summary = summarizer.update(history_summary, user_message)
+        else:
+            new_summary = crisis_summary(history_summary, crisis["level"], user_message)
+        return {
+            "assistant_answer": crisis["text"],
+            "history_summary": new_summary,
+            "risk_mode": True,
+            "level": crisis["level"],
+            "fast_path": True,
+            "latency_ms": (time.perf_counter() - t0) * 1000,
+            "usage": usage,
+        }
+
     counselor_state = make_counselor_state_from_rule(persona_rule)
-    counsel_context = get_counsel_context(counsel_db, history_summary, user_message, k=4)
 
-    risk_mode = detect_risk_mode(user_message)
-    risk_pack = build_risk_pack(risk_db, history_summary, user_message) if risk_mode else None
+    # ✅ 위험 모드 턴은 스케줄러에서 우선 처리
+    with call_context(risk=risk_mode):
+        counsel_context = get_counsel_context(counsel_db, history_summary, user_message, lexical=counsel_lexical)
+        risk_pack = build_risk_pack(risk_db, history_summary, user_message) if risk_mode else None
 
-    assistant_answer = generate_answer(
-        llm, counselor_state, counsel_context, risk_mode, risk_pack, history_summary, user_message
-    )
-    new_summary = update_history_summary(llm, history_summary, user_message, assistant_answer)
+        assistant_answer = generate_answer(
+            router, counselor_state, counsel_context, risk_mode, risk_pack, history_summary, user_message, usage,
+            memory_context=memory_context,
+        )
+        # ✅ 로컬 요약기가 있으면 N턴마다만 LLM 요약, 나머지 턴은 로컬 추출 요약
+        if should_use_llm_summary(turn_index, SUMMARY_LLM_EVERY, summarizer):
+            new_summary = update_history_summary(router, history_summary, user_message, assistant_answer, usage)
+        else:
+            new_summary = summarizer.update(history_summary, user_message)
+
+    return {
+        "assistant_answer": assistant_answer,
+        "history_summary": new_summary,
+        "risk_mode": risk_mode,
+        "level": risk_pack.get("level") if risk_pack else None,
+        "fast_path": False,
+        "latency_ms": (time.perf_counter() - t0) * 1000,
+        "usage": usage,
+    }
 
-    return {"assistant_answer": assistant_answer, "history_summary": new_summary, "risk_mode": risk_mode}
+
+def elaborate_crisis_turn(
+    router: ModelRouter,
+    persona_rule: Dict[str, Any],
+    counsel_db: Chroma,
+    risk_db: Chroma,
+    history_summary: str,
+    user_message: str,
+    already_sent: str,
+    counsel_lexical: Optional[PlaybookLexicalIndex] = None,
+    memory_context: str = "",
+) -> Dict[str, Any]:
+    """즉시 응답 뒤 백그라운드에서 실행: 기존 위험 모드 경로(risk_pack + LLM)로 보충 답변 + 요약 갱신"""
+    usage: Dict[str, int] = {}
+    with call_context(risk=True):
+        counsel_context = get_counsel_context(counsel_db, history_summary, user_message, lexical=counsel_lexical)
+        risk_pack = build_risk_pack(risk_db, history_summary, user_message)
+        answer = generate_answer(
+            router, make_counselor_state_from_rule(persona_rule), counsel_context, True, risk_pack,
+            history_summary, user_message, usage, memory_context=memory_context, already_sent=already_sent,
+        )
+        new_summary = update_history_summary(router, history_summary, user_message, answer, usage)
+    return {"assistant_answer": answer, "history_summary": new_summary, "usage": usage}
 
 
 # =========================================================
@@ -901,6 +731,7 @@ def reset_chat():
     st.session_state.messages = []
     st.session_state.history_summary = "상담 시작. 초기 맥락 파악 단계."
     st.session_state.ever_risk = False
+    st.session_state.pop("crisis_jobs", None)
 
 
 def render_survey():
@@ -909,21 +740,25 @@ def render_survey():
 
     CHOICES = [1, 2, 3, 4, 5, 6, 7]
 
-    for i, idx in enumerate(st.session_state.order, start=1):
-        q = QUESTIONS[idx]
-        st.markdown(f"**{i}. {q['text']}**")
+    # ✅ form 안의 라디오는 클릭해도 rerun 되지 않고, 제출 시 한 번에 서버로 전달됨
+    with st.form("survey_form", border=False):
+        for i, idx in enumerate(st.session_state.order, start=1):
+            q = QUESTIONS[idx]
+            st.markdown(f"**{i}. {q['text']}**")
+
+            st.radio(
+                label="",
+                options=CHOICES,
+                horizontal=True,
+                key=q["key"],
+                index=None,  # ✅ 선택 안 하면 None
+            )
 
-        st.radio(
-            label="",
-            options=CHOICES,
-            horizontal=True,
-            key=q["key"],
-            index=None,  # ✅ 선택 안 하면 None
-        )
+            st.markdown("---")
 
-        st.markdown("---")
+        submitted = st.form_submit_button("다음 ▶ (결과 보기)", use_container_width=True)
 
-    if st.button("다음 ▶ (결과 보기)", use_container_width=True):
+    if submitted:
         # ✅ 미응답 체크
         missing = [q["key"] for q in QUESTIONS if st.session_state.get(q["key"]) is None]
         if missing:
@@ -935,82 +770,44 @@ def render_survey():
             q["key"]: st.session_state[q["key"]] for q in QUESTIONS
         }
         st.session_state.survey_completed = True
-        go_result()
-
-
-
-def draw_quadrant(self_model: float, other_model: float):
-    fig, ax = plt.subplots(figsize=(5.6, 3.4))
-    ax.set_xlim(0, 100)
-    ax.set_ylim(0, 100)
-
-    for spine in ax.spines.values():
-        spine.set_visible(False)
-    ax.set_xticks([])
-    ax.set_yticks([])
-
-    ax.axvline(50, color="black", linewidth=2.0, zorder=1)
-    ax.axhline(50, color="black", linewidth=2.0, zorder=1)
-
-    ax.text(25, 75, "불안형", ha="center", va="center", fontproperties=FP, fontsize=16)  
-    ax.text(75, 75, "안정형", ha="center", va="center", fontproperties=FP, fontsize=16)
-    ax.text(25, 25, "거부형", ha="center", va="center", fontproperties=FP, fontsize=16)
-    ax.text(75, 25, "회피형", ha="center", va="center", fontproperties=FP, fontsize=16)
-
-    ax.text(-10, 50, "타인에\n대한\n생각", ha="center", va="center", fontproperties=FP, fontsize=18, rotation=90)
-    ax.text(-10, 92, "긍정적", ha="center", va="center", fontproperties=FP, fontsize=12, rotation=90)
-    ax.text(-10, 8, "부정적", ha="center", va="center", fontproperties=FP, fontsize=12, rotation=90)
-
-    ax.text(50, -12, "자신에\n대한\n생각", ha="center", va="center", fontproperties=FP, fontsize=18)
-    ax.text(8, -12, "부정적", ha="left", va="center", fontproperties=FP, fontsize=12)
-    ax.text(92, -12, "긍정적", ha="right", va="center", fontproperties=FP, fontsize=12)
-
-    ax.scatter([self_model], [other_model], s=260, color="#F28C28", edgecolors="white", linewidths=2.5, zorder=3)
-
-    plt.tight_layout()
-    st.pyplot(fig)
-
-
-def score_to_pct_0_100(score_1_7: float) -> int:
-    return int(round((score_1_7 - 1) / 6 * 100))
-
-
-def draw_score_bar(ax, pct, left_end_label, right_end_label, title, font_prop):
-    """
-    pct: 0~100 (오른쪽으로 갈수록 높음)
-    - 배경 바(연한색) 위에 점수만큼 채우고
-    - 현재 위치를 세로선(marker)로 표시
-    """
-    pct = max(0, min(100, float(pct)))
-
-    ax.set_xlim(0, 100)
-    ax.set_ylim(0, 1)
-    ax.axis("off")
-
-    bar_h = 0.42
-    y = 0.5
-
-    bg_color = "#D7EAF6"     # 배경
-    fill_color = "#F28C28"   # 점수 채움
-
-    # 배경 바
-    ax.barh([y], [100], height=bar_h, left=0, zorder=1, color=bg_color)
-    # 채움(점수)
-    ax.barh([y], [pct], height=bar_h, left=0, zorder=2, color=fill_color)
 
-    # 현재 위치(세로선)
-    ax.vlines(pct, y - bar_h/2, y + bar_h/2, colors="white", linewidth=3, zorder=3)
-
-    # 제목/끝 라벨
-    ax.text(0, 1.05, title, ha="left", va="bottom", fontproperties=font_prop, fontsize=14)
-    ax.text(0, -0.15, left_end_label, ha="left", va="top", fontproperties=font_prop, fontsize=11)
-    ax.text(100, -0.15, right_end_label, ha="right", va="top", fontproperties=font_prop, fontsize=11)
+        # ✅ 점수 분포 스케치 갱신 (CUT/GRAY 재보정용, 실패해도 진행)
+        scores = compute_scores(st.session_state.survey_answers)
+        if THRESHOLD_SKETCH:
+            try:
+                get_threshold_sketches().record(scores)
+            except OSError:
+                pass
+
+        # ✅ 설문 응답 벡터 + 점수 + 유형 코드 기록 (버퍼에만 넣음, 청크 기록은 백그라운드)
+        if RESULT_LOG:
+            get_result_log().append("survey", {
+                **st.session_state.survey_answers,
+                "self_model": scores["self_model"],
+                "other_model": scores["other_model"],
+                "expression": scores["expression"],
+                "efficacy": scores["efficacy"],
+                "base": encode_category("base", scores["base"]),
+                "style": encode_category("style", scores["style"]),
+                "eff": encode_category("eff", scores["eff"]),
+            })
+
+        # ✅ user_profile 상태 문서 갱신 (버퍼 + 저널만, 임베딩/upsert 는 백그라운드 일괄)
+        uid = current_user_id()
+        writer = get_profile_writer() if PROFILE_WRITER and uid else None
+        if writer is not None:
+            writer.update(uid, {
+                "type_name": get_type_info(scores["base"], scores["style"], scores["eff"])["name"],
+                "attachment_type": scores["base"],
+                "emotion_reg": scores["style"],
+                "efficacy": scores["eff"],
+                "self_model": float(scores["self_model"]),
+                "other_model": float(scores["other_model"]),
+                "expression_score": float(scores["expression"]),
+                "efficacy_score": float(scores["efficacy"]),
+            })
+        go_result()
 
-    # 퍼센트 표시(커서 근처)
-    txt_x = pct + 1.5 if pct < 85 else pct - 1.5
-    ha = "left" if pct < 85 else "right"
-    ax.text(txt_x, y, f"{int(round(pct))}%", ha=ha, va="center",
-            fontproperties=font_prop, fontsize=13, color="black", zorder=4)
 
 
 def render_result():
@@ -1021,22 +818,10 @@ def render_result():
     else:
         answers = {q["key"]: st.session_state.get(q["key"], 4) for q in QUESTIONS}
 
-    self_pos = get_vals("self_pos", answers)
-    self_neg_raw = get_vals_raw("self_neg", answers)
-    other_pos = get_vals("other_pos", answers)
-    other_neg_raw = get_vals_raw("other_neg", answers)
-
-    self_model = internal_ratio(self_pos, self_neg_raw) * 100
-    other_model = internal_ratio(other_pos, other_neg_raw) * 100
-
-    expression = mean(get_vals("erq_expr", answers))
-    efficacy = mean(get_vals("eff", answers))
-
-    base = base_type(self_model, other_model)
-    style = expr_style(expression)
-
-    eff = hi_lo(efficacy)
-
+    scores = compute_scores(answers)
+    self_model, other_model = scores["self_model"], scores["other_model"]
+    expression, efficacy = scores["expression"], scores["efficacy"]
+    base, style, eff = scores["base"], scores["style"], scores["eff"]
 
     info = get_type_info(base, style, eff)
 
@@ -1139,20 +924,38 @@ def render_chat():
             f"- **톤**: {persona_rule.get('tone','')}\n"
             f"- **목표**: {persona_rule.get('goal','')}"
         )
+    # warm-up 이 진행 중이면 끝날 때까지 기다렸다가 (중복 로드 방지) 캐시된 리소스 사용
+    if not is_ready():
+        with st.spinner("상담 준비 중..."):
+            wait_ready(WARMUP_WAIT_TIMEOUT)
+
     # VectorDB/LLM 로드 (chat 모드에서만 시도)
     try:
         stores = load_vectorstores_only()
         counsel_db = stores["counsel_db"]
         risk_db = stores["risk_db"]
-        llm = get_llm()
+        counsel_lexical = load_counsel_lexical_index(counsel_db) if HYBRID_RETRIEVAL else None
+        summarizer = load_local_summarizer(counsel_db) if LOCAL_SUMMARY else None
+        memory = get_memory_store(counsel_db) if USER_MEMORY else None
+        router = get_model_router()
     except Exception as e:
         st.error(f"VectorDB/LLM 로드 실패: {e}")
         st.stop()
 
-    # 메시지 출력
-    for m in st.session_state.messages:
-        with st.chat_message(m["role"]):
-            st.write(m["content"])
+    # 운영용: ?ops=1 이면 스케줄러 대기열 지표 표시
+    if st.query_params.get("ops") == "1":
+        st.sidebar.json({name: sch.metrics() for name, sch in get_schedulers().items()})
+        st.sidebar.json({"warmup": warmup_status()})
+        st.sidebar.json({"model_router": router.metrics()})
+        st.sidebar.json({"singleflight": [g.metrics() for g in get_singleflight_groups().values()]})
+        if PROFILE_WRITER and get_profile_writer() is not None:
+            st.sidebar.json({"profile_writer": get_profile_writer().metrics()})
+
+    # ✅ 대화 내역 + 입력은 fragment: 한 턴마다 이 영역만 다시 실행/전송
+    apply_crisis_followup()
+    render_chat_transcript(router, persona_rule, counsel_db, risk_db, counsel_lexical, summarizer, memory)
+    if st.session_state.get("crisis_jobs"):
+        render_crisis_followup()
 
     # 종료 요약
     if end_chat:
@@ -1160,53 +963,210 @@ def render_chat():
             st.info("아직 대화가 없습니다.")
         else:
             summary = final_summary_fewshot(
-                llm=llm,
+                router=router,
                 history_summary=st.session_state.history_summary,
                 risk_mode=bool(st.session_state.get("ever_risk", False)),
             )
             st.subheader("✅ 상담 종료 요약")
             st.text(summary)
 
+            # ✅ 다음 상담에서 이어갈 수 있게 종료 요약을 기억으로 저장 (인증된 사용자만)
+            uid = current_user_id()
+            if memory is not None and uid and summary:
+                memory.add_episode(uid, summary)
+
+            # ✅ 요약 기반 사용자 상태 갱신 (write-behind, 이 rerun 에서는 VectorDB 쓰기 없음)
+            writer = get_profile_writer() if PROFILE_WRITER and uid else None
+            if writer is not None and summary:
+                fields = {"last_summary": summary[:SUMMARY_CHARS]}
+                if summarizer is not None:
+                    fields["recent_terms"] = ", ".join(summarizer.terms_in(summary)[:8])
+                writer.update(
+                    uid, fields,
+                    incr={"sessions": 1, "risk_sessions": int(bool(st.session_state.get("ever_risk", False)))},
+                )
+
+
+@st.fragment
+def render_chat_transcript(router, persona_rule, counsel_db, risk_db, counsel_lexical, summarizer, memory):
+    # 메시지 출력 (입력창 위에 고정된 컨테이너 → 새 메시지도 여기에 이어서 그림)
+    transcript = st.container()
+    with transcript:
+        for m in st.session_state.messages:
+            with st.chat_message(m["role"]):
+                st.write(m["content"])
+
     # 입력
     user_text = st.chat_input("지금 어떤 점이 가장 마음에 걸리세요?")
     if user_text:
         st.session_state.messages.append({"role": "user", "content": user_text})
-        with st.chat_message("user"):
+        with transcript, st.chat_message("user"):
             st.write(user_text)
 
-        out = run_turn(
-            llm=llm,
-            persona_rule=persona_rule,
-            counsel_db=counsel_db,
-            risk_db=risk_db,
-            history_summary=st.session_state.history_summary,
-            user_message=user_text,
-        )
+        memory_context = ""
+        uid = current_user_id()
+        if memory is not None and uid:
+            query = build_query(st.session_state.history_summary, user_text)
+            memory_context = memory.context(uid, query)
+
+        prev_summary = st.session_state.history_summary
+        # fragment 단독 rerun 에서는 라우팅의 call_context 밖이므로 여기서 다시 지정
+        with call_context(session_id=st.session_state.sid):
+            out = run_turn(
+                router=router,
+                persona_rule=persona_rule,
+                counsel_db=counsel_db,
+                risk_db=risk_db,
+                history_summary=st.session_state.history_summary,
+                user_message=user_text,
+                counsel_lexical=counsel_lexical,
+                summarizer=summarizer,
+                turn_index=user_turns() - 1,
+                memory_context=memory_context,
+                crisis_templates=load_crisis_templates_cached(DATA_DIR) if CRISIS_FAST_PATH else None,
+            )
 
         st.session_state.history_summary = out["history_summary"]
-        st.session_state.messages.append({"role": "assistant", "content": out["assistant_answer"]})
+        reply = {"role": "assistant", "content": out["assistant_answer"]}
+        st.session_state.messages.append(reply)
         st.session_state.ever_risk = st.session_state.ever_risk or bool(out.get("risk_mode", False))
 
-        with st.chat_message("assistant"):
+        if RESULT_LOG:
+            get_result_log().append("turn", {
+                "sid": st.session_state.sid,
+                "turn": user_turns(),
+                "risk_mode": int(out["risk_mode"]),
+                "level": encode_level(out.get("level")),
+                "latency_ms": out["latency_ms"],
+                "input_tokens": out["usage"].get("input_tokens", 0),
+                "output_tokens": out["usage"].get("output_tokens", 0),
+            })
+
+        # ✅ 이미 transcript 에 그렸으므로 추가 rerun 불필요
+        with transcript, st.chat_message("assistant"):
             st.write(out["assistant_answer"])
 
+        if out.get("fast_path") and CRISIS_ELABORATE:
+            # 즉시 응답 이후 LLM 보충 답변: 세션/우선순위 컨텍스트를 그대로 넘겨 백그라운드 실행
+            with call_context(session_id=st.session_state.sid):
+                ctx = contextvars.copy_context()
+            future = get_crisis_executor().submit(
+                ctx.run, elaborate_crisis_turn,
+                router, persona_rule, counsel_db, risk_db,
+                prev_summary, user_text, out["assistant_answer"],
+                counsel_lexical, memory_context,
+            )
+            # 보충 답변은 이 즉시 응답 바로 뒤에 끼워 넣음 (그 사이 다른 턴이 있어도 순서 유지)
+            job_id = uuid.uuid4().hex
+            reply["crisis_id"] = job_id
+            st.session_state.setdefault("crisis_jobs", {})[job_id] = {
+                "future": future, "summary_base": out["history_summary"],
+            }
+            # 완료 확인 fragment 는 fragment 밖에 있으므로 전체 rerun 1번으로 시작
+            st.rerun()
+
+
+def user_turns() -> int:
+    # 보충 답변이 끼어들 수 있으므로 메시지 수가 아니라 사용자 발화 수로 턴을 셈
+    return sum(1 for m in st.session_state.messages if m["role"] == "user")
+
+
+def apply_crisis_followup() -> None:
+    """완료된 보충 답변을 각 즉시 응답 바로 뒤에 반영 (transcript 를 그리기 전, 전체 실행에서만 호출)"""
+    jobs = st.session_state.get("crisis_jobs") or {}
+    for job_id, job in list(jobs.items()):
+        if not job["future"].done():
+            continue
+        jobs.pop(job_id)
+        try:
+            out = job["future"].result()
+        except Exception:
+            # 안전 안내는 이미 전달됨 → 보충 답변만 생략
+            continue
+        messages = st.session_state.messages
+        at = next((i for i, m in enumerate(messages) if m.get("crisis_id") == job_id), None)
+        if at is None:
+            continue  # 대화가 초기화됨
+        messages.insert(at + 1, {"role": "assistant", "content": out["assistant_answer"]})
+        # 그 사이 다음 턴이 진행됐으면 요약은 그대로 둠
+        if st.session_state.history_summary == job["summary_base"]:
+            st.session_state.history_summary = out["history_summary"]
+
+
+@st.fragment(run_every=CRISIS_POLL_SEC)
+def render_crisis_followup():
+    jobs = st.session_state.get("crisis_jobs") or {}
+    if not jobs:
+        return
+    if any(job["future"].done() for job in jobs.values()):
+        # 반영은 apply_crisis_followup 에서 (전체 rerun 1번)
         st.rerun()
+    st.caption("조금 더 자세한 답변을 이어서 준비하고 있어요…")
 
 
 # =========================================================
-# 9) 라우팅 (survey/chat)
+# 9) warm-up + 라우팅 (survey/chat)
 # =========================================================
-if "mode" not in st.session_state:
-    st.session_state.mode = "survey"
-
-init_survey_state()
-init_chat_state()
-
-if st.session_state.mode == "survey":
-    if st.session_state.survey_page == "survey":
-        render_survey()
+def _warmup_embedding_roundtrip():
+    stores = load_vectorstores_only()
+    stores["counsel_db"].similarity_search("warm-up", k=1, filter={"doc_type": "playbook"})
+
+
+def _warmup_tasks() -> List[WarmupTask]:
+    """로컬 로드만 (켜진 기능의 인덱스만), 임베딩 제공자 왕복은 WARMUP_EMBEDDING_PROBE 일 때만"""
+    tasks = [
+        ("persona_rules", lambda: load_persona_rules_cached(DATA_DIR)),
+        ("crisis_templates", lambda: load_crisis_templates_cached(DATA_DIR)),
+        ("font", lambda: get_font_prop(FONT_PATH)),
+        ("llm", get_model_router),
+        ("vectorstores", load_vectorstores_only),
+        ("risk_step_index", lambda: load_risk_step_index(load_vectorstores_only()["risk_db"])),
+    ]
+    if HYBRID_RETRIEVAL:
+        tasks.append(("counsel_lexical_index", lambda: load_counsel_lexical_index(load_vectorstores_only()["counsel_db"])))
+    if LOCAL_SUMMARY:
+        tasks.append(("local_summarizer", lambda: load_local_summarizer(load_vectorstores_only()["counsel_db"])))
+    if WARMUP_EMBEDDING_PROBE:
+        tasks.append(("embedding_roundtrip", _warmup_embedding_roundtrip))
+    return tasks
+
+
+if WARMUP_ON_START:
+    # ✅ 비밀번호/설문 화면을 보는 동안 백그라운드에서 미리 로드
+    start_warmup(_warmup_tasks(), ready_file=READY_FILE)
+
+try:
+    require_password()
+
+    if "mode" not in st.session_state:
+        st.session_state.mode = "survey"
+    if "sid" not in st.session_state:
+        st.session_state.sid = uuid.uuid4().hex  # 스케줄러 공정 큐 키
+
+    init_survey_state()
+    init_chat_state()
+
+    if st.session_state.mode == "survey":
+        if st.session_state.survey_page == "survey":
+            render_survey()
+        else:
+            render_result()
     else:
-        render_result()
-else:
-    render_chat()
+        with call_context(session_id=st.session_state.sid):
+            render_chat()
+
+    # 운영용: MEM_PROFILE=1 + ?ops=1 이면 세션별 크기 / 상위 할당 위치 표시
+    if MEM_PROFILE and st.query_params.get("ops") == "1":
+        with st.sidebar.expander("🧠 메모리 프로파일", expanded=False):
+            if st.button("지금 스냅샷", key="mem_snapshot"):
+                get_mem_profiler().record_session(st.session_state.sid, st.session_state.to_dict(), force=True)
+                get_mem_profiler().snapshot()
+            st.json(get_mem_profiler().latest() or {"status": "첫 스냅샷 대기 중"})
+finally:
+    # ✅ rerun 이 끝난 시점의 session_state 크기 기록 (세션/프로세스 모두 MEM_PROFILE_INTERVAL 마다 1번, 백그라운드)
+    if MEM_PROFILE and "sid" in st.session_state:
+        get_mem_profiler().record_async(st.session_state.sid, st.session_state.to_dict())
+    if LOG_RERUN_TIMING:
+        elapsed_ms = 1000 * (time.perf_counter() - _RERUN_T0)
+        print(f"[rerun] mode={st.session_state.get('mode')} {elapsed_ms:.1f}ms", flush=True)
     
@@ -0,0 +1,100 @@
+import os
+from functools import lru_cache
+
+import matplotlib.font_manager as fm
+import matplotlib.pyplot as plt
+import streamlit as st
+
+from config import FONT_PATH
+
+
+# =========================================================
+# 폰트 + 결과 그래프
+# =========================================================
+@lru_cache(maxsize=None)
+def get_font_prop(font_path: str) -> fm.FontProperties:
+    try:
+        if os.path.isfile(font_path):
+            return fm.FontProperties(fname=font_path)
+    except Exception:
+        pass
+    return fm.FontProperties()  # fallback
+
+
+FP = get_font_prop(FONT_PATH)
+
+
+def draw_quadrant(self_model: float, other_model: float):
+    fig, ax = plt.subplots(figsize=(5.6, 3.4))
+    ax.set_xlim(0, 100)
+    ax.set_ylim(0, 100)
+
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.set_xticks([])
+    ax.set_yticks([])
+
+    ax.axvline(50, color="black", linewidth=2.0, zorder=1)
+    ax.axhline(50, color="black", linewidth=2.0, zorder=1)
+
+    ax.text(25, 75, "불안형", ha="center", va="center", fontproperties=FP, fontsize=16)  
+    ax.text(75, 75, "안정형", ha="center", va="center", fontproperties=FP, fontsize=16)
+    ax.text(25, 25, "거부형", ha="center", va="center", fontproperties=FP, fontsize=16)
+    ax.text(75, 25, "회피형", ha="center", va="center", fontproperties=FP, fontsize=16)
+
+    ax.text(-10, 50, "타인에\n대한\n생각", ha="center", va="center", fontproperties=FP, fontsize=18, rotation=90)
+    ax.text(-10, 92, "긍정적", ha="center", va="center", fontproperties=FP, fontsize=12, rotation=90)
+    ax.text(-10, 8, "부정적", ha="center", va="center", fontproperties=FP, fontsize=12, rotation=90)
+
+    ax.text(50, -12, "자신에\n대한\n생각", ha="center", va="center", fontproperties=FP, fontsize=18)
+    ax.text(8, -12, "부정적", ha="left", va="center", fontproperties=FP, fontsize=12)
+    ax.text(92, -12, "긍정적", ha="right", va="center", fontproperties=FP, fontsize=12)
+
+    ax.scatter([self_model], [other_model], s=260, color="#F28C28", edgecolors="white", linewidths=2.5, zorder=3)
+
+    plt.tight_layout()
+    # ✅ rerun 마다 새 Figure 가 pyplot 전역 목록에 쌓이지 않도록 그린 뒤 닫기
+    st.pyplot(fig, clear_figure=True)
+    plt.close(fig)
+
+
+def score_to_pct_0_100(score_1_7: float) -> int:
+    return int(round((score_1_7 - 1) / 6 * 100))
+
+
+def draw_score_bar(ax, pct, left_end_label, right_end_label, title, font_prop):
+    """
+    pct: 0~100 (오른쪽으로 갈수록 높음)
+    - 배경 바(연한색) 위에 점수만큼 채우고
+    - 현재 위치를 세로선(marker)로 표시
+    """
+    pct = max(0, min(100, float(pct)))
+
+    ax.set_xlim(0, 100)
+    ax.set_ylim(0, 1)
+    ax.axis("off")
+
+    bar_h = 0.42
+    y = 0.5
+
+    bg_color = "#D7EAF6"     # 배경
+    fill_color = "#F28C28"   # 점수 채움
+
+    # 배경 바
+    ax.barh([y], [100], height=bar_h, left=0, zorder=1, color=bg_color)
+    # 채움(점수)
+    ax.barh([y], [pct], height=bar_h, left=0, zorder=2, color=fill_color)
+
+    # 현재 위치(세로선)
+    ax.vlines(pct, y - bar_h/2, y + bar_h/2, colors="white", linewidth=3, zorder=3)
+
+    # 제목/끝 라벨
+    ax.text(0, 1.05, title, ha="left", va="bottom", fontproperties=font_prop, fontsize=14)
+    ax.text(0, -0.15, left_end_label, ha="left", va="top", fontproperties=font_prop, fontsize=11)
+    ax.text(100, -0.15, right_end_label, ha="right", va="top", fontproperties=font_prop, fontsize=11)
+
+    # 퍼센트 표시(커서 근처)
+    txt_x = pct + 1.5 if pct < 85 else pct - 1.5
+    ha = "left" if pct < 85 else "right"
+    ax.text(txt_x, y, f"{int(round(pct))}%", ha=ha, va="center",
+            fontproperties=font_prop, fontsize=13, color="black", zorder=4)
@@ -0,0 +1,189 @@
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from survey import CUT
+
+
+# =========================================================
+# 커플 궁합 점수 (설문 점수 2개 → 0~100)
+# - 프로필 특징 4개 (0~1): 자기 모형, 타인 모형, 감정 표현, 자기효능감
+# - 구성 요소
+#     안정성   : 두 사람 자기/타인 모형 평균 (높을수록 관계 기반이 안정적)
+#     표현 궁합: 1 - |표현 점수 차이| (한쪽만 표현하고 한쪽은 억제하면 갈등이 커지기 쉬움)
+#     효능감   : 두 사람 효능감 평균 (함께 문제를 풀어갈 힘)
+#     추격–회피: 불안(1-자기) × 회피(1-타인) 조합 → 감점
+# - 대량 매칭: N×M 행렬을 numpy broadcasting 으로 한 번에 (행 묶음 단위로 메모리 상한),
+#   사용자별 top-k 는 argpartition
+# =========================================================
+FEATURES = ("self_model", "other_model", "expression", "efficacy")
+
+W_SECURITY = 0.40
+W_EXPRESSION = 0.25
+W_EFFICACY = 0.20
+W_TRAP = 0.30
+_W_RANGE = W_SECURITY + W_EXPRESSION + W_EFFICACY + W_TRAP
+
+TRAP_NOTE_AT = 0.25
+MAX_CHUNK_CELLS = 4_000_000   # 한 번에 계산하는 (행 × 열) 칸 수 상한 (float32 기준 16MB/배열)
+
+
+def to_features(scores: Dict[str, Any]) -> np.ndarray:
+    """compute_scores 결과 → [자기, 타인, 표현, 효능감] (0~1)
+    값이 열 배열(result_log.scan)이면 (N, 4) 행렬"""
+    return np.stack([
+        np.asarray(scores["self_model"], dtype=np.float32) / 100.0,
+        np.asarray(scores["other_model"], dtype=np.float32) / 100.0,
+        (np.asarray(scores["expression"], dtype=np.float32) - 1.0) / 6.0,
+        (np.asarray(scores["efficacy"], dtype=np.float32) - 1.0) / 6.0,
+    ], axis=-1)
+
+
+def to_matrix(scores_list: Sequence[Dict[str, Any]]) -> np.ndarray:
+    if not scores_list:
+        return np.empty((0, len(FEATURES)), dtype=np.float32)
+    return np.stack([to_features(s) for s in scores_list])
+
+
+def components(a: np.ndarray, b: np.ndarray) -> Dict[str, np.ndarray]:
+    """a: (N,1,4) 또는 (4,), b: (1,M,4) 또는 (4,) → 구성 요소별 (N,M) 또는 스칼라"""
+    sa, oa, ea, fa = (a[..., i] for i in range(4))
+    sb, ob, eb, fb = (b[..., i] for i in range(4))
+    return {
+        "security": (sa + oa + sb + ob) / 4.0,
+        "expression_fit": 1.0 - np.abs(ea - eb),
+        "efficacy": (fa + fb) / 2.0,
+        # 불안한 쪽이 다가가고 회피하는 쪽이 물러서는 패턴 (양방향 평균)
+        "pursue_withdraw": ((1.0 - sa) * (1.0 - ob) + (1.0 - sb) * (1.0 - oa)) / 2.0,
+    }
+
+
+def combine(c: Dict[str, np.ndarray]) -> np.ndarray:
+    raw = (
+        W_SECURITY * c["security"]
+        + W_EXPRESSION * c["expression_fit"]
+        + W_EFFICACY * c["efficacy"]
+        - W_TRAP * c["pursue_withdraw"]
+    )
+    return (raw + W_TRAP) / _W_RANGE * 100.0
+
+
+def pair_matrix(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """(N,4) × (M,4) → (N,M) 궁합 점수 (combine(components(...)) 와 같은 값)
+
+    안정성/효능감은 사람별 값의 합으로 나뉘므로 행/열 벡터로 미리 계산하고,
+    (N,M) 연산은 표현 차이와 추격–회피 외적 2개만 수행
+    """
+    A = A.astype(np.float32, copy=False)
+    B = B.astype(np.float32, copy=False)
+    u_a = W_SECURITY * (A[:, 0] + A[:, 1]) / 4.0 + W_EFFICACY * A[:, 3] / 2.0
+    u_b = W_SECURITY * (B[:, 0] + B[:, 1]) / 4.0 + W_EFFICACY * B[:, 3] / 2.0
+
+    out = np.abs(A[:, 2:3] - B[None, :, 2])
+    out *= -W_EXPRESSION
+    out += u_a[:, None] + (u_b + W_EXPRESSION + W_TRAP)[None, :]
+    out -= (W_TRAP / 2.0) * np.outer(1.0 - A[:, 0], 1.0 - B[:, 1])
+    out -= (W_TRAP / 2.0) * np.outer(1.0 - A[:, 1], 1.0 - B[:, 0])
+    out *= 100.0 / _W_RANGE
+    return out
+
+
+def top_k_matches(
+    A: np.ndarray,
+    B: np.ndarray,
+    k: int = 5,
+    same_set: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """행(A)마다 B 에서 점수 상위 k 명 → (indices (N,k), scores (N,k)), 점수 내림차순
+
+    same_set=True 면 A 와 B 가 같은 사용자 집합 → 자기 자신은 제외
+    """
+    n, m = len(A), len(B)
+    k = max(0, min(k, m - 1 if same_set else m))    # 빈 입력/1명이면 0 → 빈 결과
+    idx_out = np.empty((n, k), dtype=np.int64)
+    score_out = np.empty((n, k), dtype=np.float32)
+    if k <= 0:
+        return idx_out, score_out
+
+    rows = max(1, MAX_CHUNK_CELLS // max(1, m))
+    for s in range(0, n, rows):
+        block = pair_matrix(A[s:s + rows], B)
+        if same_set:
+            r = np.arange(block.shape[0])
+            block[r, s + r] = -np.inf
+        part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(block, part, axis=1)
+        order = np.argsort(-part_scores, axis=1)
+        idx_out[s:s + rows] = np.take_along_axis(part, order, axis=1)
+        score_out[s:s + rows] = np.take_along_axis(part_scores, order, axis=1)
+    return idx_out, score_out
+
+
+def pair_report(a_scores: Dict[str, Any], b_scores: Dict[str, Any]) -> Dict[str, Any]:
+    """두 사람 궁합 점수 + 구성 요소 + 짧은 해설 (대량 계산과 같은 식 사용)"""
+    a, b = to_features(a_scores), to_features(b_scores)
+    c = components(a, b)
+    score = float(combine(c))
+
+    notes: List[str] = []
+    if float(c["pursue_withdraw"]) >= TRAP_NOTE_AT:
+        notes.append("한쪽은 다가가고 다른 쪽은 물러서는(추격–회피) 패턴이 생기기 쉬워요.")
+    if (a_scores["expression"] >= CUT) != (b_scores["expression"] >= CUT):
+        notes.append("감정 표현 방식이 달라요. 표현하는 쪽은 서운함을, 억제하는 쪽은 부담을 느끼기 쉬워요.")
+    if a_scores["efficacy"] < CUT and b_scores["efficacy"] < CUT:
+        notes.append("둘 다 효능감이 낮은 편이라, 작은 합의부터 함께 성공해 보는 경험이 도움이 돼요.")
+    if float(c["security"]) >= 0.5 and not notes:
+        notes.append("서로에 대한 기본 신뢰가 안정적인 조합이에요.")
+
+    return {
+        "score": round(score, 1),
+        "components": {k: round(float(v), 3) for k, v in c.items()},
+        "types": [(s["base"], s["style"], s["eff"]) for s in (a_scores, b_scores)],
+        "notes": notes,
+    }
+
+
+# =========================================================
+# CLI
+# - bench: 무작위 프로필 N×M 매칭 시간
+# - match: result_log 설문 행 전체를 서로 매칭 (행 번호 기준)
+# =========================================================
+def _random_features(n: int, rng: np.random.Generator) -> np.ndarray:
+    return rng.uniform(0.0, 1.0, size=(n, len(FEATURES))).astype(np.float32)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="커플 궁합 점수 대량 계산")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("bench")
+    b.add_argument("--n", type=int, default=20000)
+    b.add_argument("--m", type=int, default=20000)
+    b.add_argument("--k", type=int, default=5)
+    mt = sub.add_parser("match")
+    mt.add_argument("--log-dir", default=None, help="result_log 디렉터리 (기본 stats/result_log)")
+    mt.add_argument("--k", type=int, default=5)
+    mt.add_argument("--limit", type=int, default=20, help="출력할 행 수")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "bench":
+        rng = np.random.default_rng(0)
+        A, B = _random_features(args.n, rng), _random_features(args.m, rng)
+        t0 = time.perf_counter()
+        idx, scores = top_k_matches(A, B, args.k)
+        dt = time.perf_counter() - t0
+        print(f"[bench] {args.n}×{args.m} pairs, top-{args.k}: {dt:.2f}s ({args.n * args.m / dt / 1e6:.1f}M pairs/s)")
+    else:
+        from result_log import DEFAULT_LOG_DIR, scan
+
+        cols = scan(args.log_dir or str(DEFAULT_LOG_DIR), "survey", list(FEATURES))
+        A = to_features(cols)
+        idx, scores = top_k_matches(A, A, args.k, same_set=True)
+        for i in range(min(args.limit, len(A))):
+            print(json.dumps({"row": i, "matches": idx[i].tolist(), "scores": np.round(scores[i], 1).tolist()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+from pathlib import Path
+
+import streamlit as st
+from dotenv import load_dotenv
+from streamlit.errors import StreamlitSecretNotFoundError
+
+
+# =========================================================
+# 경로/설정 (⭐ 여기만 수정)
+# - 모듈이라 프로세스당 1번만 실행됨 (app.py rerun 마다 다시 읽지 않음)
+# =========================================================
+def get_secret(key: str, default=None):
+    """secrets.toml이 없어도 터지지 않게 안전하게 읽기"""
+    try:
+        return st.secrets.get(key, default)
+    except StreamlitSecretNotFoundError:
+        return default
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+ENV_PATH = PROJECT_ROOT / ".env"
+PERSONA_JSON_PATH = PROJECT_ROOT / "data" / "persona_rules.json"
+# VectorDB 위치 (테스트/복사본용으로 환경변수 PERSIST_ROOT 로만 바꿀 수 있음)
+PERSIST_ROOT = Path(os.getenv("PERSIST_ROOT") or PROJECT_ROOT / "chroma_store")
+DATA_DIR = str(PERSONA_JSON_PATH.parent)
+
+# 폰트는 있으면 사용, 없으면 fallback
+FONT_PATH = str(PROJECT_ROOT / "assets" / "Freesentation-6SemiBold.ttf")
+
+COL_USER_PROFILE = "user_profile"
+COL_COUNSEL_DB = "counsel_db"
+COL_RISK_PROTOCOL = "risk_protocol"
+
+PERSIST_USER = str(PERSIST_ROOT / COL_USER_PROFILE)
+PERSIST_COUNSEL = str(PERSIST_ROOT / COL_COUNSEL_DB)
+PERSIST_RISK = str(PERSIST_ROOT / COL_RISK_PROTOCOL)
+
+# shared_index.py export 결과 (VECTOR_STORE_MODE=mmap 일 때 사용)
+MMAP_ROOT = str(PROJECT_ROOT / "index_mmap")
+
+# data_bundle.py build 결과 (없거나 원본 JSON 이 더 새로우면 JSON 을 읽음)
+DATA_BUNDLE_PATH = str(PROJECT_ROOT / "data_bundle.bin")
+
+# partitioned_store.py build 결과 (VECTOR_STORE_MODE=partitioned 일 때 사용)
+PARTITION_ROOT = str(PROJECT_ROOT / "chroma_partitioned")
+
+EMBED_MODEL = "text-embedding-3-large"
+CHAT_MODEL = "gpt-5-mini"
+
+# ✅ 배포/로컬 겸용: 환경변수 주입
+# - 로컬: .env 사용
+# - 배포(Streamlit Cloud): st.secrets 사용
+openai_key = get_secret("OPENAI_API_KEY", None)
+if openai_key:
+    os.environ["OPENAI_API_KEY"] = openai_key
+
+load_dotenv(dotenv_path=str(ENV_PATH))
+
+
+def get_setting(key: str, default=None):
+    """st.secrets → 환경변수(.env 포함) 순으로 읽기"""
+    return get_secret(key, None) or os.getenv(key, default)
+
+
+def get_flag(key: str, default: str = "0") -> bool:
+    return str(get_setting(key, default)) in ("1", "true", "True")
+
+
+# LLM 백엔드: "langchain"(기본, ChatOpenAI) / "async"(llm_client.AsyncLLMClient)
+LLM_BACKEND = get_setting("LLM_BACKEND", "langchain")
+LLM_HEDGE = get_flag("LLM_HEDGE", "0")
+LLM_TIMEOUT = float(get_setting("LLM_TIMEOUT", "60"))
+
+# 모델 티어 라우팅 (model_router.py)
+# - fast: 요약 유지/짧은 일반 턴, strong: 위험 턴/종료 요약/긴 턴
+# - MODEL_ROUTES: 호출 위치별 fast/strong/auto 덮어쓰기 (예: "answer=strong,final_summary=fast")
+# - strong p95 지연(ms) 또는 시간창 지출(USD)이 예산을 넘으면 위험 모드 외 호출은 fast 로 (0 = 끔)
+# - 기본값은 두 티어 모두 CHAT_MODEL (동작 변화 없음) → 품질 비교 후 CHAT_MODEL_FAST 를 따로 지정
+CHAT_MODEL_FAST = get_setting("CHAT_MODEL_FAST", CHAT_MODEL)
+CHAT_MODEL_STRONG = get_setting("CHAT_MODEL_STRONG", CHAT_MODEL)
+MODEL_ROUTES = get_setting("MODEL_ROUTES", "")
+ROUTE_SHORT_TURN_CHARS = int(get_setting("ROUTE_SHORT_TURN_CHARS", "40"))
+LLM_P95_BUDGET_MS = float(get_setting("LLM_P95_BUDGET_MS", "0"))
+LLM_SPEND_BUDGET_USD = float(get_setting("LLM_SPEND_BUDGET_USD", "0"))
+LLM_SPEND_WINDOW_SEC = float(get_setting("LLM_SPEND_WINDOW_SEC", "3600"))
+
+# 프로세스 공용 호출 스케줄러 (동시 실행 수 / 초당 요청 수)
+# - SCHEDULER_SHARED_DB 를 지정하면 같은 파일을 보는 워커 프로세스끼리 초당 한도를 공유
+LLM_MAX_CONCURRENCY = int(get_setting("LLM_MAX_CONCURRENCY", "8"))
+LLM_RPS = float(get_setting("LLM_RPS", "5"))
+EMBED_MAX_CONCURRENCY = int(get_setting("EMBED_MAX_CONCURRENCY", "8"))
+EMBED_RPS = float(get_setting("EMBED_RPS", "20"))
+SCHEDULER_SHARED_DB = get_setting("SCHEDULER_SHARED_DB", None)
+SCHEDULER_WAIT_TIMEOUT = float(get_setting("SCHEDULER_WAIT_TIMEOUT", "120"))
+
+# 진행 중인 동일 임베딩/LLM 요청 합치기 (singleflight.py)
+SINGLE_FLIGHT = get_flag("SINGLE_FLIGHT", "1")
+
+# 벡터스토어: "chroma"(기본, 워커마다 Chroma 클라이언트) / "mmap"(공유 읽기 전용 인덱스)
+#            / "quant"(mmap + 축소 차원 양자화 후보 검색 → float 재정렬, quant_index.py build 필요)
+#            / "partitioned"(doc_type 별 분할 Chroma 색인 + 라우터, filter 후처리 없음)
+VECTOR_STORE_MODE = get_setting("VECTOR_STORE_MODE", "chroma")
+QUANT_DIM = int(get_setting("QUANT_DIM", "256"))
+QUANT_KIND = get_setting("QUANT_KIND", "int8")
+QUANT_OVERSAMPLE = int(get_setting("QUANT_OVERSAMPLE", "8"))
+
+# warm-up (프로세스의 첫 세션 스크립트 실행 시 백그라운드로 1회 — Streamlit 에 프로세스 시작 hook 이 없음)
+# - 기본 끔: 켜면 배포 직후 첫 접속자의 비밀번호/설문 화면 동안 인덱스/클라이언트를 미리 로드
+# - WARMUP_EMBEDDING_PROBE: 임베딩 제공자 왕복 1번까지 (실제 API 요청, 인덱스 로드와 별도로 opt-in)
+WARMUP_ON_START = get_flag("WARMUP_ON_START", "0")
+WARMUP_EMBEDDING_PROBE = get_flag("WARMUP_EMBEDDING_PROBE", "0")
+WARMUP_WAIT_TIMEOUT = float(get_setting("WARMUP_WAIT_TIMEOUT", "120"))
+READY_FILE = get_setting("READY_FILE", None)
+
+# counsel_db 하이브리드 검색 (playbook 키워드 BM25 + 벡터, RRF 결합)
+# - 기본 끔: 키워드가 확실하면 임베딩 호출을 건너뛰므로 검색 결과가 달라짐 → 기존 벡터 검색과 품질 비교 후 켤 것
+HYBRID_RETRIEVAL = get_flag("HYBRID_RETRIEVAL", "0")
+
+# 검색 개수 (hnsw_tuner.py SEARCH_PROFILES 와 맞출 것)
+COUNSEL_K = int(get_setting("COUNSEL_K", "4"))
+COUNSEL_CANDIDATES = int(get_setting("COUNSEL_CANDIDATES", "10"))
+RISK_LEVEL_K = int(get_setting("RISK_LEVEL_K", "3"))
+RISK_STEP_K = int(get_setting("RISK_STEP_K", "2"))
+
+# HNSW 검색 파라미터는 색인에 저장 (python hnsw_tuner.py tune --apply / rebuild, 앱 로드 시에는 쓰지 않음)
+
+# history_summary 로컬 추출 요약 (LLM 요약은 SUMMARY_LLM_EVERY 턴마다만)
+LOCAL_SUMMARY = get_flag("LOCAL_SUMMARY", "0")
+SUMMARY_LLM_EVERY = int(get_setting("SUMMARY_LLM_EVERY", "4"))
+
+# 고위험 Level 즉시 응답 (crisis_path.py, LLM/임베딩 없이 t07 Step 문장으로 바로 응답)
+# - 기본은 L3 만 (L2 는 기존 risk_protocol 검색 + strong 티어 LLM 답변 유지)
+# - CRISIS_ELABORATE: 이어서 LLM 보충 답변을 백그라운드로 생성, CRISIS_POLL_SEC 마다 완료 확인
+CRISIS_FAST_PATH = get_flag("CRISIS_FAST_PATH", "1")
+CRISIS_FAST_LEVELS = tuple(x.strip() for x in get_setting("CRISIS_FAST_LEVELS", "L3").split(",") if x.strip())
+CRISIS_ELABORATE = get_flag("CRISIS_ELABORATE", "1")
+CRISIS_POLL_SEC = float(get_setting("CRISIS_POLL_SEC", "1.0"))
+
+# 사용자별 장기 기억 (상담 종료 요약 저장 → 다음 상담 프롬프트에 top-k)
+# - ?uid= 는 USER_ID_SECRET 로 서명한 토큰만 인정 (python memory_store.py sign <uid>)
+#   secret 이 없거나 서명이 틀리면 기억/user_state 를 읽지도 쓰지도 않음
+USER_MEMORY = get_flag("USER_MEMORY", "0")
+USER_ID_SECRET = get_setting("USER_ID_SECRET", "")
+MEMORY_DIR = get_setting("MEMORY_DIR", str(PROJECT_ROOT / "user_memory"))
+
+# user_profile 컬렉션 write-behind (설문 점수/상담 종료 요약 → user_state 문서, VECTOR_STORE_MODE=chroma 일 때만)
+PROFILE_WRITER = get_flag("PROFILE_WRITER", "1")
+PROFILE_JOURNAL_DIR = get_setting("PROFILE_JOURNAL_DIR", str(PROJECT_ROOT / "profile_journal"))
+PROFILE_FLUSH_INTERVAL = float(get_setting("PROFILE_FLUSH_INTERVAL", "5"))
+PROFILE_MAX_BATCH = int(get_setting("PROFILE_MAX_BATCH", "32"))
+
+# 설문 점수 분위수 스케치 (CUT/GRAY 재보정용, python threshold_sketch.py report)
+THRESHOLD_SKETCH = get_flag("THRESHOLD_SKETCH", "1")
+SKETCH_DIR = get_setting("SKETCH_DIR", str(PROJECT_ROOT / "stats" / "sketches"))
+
+# 설문 결과 / 턴 메타데이터 컬럼 로그 (python result_log.py summary)
+RESULT_LOG = get_flag("RESULT_LOG", "1")
+RESULT_LOG_DIR = get_setting("RESULT_LOG_DIR", str(PROJECT_ROOT / "stats" / "result_log"))
+# 작은 청크 병합 주기(초, 0 = 끔) — 여러 워커 중 lock 을 얻은 1개만 실행
+RESULT_LOG_COMPACT_INTERVAL = float(get_setting("RESULT_LOG_COMPACT_INTERVAL", "3600"))
+
+# 세션별 session_state 크기 + tracemalloc 상위 할당 위치 (?ops=1 사이드바, JSONL 기록, python mem_profile.py report)
+# 비용: tracemalloc 은 켜져 있는 동안 모든 할당을 추적 (메모리/CPU 오버헤드), 세션 deep size 순회는 최대 20만 객체
+#   → 순회와 스냅샷은 백그라운드 스레드에서 MEM_PROFILE_INTERVAL 마다 (rerun 은 기다리지 않음), 진단할 때만 켤 것
+MEM_PROFILE = get_flag("MEM_PROFILE", "0")
+MEM_PROFILE_INTERVAL = float(get_setting("MEM_PROFILE_INTERVAL", "60"))
+MEM_PROFILE_DUMP = get_setting("MEM_PROFILE_DUMP", str(PROJECT_ROOT / "stats" / "mem_profile.jsonl"))
+MEM_PROFILE_FRAMES = int(get_setting("MEM_PROFILE_FRAMES", "1"))
+
+# rerun 1회당 스크립트 실행 시간 로그 (성능 확인용)
+LOG_RERUN_TIMING = get_flag("LOG_RERUN_TIMING", "0")
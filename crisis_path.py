@@ -0,0 +1,193 @@
+import argparse
+import re
+import socket
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+from data_bundle import DEFAULT_BUNDLE_PATH, load_dataset, open_bundle
+from risk import L3_TRIGGER_GROUPS, LEVEL_PATTERNS, RISK_BADGE, assign_level, parse_required_steps_from_text
+
+
+# =========================================================
+# 고위험 Level 즉시 응답 (LLM/임베딩 호출 없음)
+# - t06(Level → 필수 Step) / t07(Step → [내용] 문장)을 데이터 번들(없으면 JSON)에서 1번 읽어 템플릿으로 보관
+# - 즉시 템플릿에는 안정·안내 Step 문장만 (경계 설정/종료 Step 은 맥락 없이 첫 답으로 보내면 거절처럼 들림
+#   → 해당 내용은 LLM 보충 답변이 맥락과 함께 다룸)
+# - 발화 Level 은 risk.assign_level (정규식) → FAST_LEVELS 면 Step 문장을 이어붙여 바로 응답
+#   기본은 L3 만 (L2 는 risk_protocol 검색 + LLM 답변 경로 유지)
+# - 안전 확보 Step 의 긴급 연락처는 걸린 표현 묶음별 (자해·자살 → 1393, 폭력 → 112/1366)
+# - LLM 보충 답변은 app.py 에서 백그라운드로 이어서 생성 (실패해도 안전 안내는 이미 전달됨)
+# - SLO 확인: python crisis_path.py slo --p99-ms 5   (네트워크 차단 상태로 측정)
+# =========================================================
+DEFAULT_FAST_LEVELS = ("L3",)
+
+# 즉시 템플릿에서 빼는 Step (t07 Step 이름 기준)
+INSTANT_SKIP_STEPS = ("경계 설정", "관계 정렬")
+
+# 긴급 연락처를 안내하는 Step — 문장을 risk.L3_TRIGGER_GROUPS 묶음별 문장으로 바꿔 끼움
+# (t07 원문은 자살예방 1393 / 정신건강위기 1577-0199 → self_harm 은 원문 그대로)
+SAFETY_STEP = "안전 확보"
+HOTLINE_LINES: Dict[str, str] = {
+    "violence": "지금 몸이 위험하다면 112에 바로 신고하시고, 1366(여성긴급전화, 24시간)에서도 도움을 받을 수 있어요.",
+}
+_GROUP_REGEX = {g: re.compile("|".join(f"(?:{p})" for p in pats)) for g, pats in L3_TRIGGER_GROUPS.items()}
+
+_CONTENT_RE = re.compile(r"\[내용\]\s*(.+)")
+_STEP_NAME_RE = re.compile(r"^\[STEP_\d+\]\s*(.+)$", re.M)
+_QUOTES = "“”\"'"
+
+
+def _step_sentence(page_content: str) -> str:
+    m = _CONTENT_RE.search(page_content or "")
+    return m.group(1).strip().strip(_QUOTES).strip() if m else ""
+
+
+def _step_name(page_content: str) -> str:
+    m = _STEP_NAME_RE.search(page_content or "")
+    return m.group(1).strip() if m else ""
+
+
+def load_crisis_templates(
+    data_dir: str,
+    bundle: Any = None,
+    skip_steps: Sequence[str] = INSTANT_SKIP_STEPS,
+) -> Dict[str, Dict[str, object]]:
+    """Level → {"steps": [템플릿에 넣은 STEP_n...], "text": 템플릿 응답,
+    "variants": {"self_harm" / "violence" / "self_harm+violence": 연락처를 바꾼 응답}}"""
+    levels = load_dataset(data_dir, "t06_risk_map", bundle)
+    steps = load_dataset(data_dir, "t07_risk_steps", bundle)
+
+    sentences: Dict[str, str] = {}
+    safety_sid = ""
+    for d in steps:
+        sid = str((d.get("metadata") or {}).get("step_id") or "").upper()
+        text = _step_sentence(d.get("page_content", ""))
+        name = _step_name(d.get("page_content", ""))
+        if sid and text and name not in skip_steps:
+            sentences[sid] = text
+            if name == SAFETY_STEP:
+                safety_sid = sid
+
+    templates: Dict[str, Dict[str, object]] = {}
+    for d in levels:
+        md = d.get("metadata") or {}
+        level = str((md.get("keys") or {}).get("level") or "")
+        if not level:
+            continue
+        # required_steps 는 data_bundle 정규화로 항상 ["STEP_n", ...]
+        step_ids = md.get("required_steps") or parse_required_steps_from_text(d.get("page_content", ""))
+        sent = [s for s in step_ids if s in sentences]
+        lines = [sentences[s] for s in sent]
+        if not lines:
+            continue
+        variants: Dict[str, str] = {}
+        if safety_sid in sent:
+            i = sent.index(safety_sid)
+            for key in ("self_harm", "violence", "self_harm+violence"):
+                hotline = [HOTLINE_LINES.get(g, lines[i]) for g in key.split("+")]
+                variants[key] = f"{RISK_BADGE}\n\n" + "\n".join(lines[:i] + hotline + lines[i + 1:])
+        templates[level] = {"steps": sent, "text": f"{RISK_BADGE}\n\n" + "\n".join(lines), "variants": variants}
+    return templates
+
+
+def _trigger_key(user_message: str) -> str:
+    """걸린 L3 표현 묶음 → variants 키 (없으면 "")"""
+    return "+".join(g for g, rx in _GROUP_REGEX.items() if rx.search(user_message or ""))
+
+
+def crisis_response(
+    user_message: str,
+    templates: Dict[str, Dict[str, object]],
+    fast_levels: Sequence[str] = DEFAULT_FAST_LEVELS,
+) -> Optional[Dict[str, object]]:
+    """고위험 Level 이면 {"level", "steps", "text", "hits"}, 아니면 None"""
+    level, hits = assign_level(user_message)
+    if level not in fast_levels or level not in templates:
+        return None
+    tpl = templates[level]
+    text = tpl.get("variants", {}).get(_trigger_key(user_message), tpl["text"])
+    return {"level": level, "steps": list(tpl["steps"]), "text": text, "hits": hits}
+
+
+def crisis_summary(prev_summary: str, level: str, user_message: str, max_chars: int = 80) -> str:
+    """로컬 요약기가 없을 때 history_summary 에 위험 턴 한 줄만 덧붙임"""
+    msg = re.sub(r"\s+", " ", user_message or "").strip()
+    if len(msg) > max_chars:
+        msg = msg[: max_chars - 1] + "…"
+    line = f"[위험 신호 {level}] {msg}"
+    return f"{prev_summary.rstrip()}\n{line}" if prev_summary else line
+
+
+# =========================================================
+# SLO CLI
+# =========================================================
+@contextmanager
+def deny_network():
+    """블록 안의 모든 소켓 연결을 실패시킴 (LLM 제공자가 다운된 상황과 같음)"""
+    orig = socket.socket.connect
+
+    def _refuse(self, *args, **kwargs):
+        raise OSError("network disabled for crisis SLO check")
+
+    socket.socket.connect = _refuse
+    try:
+        yield
+    finally:
+        socket.socket.connect = orig
+
+
+def _sample_messages() -> List[str]:
+    out = []
+    for level in DEFAULT_FAST_LEVELS:
+        for pat in LEVEL_PATTERNS[level]:
+            word = re.sub(r"\\s\*", " ", pat)
+            out.append(f"요즘 연애 때문에 너무 힘들고 {word} 생각까지 들어요")
+    return out
+
+
+def run_slo(data_dir: str, n: int, p99_ms: float, bundle_path: Optional[str] = None) -> bool:
+    messages = _sample_messages()
+    with deny_network():
+        t0 = time.perf_counter()
+        templates = load_crisis_templates(data_dir, open_bundle(bundle_path, data_dir))
+        load_ms = (time.perf_counter() - t0) * 1000
+        lat: List[float] = []
+        missed = 0
+        for i in range(n):
+            msg = messages[i % len(messages)]
+            t0 = time.perf_counter()
+            out = crisis_response(msg, templates)
+            lat.append((time.perf_counter() - t0) * 1000)
+            missed += out is None
+    lat.sort()
+    p50 = lat[len(lat) // 2]
+    p99 = lat[min(len(lat) - 1, int(0.99 * len(lat)))]
+    ok = p99 <= p99_ms and missed == 0
+    print(
+        f"[slo] templates={sorted(templates)} load={load_ms:.1f}ms n={n} "
+        f"p50={p50:.3f}ms p99={p99:.3f}ms max={lat[-1]:.3f}ms missed={missed} "
+        f"budget(p99)={p99_ms}ms → {'PASS' if ok else 'FAIL'}"
+    )
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from config import DATA_DIR
+
+    ap = argparse.ArgumentParser(description="위기 즉시 응답 경로 SLO 확인")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("slo")
+    s.add_argument("--data-dir", default=DATA_DIR)
+    s.add_argument("--n", type=int, default=2000)
+    s.add_argument("--p99-ms", type=float, default=5.0)
+    s.add_argument("--bundle", default=str(DEFAULT_BUNDLE_PATH), help="data_bundle.py build 결과 (없으면 JSON)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "slo":
+        sys.exit(0 if run_slo(args.data_dir, args.n, args.p99_ms, args.bundle) else 1)
+
+
+if __name__ == "__main__":
+    main()
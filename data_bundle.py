@@ -0,0 +1,325 @@
+import argparse
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from risk import parse_required_steps_from_text
+
+
+# =========================================================
+# data/*.json 검증 + 정규화 + 바이너리 번들
+# - build: 모든 데이터 파일을 스키마로 검증 (하나라도 틀리면 번들을 만들지 않음)
+#          keys / required_steps / step_id / forbidden_phrases 등은 한 가지 형태로 정규화
+# - 번들: [헤더][목차][파일별 marshal 블록] 한 파일
+#     헤더 = MAGIC + 포맷 버전 + 파이썬 버전(marshal 호환) + 목차 길이
+#     목차 = {이름: (offset, length, 원본 size, 원본 mtime_ns)}
+#   앱은 mmap 후 필요한 블록만 marshal.loads (JSON 파싱/검증 없음)
+# - 원본이 바뀌었거나(크기/mtime) 번들이 없으면 JSON 을 읽어 같은 정규화를 적용 (fallback)
+#     python data_bundle.py build
+#     python data_bundle.py check
+# =========================================================
+PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_DATA_DIR = PROJECT_ROOT / "data"
+DEFAULT_BUNDLE_PATH = PROJECT_ROOT / "data_bundle.bin"
+
+MAGIC = b"APCBNDL1"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sHBBI")   # magic, format, py major, py minor, toc 길이
+
+DATASETS = (
+    "persona_rules",
+    "t01_core_types_axis",
+    "t01_core_types_persona",
+    "t02_type_desc",
+    "t03_playbook",
+    "t06_risk_map",
+    "t07_risk_steps",
+)
+
+
+class DataValidationError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__(f"데이터 검증 실패 {len(errors)}건:\n" + "\n".join(errors))
+        self.errors = errors
+
+
+# -----------------------------
+# 정규화
+# -----------------------------
+def _as_dict(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except ValueError:
+            return value
+        return parsed if isinstance(parsed, dict) else value
+    return value
+
+
+def _normalize_steps(value: Any) -> Any:
+    """["Step 1 → Step 2"] / "Step 1 → Step 2" / ["step_1"] → ["STEP_1", "STEP_2"], "일반 상담" → []"""
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return value
+    out: List[str] = []
+    for v in value:
+        if not isinstance(v, str):
+            return value
+        if v.upper().startswith("STEP_"):
+            out.append(v.upper())
+        else:
+            out.extend(parse_required_steps_from_text(f"[필수Step] {v}"))
+    return out
+
+
+def normalize_row(dataset: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(row)
+    if dataset == "persona_rules":
+        fp = row.get("forbidden_phrases")
+        if isinstance(fp, str):
+            row["forbidden_phrases"] = [fp] if fp.strip() else []
+        if isinstance(row.get("axis"), dict):
+            row["axis"] = {k: str(v).strip() for k, v in row["axis"].items()}
+        return row
+
+    md = dict(row.get("metadata") or {})
+    if "keys" in md:
+        md["keys"] = _as_dict(md["keys"])
+    if "required_steps" in md:
+        md["required_steps"] = _normalize_steps(md["required_steps"])
+    if md.get("step_id"):
+        md["step_id"] = str(md["step_id"]).upper()
+    row["metadata"] = md
+    return row
+
+
+# -----------------------------
+# 검증 (정규화 후 형태 기준)
+# -----------------------------
+_PERSONA_STR_FIELDS = ("rule_id", "nickname", "tone", "goal", "core_traits")
+_AXIS_FIELDS = ("attachment", "emotion_reg", "efficacy")
+
+# doc_type 별 추가 필수 메타데이터
+_DOC_TYPE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "risk_level_example": ("keys", "required_steps"),
+    "risk_step": ("step_id",),
+}
+
+
+def validate_rows(dataset: str, rows: Any) -> List[str]:
+    if not isinstance(rows, list) or not rows:
+        return [f"{dataset}: 비어있지 않은 list 여야 합니다."]
+    errors: List[str] = []
+    seen: Dict[str, int] = {}
+    id_field = "rule_id" if dataset == "persona_rules" else "id"
+
+    for i, r in enumerate(rows):
+        where = f"{dataset}[{i}]"
+        if not isinstance(r, dict):
+            errors.append(f"{where}: dict 가 아닙니다.")
+            continue
+        rid = r.get(id_field)
+        if isinstance(rid, str) and rid:
+            where = f"{where} {rid}"
+            if rid in seen:
+                errors.append(f"{where}: {id_field} 중복 ({dataset}[{seen[rid]}])")
+            seen.setdefault(rid, i)
+
+        if dataset == "persona_rules":
+            for f in _PERSONA_STR_FIELDS:
+                if not isinstance(r.get(f), str) or not r[f].strip():
+                    errors.append(f"{where}: '{f}' 는 비어있지 않은 문자열이어야 합니다.")
+            fp = r.get("forbidden_phrases")
+            if not isinstance(fp, list) or not all(isinstance(x, str) for x in fp):
+                errors.append(f"{where}: 'forbidden_phrases' 는 문자열 list 여야 합니다.")
+            axis = r.get("axis")
+            if not isinstance(axis, dict) or any(not axis.get(f) for f in _AXIS_FIELDS):
+                errors.append(f"{where}: 'axis' 에 {', '.join(_AXIS_FIELDS)} 가 모두 있어야 합니다.")
+            continue
+
+        if not isinstance(rid, str) or not rid:
+            errors.append(f"{where}: 'id' 가 없습니다.")
+        if not isinstance(r.get("page_content"), str) or not r["page_content"].strip():
+            errors.append(f"{where}: 'page_content' 가 비어있습니다.")
+        md = r.get("metadata")
+        if not isinstance(md, dict):
+            errors.append(f"{where}: 'metadata' 는 dict 여야 합니다.")
+            continue
+        doc_type = md.get("doc_type")
+        if not isinstance(doc_type, str) or not doc_type:
+            errors.append(f"{where}: metadata.doc_type 이 없습니다.")
+        for f in _DOC_TYPE_FIELDS.get(doc_type, ()):
+            if md.get(f) in (None, ""):
+                errors.append(f"{where}: {doc_type} 에는 metadata.{f} 가 필요합니다.")
+        if "keys" in md and not isinstance(md["keys"], dict):
+            errors.append(f"{where}: metadata.keys 는 dict(또는 JSON 객체 문자열)여야 합니다.")
+        rs = md.get("required_steps")
+        if rs is not None and not (isinstance(rs, list) and all(isinstance(x, str) and x.startswith("STEP_") for x in rs)):
+            errors.append(f"{where}: metadata.required_steps 를 Step 목록으로 해석할 수 없습니다: {rs!r}")
+    return errors
+
+
+def load_json_dataset(data_dir: str, dataset: str) -> List[Dict[str, Any]]:
+    """JSON → 정규화 → 검증 (fallback 경로, 실패 시 DataValidationError)"""
+    with open(os.path.join(data_dir, f"{dataset}.json"), "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    rows = [normalize_row(dataset, r) if isinstance(r, dict) else r for r in raw] if isinstance(raw, list) else raw
+    errors = validate_rows(dataset, rows)
+    if errors:
+        raise DataValidationError(errors)
+    return rows
+
+
+def _cross_check(data: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    """파일 간 참조: t06 의 필수 Step 이 t07 에 모두 있는지"""
+    steps = {(r.get("metadata") or {}).get("step_id") for r in data.get("t07_risk_steps", [])}
+    errors = []
+    for r in data.get("t06_risk_map", []):
+        for s in (r.get("metadata") or {}).get("required_steps") or []:
+            if s not in steps:
+                errors.append(f"t06_risk_map {r.get('id')}: 필수 Step {s} 가 t07_risk_steps 에 없습니다.")
+    return errors
+
+
+# -----------------------------
+# 번들 쓰기 / 읽기
+# -----------------------------
+def _source_stat(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def validate_all(data_dir: str) -> Dict[str, List[Dict[str, Any]]]:
+    """모든 데이터셋 정규화 + 검증 (오류는 끝까지 모아서 한 번에)"""
+    data: Dict[str, List[Dict[str, Any]]] = {}
+    errors: List[str] = []
+    for name in DATASETS:
+        try:
+            data[name] = load_json_dataset(data_dir, name)
+        except DataValidationError as e:
+            errors.extend(e.errors)
+        except (OSError, ValueError) as e:
+            errors.append(f"{name}: {e}")
+    errors.extend(_cross_check(data))
+    if errors:
+        raise DataValidationError(errors)
+    return data
+
+
+def build_bundle(data_dir: str, out_path: str) -> Dict[str, int]:
+    data = validate_all(data_dir)
+
+    blobs = {name: marshal.dumps(rows) for name, rows in data.items()}
+    toc: Dict[str, Tuple[int, int, int, int]] = {}
+    offset = 0
+    for name, blob in blobs.items():
+        size, mtime_ns = _source_stat(os.path.join(data_dir, f"{name}.json"))
+        toc[name] = (offset, len(blob), size, mtime_ns)
+        offset += len(blob)
+    toc_blob = marshal.dumps(toc)
+
+    tmp = f"{out_path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, sys.version_info[0], sys.version_info[1], len(toc_blob)))
+        f.write(toc_blob)
+        for blob in blobs.values():
+            f.write(blob)
+    os.replace(tmp, out_path)
+    return {name: len(rows) for name, rows in data.items()}
+
+
+class DataBundle:
+    """mmap 한 번들에서 데이터셋을 필요할 때 marshal.loads"""
+
+    def __init__(self, path: str, data_dir: Optional[str] = None):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, py_major, py_minor, toc_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 번들 형식입니다: {path}")
+        if (py_major, py_minor) != sys.version_info[:2]:
+            raise ValueError(f"번들 파이썬 버전 불일치 ({py_major}.{py_minor}): 다시 build 하세요.")
+        self._base = _HEADER.size + toc_len
+        self.toc: Dict[str, Tuple[int, int, int, int]] = marshal.loads(self._mm[_HEADER.size:self._base])
+        self.data_dir = data_dir
+
+    def is_fresh(self, name: str) -> bool:
+        """원본 JSON 이 번들 생성 후 바뀌지 않았는지 (원본이 없으면 번들을 그대로 신뢰)"""
+        if name not in self.toc:
+            return False
+        if not self.data_dir:
+            return True
+        path = os.path.join(self.data_dir, f"{name}.json")
+        if not os.path.isfile(path):
+            return True
+        _, _, size, mtime_ns = self.toc[name]
+        return _source_stat(path) == (size, mtime_ns)
+
+    def load(self, name: str) -> List[Dict[str, Any]]:
+        offset, length = self.toc[name][:2]
+        start = self._base + offset
+        return marshal.loads(self._mm[start:start + length])
+
+
+def open_bundle(path: str, data_dir: Optional[str] = None) -> Optional[DataBundle]:
+    if not path or not os.path.isfile(path):
+        return None
+    try:
+        return DataBundle(path, data_dir)
+    except (ValueError, EOFError, struct.error) as e:
+        print(f"[data_bundle] 번들 무시 → JSON 사용: {e}", file=sys.stderr)
+        return None
+
+
+def load_dataset(data_dir: str, name: str, bundle: Optional[DataBundle] = None) -> List[Dict[str, Any]]:
+    """번들이 최신이면 번들에서, 아니면 JSON(정규화+검증)에서"""
+    if bundle is not None and bundle.is_fresh(name):
+        return bundle.load(name)
+    return load_json_dataset(data_dir, name)
+
+
+# =========================================================
+# CLI
+# =========================================================
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="data/*.json 검증 + 바이너리 번들 생성")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for cmd in ("build", "check"):
+        p = sub.add_parser(cmd)
+        p.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+        p.add_argument("--out", default=str(DEFAULT_BUNDLE_PATH))
+    args = ap.parse_args(argv)
+
+    try:
+        if args.cmd == "build":
+            counts = build_bundle(args.data_dir, args.out)
+            print(f"[build] {args.out} ({os.path.getsize(args.out)} bytes): "
+                  + ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+            t0 = time.perf_counter()
+            for name in DATASETS:
+                load_json_dataset(args.data_dir, name)
+            t_json = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            bundle = DataBundle(args.out, args.data_dir)
+            for name in DATASETS:
+                bundle.load(name)
+            t_bundle = time.perf_counter() - t0
+            print(f"[build] load all: json+validate={t_json * 1000:.2f}ms bundle={t_bundle * 1000:.2f}ms")
+        else:
+            data = validate_all(args.data_dir)
+            print("[check] OK: " + ", ".join(f"{k}={len(v)}" for k, v in data.items()))
+    except DataValidationError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
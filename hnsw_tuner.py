@@ -0,0 +1,269 @@
+import argparse
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from shared_index import DEFAULT_PERSIST_ROOT
+
+
+# =========================================================
+# HNSW 파라미터 설정 + recall/지연 튜너 (Chroma 1.x collection configuration)
+# - M(max_neighbors) / ef_construction: 색인 생성 시 고정 → rebuild 로 적용
+# - ef_search: tune --apply (collection.modify 1번) 또는 rebuild 때 색인 설정에 저장
+#   → 앱은 로드만 (워커마다 커밋된 chroma_store 에 SQLite 쓰기를 하지 않음)
+# - tune: 앱의 실제 검색 패턴(filter, k)별로 파라미터 조합을 sweep 해
+#   numpy 정확 검색 대비 recall 목표를 만족하는 가장 빠른 설정을 JSON 으로 기록
+#     python hnsw_tuner.py tune --target 0.95 --out hnsw_config.json
+#     python hnsw_tuner.py tune --apply                          (ef_search 만 바로 적용)
+#     python hnsw_tuner.py rebuild --config hnsw_config.json     (M/ef_construction 까지, 앱 시작 전에)
+# =========================================================
+PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_CONFIG_PATH = PROJECT_ROOT / "hnsw_config.json"
+
+# 앱이 similarity_search 하는 (컬렉션, filter, k) — k 는 config.py 기본값과 맞춤
+SEARCH_PROFILES: Dict[str, List[Dict[str, Any]]] = {
+    "counsel_db": [{"where": {"doc_type": "playbook"}, "k": 10}],   # 하이브리드 후보 수
+    "risk_protocol": [
+        {"where": {"doc_type": "risk_level_example"}, "k": 3},
+        {"where": {"doc_type": "risk_step"}, "k": 2},
+    ],
+}
+
+GRID_M = (8, 16, 32)
+GRID_EF_CONSTRUCTION = (64, 100, 200)
+GRID_EF_SEARCH = (10, 20, 40, 80, 160)
+ADD_BATCH = 500
+
+
+# -----------------------------
+# 설정 파일 / 색인에 적용 (CLI 전용)
+# -----------------------------
+def load_hnsw_config(path: str) -> Dict[str, Dict[str, Any]]:
+    if not path or not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def apply_search_params(collection: Any, params: Dict[str, Any]) -> bool:
+    """ef_search 가 다를 때만 modify (같으면 SQLite 쓰기 없음)"""
+    ef = params.get("ef_search")
+    if not ef:
+        return False
+    current = (collection.configuration or {}).get("hnsw") or {}
+    if current.get("ef_search") == ef:
+        return False
+    collection.modify(configuration={"hnsw": {"ef_search": int(ef)}})
+    return True
+
+
+# -----------------------------
+# 데이터 / 질의
+# -----------------------------
+def read_collection(persist_dir: str, name: str) -> Dict[str, Any]:
+    import chromadb
+
+    col = chromadb.PersistentClient(path=persist_dir).get_collection(name)
+    got = col.get(include=["embeddings", "documents", "metadatas"])
+    got["embeddings"] = np.asarray(got["embeddings"], dtype=np.float32)
+    got["configuration"] = col.configuration
+    return got
+
+
+def create_hnsw_collection(client: Any, name: str, m: int, efc: int, ef: int, data: Dict[str, Any]) -> Any:
+    col = client.create_collection(
+        name,
+        configuration={"hnsw": {"space": "l2", "max_neighbors": m, "ef_construction": efc, "ef_search": ef}},
+        embedding_function=None,
+    )
+    n = len(data["ids"])
+    for s in range(0, n, ADD_BATCH):
+        col.add(
+            ids=data["ids"][s:s + ADD_BATCH],
+            embeddings=data["embeddings"][s:s + ADD_BATCH],
+            documents=data["documents"][s:s + ADD_BATCH],
+            metadatas=data["metadatas"][s:s + ADD_BATCH],
+        )
+    return col
+
+
+def _matches(md: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    return all((md or {}).get(k) == v for k, v in where.items())
+
+
+def load_queries(path: Optional[str], embed_model: str, fallback: np.ndarray, n: int, noise: float) -> np.ndarray:
+    """실제 질의 텍스트(한 줄 1개)를 임베딩 (<path>.emb.npy 에 캐시). 없으면 문서 벡터 + 노이즈"""
+    if path:
+        cache = f"{path}.emb.npy"
+        if os.path.isfile(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+            return np.load(cache)[:n]
+        from langchain_openai import OpenAIEmbeddings
+
+        with open(path, "r", encoding="utf-8") as f:
+            texts = [ln.strip() for ln in f if ln.strip()][:n]
+        q = np.asarray(OpenAIEmbeddings(model=embed_model).embed_documents(texts), dtype=np.float32)
+        np.save(cache, q)
+        return q
+    rng = np.random.default_rng(0)
+    pick = rng.choice(len(fallback), size=n, replace=len(fallback) < n)
+    return fallback[pick] + noise * rng.standard_normal((n, fallback.shape[1])).astype(np.float32)
+
+
+def exact_topk(vectors: np.ndarray, ids: Sequence[str], queries: np.ndarray, k: int) -> List[List[str]]:
+    d = (vectors * vectors).sum(1)[None, :] - 2.0 * queries @ vectors.T
+    k = min(k, len(ids))
+    top = np.argsort(d, axis=1)[:, :k]
+    return [[ids[j] for j in row] for row in top]
+
+
+# -----------------------------
+# sweep
+# -----------------------------
+def tune_collection(
+    persist_root: str,
+    name: str,
+    queries_file: Optional[str],
+    embed_model: str,
+    target: float,
+    n_queries: int,
+    noise: float,
+    grid_m: Sequence[int] = GRID_M,
+    grid_efc: Sequence[int] = GRID_EF_CONSTRUCTION,
+    grid_ef: Sequence[int] = GRID_EF_SEARCH,
+) -> Dict[str, Any]:
+    import chromadb
+
+    data = read_collection(os.path.join(persist_root, name), name)
+    vectors = data["embeddings"]
+    queries = load_queries(queries_file, embed_model, vectors, n_queries, noise)
+
+    profiles = []
+    for p in SEARCH_PROFILES.get(name, [{"where": None, "k": 4}]):
+        rows = [i for i, md in enumerate(data["metadatas"]) if not p["where"] or _matches(md, p["where"])]
+        if not rows:
+            continue
+        sub_ids = [data["ids"][i] for i in rows]
+        profiles.append({**p, "truth": exact_topk(vectors[rows], sub_ids, queries, p["k"])})
+
+    trials = []
+    tmp = tempfile.mkdtemp(prefix=f"hnsw-{name}-")
+    try:
+        client = chromadb.PersistentClient(path=tmp)
+        for i, (m, efc) in enumerate(itertools.product(grid_m, grid_efc)):
+            col = create_hnsw_collection(client, f"{name}_{i}", m, efc, grid_ef[0], data)
+            for ef in grid_ef:
+                col.modify(configuration={"hnsw": {"ef_search": ef}})
+                hits = total = 0
+                lat: List[float] = []
+                for p in profiles:
+                    for q, want in zip(queries, p["truth"]):
+                        t0 = time.perf_counter()
+                        got = col.query(query_embeddings=[q.tolist()], n_results=p["k"], where=p["where"], include=[])
+                        lat.append((time.perf_counter() - t0) * 1000)
+                        hits += len(set(got["ids"][0]) & set(want))
+                        total += len(want)
+                trials.append({
+                    "max_neighbors": m, "ef_construction": efc, "ef_search": ef,
+                    "recall": hits / max(1, total),
+                    "p50_ms": float(np.percentile(lat, 50)), "p95_ms": float(np.percentile(lat, 95)),
+                })
+            client.delete_collection(f"{name}_{i}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    ok = [t for t in trials if t["recall"] >= target]
+    # 목표 recall 을 만족하는 것 중 p95 최소 (동률이면 더 작은 색인)
+    best = min(ok, key=lambda t: (round(t["p95_ms"], 2), t["max_neighbors"], t["ef_construction"], t["ef_search"])) \
+        if ok else max(trials, key=lambda t: t["recall"])
+    return {
+        **best,
+        "target_recall": target,
+        "met_target": bool(ok),
+        "queries": len(queries),
+        "query_source": queries_file or f"stored vectors + noise({noise})",
+        "profiles": [{"where": p["where"], "k": p["k"]} for p in profiles],
+        "trials": trials,
+    }
+
+
+def apply_ef_search(persist_root: str, name: str, params: Dict[str, Any]) -> bool:
+    """튜닝 결과 ef_search 를 저장된 컬렉션 설정에 기록 (M/ef_construction 은 rebuild 필요)"""
+    import chromadb
+
+    col = chromadb.PersistentClient(path=os.path.join(persist_root, name)).get_collection(name)
+    return apply_search_params(col, params)
+
+
+def rebuild(persist_root: str, name: str, params: Dict[str, Any]) -> None:
+    """저장된 임베딩 그대로 새 HNSW 설정으로 재색인 (임베딩 API 호출 없음) 후 디렉터리 교체"""
+    import chromadb
+
+    persist_dir = Path(persist_root) / name
+    data = read_collection(str(persist_dir), name)
+    tmp = persist_dir.with_name(f"{persist_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    create_hnsw_collection(
+        chromadb.PersistentClient(path=str(tmp)), name,
+        int(params["max_neighbors"]), int(params["ef_construction"]), int(params["ef_search"]), data,
+    )
+    old = persist_dir.with_name(f"{persist_dir.name}.old-{os.getpid()}")
+    persist_dir.rename(old)
+    tmp.rename(persist_dir)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="HNSW 파라미터 sweep / 재색인")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    t = sub.add_parser("tune")
+    t.add_argument("--persist-root", default=str(DEFAULT_PERSIST_ROOT))
+    t.add_argument("--collections", nargs="*", default=list(SEARCH_PROFILES))
+    t.add_argument("--queries-file", default=None, help="실제 질의 텍스트 (한 줄 1개)")
+    t.add_argument("--embed-model", default="text-embedding-3-large")
+    t.add_argument("--queries", type=int, default=200)
+    t.add_argument("--noise", type=float, default=0.01)
+    t.add_argument("--target", type=float, default=0.95)
+    t.add_argument("--out", default=str(DEFAULT_CONFIG_PATH))
+    t.add_argument("--apply", action="store_true", help="찾은 ef_search 를 --persist-root 색인에 바로 기록")
+
+    r = sub.add_parser("rebuild")
+    r.add_argument("--persist-root", default=str(DEFAULT_PERSIST_ROOT))
+    r.add_argument("--config", default=str(DEFAULT_CONFIG_PATH))
+    args = ap.parse_args(argv)
+
+    if args.cmd == "tune":
+        out: Dict[str, Any] = {}
+        for name in args.collections:
+            res = tune_collection(
+                args.persist_root, name, args.queries_file, args.embed_model, args.target, args.queries, args.noise,
+            )
+            out[name] = res
+            flag = "" if res["met_target"] else "  (목표 미달: 최고 recall 설정)"
+            print(
+                f"[tune] {name}: M={res['max_neighbors']} ef_construction={res['ef_construction']} "
+                f"ef_search={res['ef_search']} recall={res['recall']:.3f} p95={res['p95_ms']:.2f}ms{flag}"
+            )
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, indent=2)
+        print(f"[tune] → {args.out}")
+        if args.apply:
+            for name, res in out.items():
+                changed = apply_ef_search(args.persist_root, name, res)
+                print(f"[apply] {name}: ef_search={res['ef_search']}{'' if changed else ' (변경 없음)'}"
+                      f" — M/ef_construction 은 rebuild 로 적용")
+    else:
+        for name, params in load_hnsw_config(args.config).items():
+            rebuild(args.persist_root, name, params)
+            print(f"[rebuild] {name}: M={params['max_neighbors']} ef_construction={params['ef_construction']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+
+# =========================================================
+# playbook 키워드/카테고리 BM25 역색인 (counsel_db 하이브리드 검색용)
+# - 문서의 구조화 태그에서 용어를 뽑아 로드 시점에 1번 색인
+#     [카테고리] 신뢰, 이성문제   → 신뢰 / 이성문제
+#     [키워드] [연락][답장텀][불안] → 연락 / 답장텀 / 불안
+#     [감정] 불안, 초조, 의심       → 불안 / 초조 / 의심
+# - 한국어 짧은 발화는 조사가 붙어 공백 분리가 안 맞으므로,
+#   "어휘집 용어가 발화 안에 부분 문자열로 등장하는가"로 질의 용어를 찾음
+# =========================================================
+FIELD_WEIGHTS = {"keyword": 2.0, "category": 1.5, "emotion": 1.0}
+MIN_TERM_LEN = 2
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+
+def _field(page_content: str, label: str) -> str:
+    # 줄 맨 앞의 라벨만 (키워드 태그 안의 "[감정]" 같은 값과 혼동 방지)
+    m = re.search(rf"(?m)^\[{label}\]\s*(.+)", page_content)
+    return m.group(1).strip() if m else ""
+
+
+def extract_playbook_terms(page_content: str) -> Dict[str, List[str]]:
+    keywords = re.findall(r"\[([^\[\]]+)\]", _field(page_content, "키워드"))
+    categories = re.split(r"[,/]", _field(page_content, "카테고리"))
+    emotions = re.split(r"[,/]", _field(page_content, "감정"))
+
+    def clean(xs: List[str]) -> List[str]:
+        return [x.strip() for x in xs if len(x.strip()) >= MIN_TERM_LEN]
+
+    return {"keyword": clean(keywords), "category": clean(categories), "emotion": clean(emotions)}
+
+
+@dataclass
+class LexicalHit:
+    index: int
+    score: float
+    matched: List[str] = field(default_factory=list)
+
+
+class PlaybookLexicalIndex:
+    def __init__(self, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[Dict[str, Any]]):
+        self.docs: List[Document] = [
+            Document(id=i, page_content=d, metadata=md or {}) for i, d, md in zip(ids, documents, metadatas)
+        ]
+        # term -> {doc_idx: 가중 tf}
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+        self.doc_len: List[float] = []
+        for di, doc in enumerate(self.docs):
+            dl = 0.0
+            for fname, terms in extract_playbook_terms(doc.page_content).items():
+                w = FIELD_WEIGHTS[fname]
+                for t in terms:
+                    self.postings[t][di] += w
+                    dl += w
+            self.doc_len.append(dl)
+
+        self.postings = {t: dict(p) for t, p in self.postings.items()}
+        self.avgdl = (sum(self.doc_len) / len(self.doc_len)) if self.doc_len else 1.0
+        n = len(self.docs)
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+        # 긴 용어부터 매칭해 "답장텀"이 있으면 그 안의 "답장"은 중복 가산하지 않음
+        self.vocab = sorted(self.postings, key=len, reverse=True)
+
+    @classmethod
+    def from_store(cls, store: Any, doc_type: str = "playbook") -> "PlaybookLexicalIndex":
+        got = store.get(where={"doc_type": doc_type}, include=["documents", "metadatas"])
+        return cls(got["ids"], got["documents"] or [], got["metadatas"] or [])
+
+    def query_terms(self, text: str) -> List[str]:
+        t = text or ""
+        compact = re.sub(r"\s+", "", t)
+        found: List[str] = []
+        for term in self.vocab:
+            if term in compact or term in t:
+                if any(term in longer for longer in found):
+                    continue
+                found.append(term)
+        return found
+
+    def search(self, text: str, k: int = 10) -> List[LexicalHit]:
+        terms = self.query_terms(text)
+        scores: Dict[int, LexicalHit] = {}
+        for term in terms:
+            idf = self.idf[term]
+            for di, tf in self.postings[term].items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[di] / self.avgdl)
+                hit = scores.setdefault(di, LexicalHit(di, 0.0))
+                hit.score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                hit.matched.append(term)
+        hits = sorted(scores.values(), key=lambda h: h.score, reverse=True)
+        return hits[:k]
+
+    def is_confident(self, hits: List[LexicalHit], k: int, min_terms: int = 2) -> bool:
+        """키워드가 뚜렷한 질의: 임베딩 없이 어휘 결과만으로 답할 수 있는지"""
+        return len(hits) >= k and len(set(hits[0].matched)) >= min_terms
+
+
+def doc_key(doc: Document) -> str:
+    return doc.id or doc.page_content
+
+
+def rrf_fuse(ranked_lists: Sequence[Sequence[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    """reciprocal rank fusion: score(d) = Σ 1 / (rrf_k + rank)"""
+    scores: Dict[str, float] = defaultdict(float)
+    by_key: Dict[str, Document] = {}
+    for docs in ranked_lists:
+        for rank, d in enumerate(docs, start=1):
+            key = doc_key(d)
+            scores[key] += 1.0 / (rrf_k + rank)
+            by_key.setdefault(key, d)
+    ordered = sorted(scores, key=lambda x: scores[x], reverse=True)
+    return [by_key[x] for x in ordered[:k]]
+
+
+def hybrid_search(
+    lexical: Optional[PlaybookLexicalIndex],
+    dense_search,
+    lexical_text: str,
+    k: int,
+    candidates: int = 10,
+) -> List[Document]:
+    """lexical 결과가 확실하면 그대로, 아니면 dense_search(n) 결과와 RRF 결합"""
+    if lexical is None:
+        return dense_search(k)
+    hits = lexical.search(lexical_text, k=candidates)
+    lex_docs = [lexical.docs[h.index] for h in hits]
+    if lexical.is_confident(hits, k):
+        return lex_docs[:k]
+    dense_docs = dense_search(max(k, candidates))
+    if not lex_docs:
+        return dense_docs[:k]
+    return rrf_fuse([dense_docs, lex_docs], k)
@@ -0,0 +1,315 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+
+# =========================================================
+# 비동기 LLM 클라이언트 (커넥션 풀 + 재시도 + 헤지 요청)
+# - OpenAI 호환 /chat/completions 엔드포인트를 직접 호출
+# - OPENAI_BASE_URL 을 바꾸면 로컬 mock 서버로도 그대로 테스트 가능
+# - Streamlit 스크립트 스레드에는 이벤트 루프가 없으므로,
+#   프로세스당 1개의 백그라운드 루프에서 모든 요청을 실행
+# - httpx 커넥션 풀 + 동시성 세마포어는 (base_url, api_key) 마다 프로세스에 1개
+#   → 모델(fast/strong 티어)별 클라이언트가 keep-alive 연결과 동시 호출 한도를 함께 씀
+#   (풀 크기/한도는 처음 만든 클라이언트 설정, 모델/재시도/헤지/마감은 클라이언트별)
+# =========================================================
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMRequestError(RuntimeError):
+    pass
+
+
+@dataclass
+class LLMResponse:
+    """ChatOpenAI.invoke() 결과처럼 .content 로 본문을 읽을 수 있는 응답"""
+    content: str
+    model: str = ""
+    latency: float = 0.0
+    hedged: bool = False
+    usage_metadata: Dict[str, int] = field(default_factory=dict)
+
+
+def to_openai_messages(prompt: Any) -> List[Dict[str, str]]:
+    # str / langchain 메시지 리스트(format_messages 결과) / dict 리스트 모두 허용
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    role_map = {"system": "system", "human": "user", "ai": "assistant"}
+    out: List[Dict[str, str]] = []
+    for m in prompt:
+        if isinstance(m, dict):
+            out.append({"role": m["role"], "content": m["content"]})
+        else:
+            out.append({"role": role_map.get(m.type, "user"), "content": m.content})
+    return out
+
+
+class LatencyTracker:
+    """최근 성공 요청의 지연시간으로 p95 추정 (헤지 기준)"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            xs = sorted(self.samples)
+        return xs[min(len(xs) - 1, int(round(0.95 * (len(xs) - 1))))]
+
+
+class _LoopThread:
+    """프로세스 공용 이벤트 루프 (데몬 스레드)"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="llm-client-loop", daemon=True)
+        self.thread.start()
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+_LOOP: Optional[_LoopThread] = None
+_LOOP_LOCK = threading.Lock()
+
+
+def get_loop_thread() -> _LoopThread:
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            _LOOP = _LoopThread()
+        return _LOOP
+
+
+class _SharedPool:
+    """(base_url, api_key) 별 공용 httpx 클라이언트 + 동시 호출 세마포어"""
+
+    def __init__(self, base_url: str, api_key: str, max_connections: int, max_concurrency: int,
+                 transport: Optional[httpx.AsyncBaseTransport]):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.transport = transport
+        self.refs = 0
+        # 아래 두 객체는 백그라운드 루프 안에서 지연 생성 (루프에 묶이기 때문)
+        self.http: Optional[httpx.AsyncClient] = None
+        self.sem: Optional[asyncio.Semaphore] = None
+
+    def ensure(self) -> None:
+        if self.http is None:
+            self.http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self.transport,
+            )
+        if self.sem is None:
+            self.sem = asyncio.Semaphore(self.max_concurrency)
+
+
+_PoolKey = Tuple[str, str, int]
+_POOLS: Dict[_PoolKey, _SharedPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _acquire_pool(key: _PoolKey, **kwargs) -> _SharedPool:
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = _SharedPool(**kwargs)
+        pool.refs += 1
+        return pool
+
+
+def _release_pool(key: _PoolKey) -> Optional[_SharedPool]:
+    """마지막 사용자면 풀을 목록에서 빼서 반환 (닫는 건 호출 측)"""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            return None
+        pool.refs -= 1
+        if pool.refs > 0:
+            return None
+        return _POOLS.pop(key)
+
+
+class AsyncLLMClient:
+    def __init__(
+        self,
+        model: str,
+        temperature: float = 0.6,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_connections: int = 20,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+        timeout: float = 60.0,
+        hedge: bool = False,
+        hedge_min_delay: float = 1.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.model = model
+        self.temperature = temperature
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout          # 호출 1건 전체(재시도/헤지 포함) 마감 시간
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker()
+        self.transport = transport      # 테스트용 (httpx.MockTransport), None 이면 기본 네트워크
+
+        # 같은 base_url/api_key(/transport) 의 다른 모델 클라이언트와 풀 공유
+        self._pool_key: _PoolKey = (self.base_url, self.api_key, id(transport) if transport is not None else 0)
+        self._pool: Optional[_SharedPool] = _acquire_pool(
+            self._pool_key, base_url=self.base_url, api_key=self.api_key,
+            max_connections=max_connections, max_concurrency=max_concurrency, transport=transport,
+        )
+
+    # -----------------------------
+    # 공개 API
+    # -----------------------------
+    def invoke(self, prompt: Any, deadline: Optional[float] = None, model: Optional[str] = None) -> LLMResponse:
+        """동기 호출 (Streamlit 스크립트 스레드용), model 을 주면 이 요청만 다른 모델로"""
+        fut = get_loop_thread().submit(self._ainvoke(prompt, deadline, model))
+        return fut.result()
+
+    async def ainvoke(self, prompt: Any, deadline: Optional[float] = None, model: Optional[str] = None) -> LLMResponse:
+        """임의의 이벤트 루프에서 await 가능 (실행은 공용 루프에서)"""
+        fut = get_loop_thread().submit(self._ainvoke(prompt, deadline, model))
+        return await asyncio.wrap_future(fut)
+
+    def close(self) -> None:
+        """이 클라이언트의 풀 참조 해제 (마지막 사용자일 때만 연결을 닫음)"""
+        if self._pool is None:
+            return
+        self._pool = None
+        pool = _release_pool(self._pool_key)
+        if pool is not None and pool.http is not None:
+            get_loop_thread().submit(pool.http.aclose()).result()
+
+    # -----------------------------
+    # 내부 구현 (공용 루프에서만 실행)
+    # -----------------------------
+    def _payload(self, prompt: Any, model: Optional[str] = None) -> Dict[str, Any]:
+        model = model or self.model
+        payload: Dict[str, Any] = {"model": model, "messages": to_openai_messages(prompt)}
+        # gpt-5 계열(비 chat)은 temperature=1 만 허용
+        if not (model.startswith("gpt-5") and "chat" not in model and self.temperature != 1):
+            payload["temperature"] = self.temperature
+        return payload
+
+    async def _ainvoke(self, prompt: Any, deadline: Optional[float], model: Optional[str] = None) -> LLMResponse:
+        if self._pool is None:
+            raise LLMRequestError("닫힌 클라이언트입니다.")
+        self._pool.ensure()
+        payload = self._payload(prompt, model)
+        try:
+            return await asyncio.wait_for(self._call_with_hedge(payload), timeout=deadline or self.timeout)
+        except asyncio.TimeoutError:
+            raise LLMRequestError(f"LLM 호출 마감 시간 초과 ({deadline or self.timeout:.1f}s)")
+
+    async def _call_with_hedge(self, payload: Dict[str, Any]) -> LLMResponse:
+        p95 = self.latency.p95() if self.hedge else None
+        if p95 is None:
+            return await self._call_with_retries(payload)
+
+        first = asyncio.ensure_future(self._call_with_retries(payload))
+        done, _ = await asyncio.wait({first}, timeout=max(p95, self.hedge_min_delay))
+        if done:
+            return first.result()
+
+        # p95를 넘겼으면 같은 요청을 한 번 더 보내고 먼저 성공한 쪽을 사용
+        second = asyncio.ensure_future(self._call_with_retries(payload))
+        pending = {first, second}
+        last_exc: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None:
+                        resp = t.result()
+                        resp.hedged = t is second
+                        return resp
+                    last_exc = t.exception()
+            raise last_exc  # type: ignore[misc]
+        finally:
+            for t in pending:
+                t.cancel()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        # full jitter: [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    async def _call_with_retries(self, payload: Dict[str, Any]) -> LLMResponse:
+        last_err = ""
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                return await self._post(payload)
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status not in RETRYABLE_STATUS:
+                    raise LLMRequestError(f"LLM 요청 실패 (HTTP {status}): {e.response.text[:300]}")
+                retry_after = e.response.headers.get("retry-after")
+                last_err = f"HTTP {status}"
+            except httpx.TransportError as e:
+                last_err = f"{type(e).__name__}: {e}"
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        raise LLMRequestError(f"LLM 요청 재시도 {self.max_retries}회 후 실패: {last_err}")
+
+    async def _post(self, payload: Dict[str, Any]) -> LLMResponse:
+        pool = self._pool
+        async with pool.sem:
+            t0 = time.perf_counter()
+            resp = await pool.http.post(
+                "/chat/completions", json=payload, timeout=httpx.Timeout(self.timeout, connect=10.0),
+            )
+            resp.raise_for_status()
+            elapsed = time.perf_counter() - t0
+        self.latency.add(elapsed)
+
+        data = resp.json()
+        usage = data.get("usage") or {}
+        return LLMResponse(
+            content=(data["choices"][0]["message"].get("content") or ""),
+            model=data.get("model", payload["model"]),
+            latency=elapsed,
+            usage_metadata={
+                "input_tokens": int(usage.get("prompt_tokens", 0)),
+                "output_tokens": int(usage.get("completion_tokens", 0)),
+                "total_tokens": int(usage.get("total_tokens", 0)),
+            },
+        )
@@ -0,0 +1,122 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from lexical_index import FIELD_WEIGHTS, extract_playbook_terms
+from risk import detect_risk_mode
+
+
+# =========================================================
+# 로컬 추출 요약 (history_summary 갱신용, LLM 호출 없음)
+# - 사용자 발화를 문장으로 나눠 salience 점수를 매기고,
+#   이전 요약 줄(오래될수록 감쇠)과 함께 상위 줄만 시간순으로 유지
+# - salience: playbook [키워드]/[카테고리]/[감정] 어휘 적중(필드 가중치) + 위험 표현 + 길이
+# - 첫 줄은 지금까지 나온 핵심 감정/키워드 목록 → build_query/어휘 검색에 그대로 도움
+# - LLM 요약(update_history_summary)은 N턴마다만 호출하고, 그 결과도 같은 방식으로 이어받음
+# =========================================================
+HEADER_LABEL = "[핵심 감정/키워드]"
+PLACEHOLDER_PREFIX = "상담 시작."
+
+MAX_BODY_LINES = 4
+MAX_HEADER_TERMS = 8
+MAX_LINE_CHARS = 80
+MIN_TERM_LEN = 2
+
+AGE_DECAY = 0.8      # 이전 요약 줄: 1턴 오래될 때마다 × 0.8
+BASE_SCORE = 0.5     # 어휘 적중이 없어도 남을 수 있게
+RISK_BONUS = 3.0
+SHORT_PENALTY = 0.3  # 6자 미만 문장 ("네", "그쵸" 등)
+MIN_SCORE = 0.2      # 이보다 낮으면 요약에 넣지 않음
+
+_SENT_SPLIT = re.compile(r"(?<=[.!?。？！~])\s+|\n+")
+
+
+class LocalSummarizer:
+    def __init__(self, term_weights: Dict[str, float]):
+        self.term_weights = term_weights
+        # 긴 용어부터 매칭해 "답장텀" 안의 "답장"은 중복 가산하지 않음
+        self.vocab = sorted(term_weights, key=len, reverse=True)
+
+    @classmethod
+    def from_documents(cls, page_contents: Sequence[str]) -> "LocalSummarizer":
+        weights: Dict[str, float] = {}
+        for pc in page_contents:
+            for fname, terms in extract_playbook_terms(pc).items():
+                for t in terms:
+                    weights[t] = max(weights.get(t, 0.0), FIELD_WEIGHTS[fname])
+        return cls(weights)
+
+    @classmethod
+    def from_store(cls, store: Any, doc_type: str = "playbook") -> "LocalSummarizer":
+        got = store.get(where={"doc_type": doc_type}, include=["documents"])
+        return cls.from_documents(got["documents"] or [])
+
+    def terms_in(self, text: str) -> List[str]:
+        t = text or ""
+        compact = re.sub(r"\s+", "", t)
+        found: List[str] = []
+        for term in self.vocab:
+            if (term in compact or term in t) and not any(term in longer for longer in found):
+                found.append(term)
+        return found
+
+    def salience(self, sentence: str) -> float:
+        s = sentence.strip()
+        score = BASE_SCORE + sum(self.term_weights[t] for t in self.terms_in(s))
+        if detect_risk_mode(s):
+            score += RISK_BONUS
+        if len(s) < 6:
+            score *= SHORT_PENALTY
+        return score
+
+    # -----------------------------
+    # 요약 문자열 ↔ (헤더 용어, 본문 줄)
+    # -----------------------------
+    @staticmethod
+    def parse(summary: str) -> Tuple[List[str], List[str]]:
+        header: List[str] = []
+        body: List[str] = []
+        for ln in (summary or "").splitlines():
+            ln = ln.strip()
+            if not ln or ln.startswith(PLACEHOLDER_PREFIX):
+                continue
+            if ln.startswith(HEADER_LABEL):
+                header = [x.strip() for x in ln[len(HEADER_LABEL):].split(",") if x.strip()]
+            else:
+                body.append(ln)
+        return header, body
+
+    @staticmethod
+    def _clip(sentence: str) -> str:
+        s = re.sub(r"\s+", " ", sentence).strip()
+        return s if len(s) <= MAX_LINE_CHARS else s[: MAX_LINE_CHARS - 1] + "…"
+
+    def update(self, prev_summary: str, user_message: str) -> str:
+        """이전 요약 + 최신 사용자 발화 → 새 요약 (헤더 1줄 + 본문 최대 MAX_BODY_LINES 줄)"""
+        header, body = self.parse(prev_summary)
+
+        old: List[Tuple[float, int, str]] = []
+        for i, ln in enumerate(body):
+            age = len(body) - i
+            old.append((self.salience(ln) * (AGE_DECAY ** age), i, ln))
+        sentences = [s for s in _SENT_SPLIT.split(user_message or "") if s and s.strip()]
+        new = [(self.salience(s), len(body) + j, self._clip(s)) for j, s in enumerate(sentences)]
+        new = sorted((c for c in new if c[0] >= MIN_SCORE), key=lambda c: c[0], reverse=True)
+
+        # 최신 발화에서 가장 두드러진 문장 1개는 항상 남김 (요약이 현재 대화를 따라가도록)
+        keep = new[:1]
+        rest = sorted(old + new[1:], key=lambda c: c[0], reverse=True)
+        keep += [c for c in rest if c[0] >= MIN_SCORE][: MAX_BODY_LINES - len(keep)]
+        new_body = [ln for _, _, ln in sorted(keep, key=lambda c: c[1])]
+
+        # 최신 발화의 용어를 앞에 두고 이전 헤더 용어를 이어붙임
+        terms: List[str] = []
+        for t in self.terms_in(user_message) + header:
+            if len(t) >= MIN_TERM_LEN and t not in terms:
+                terms.append(t)
+        lines = ([f"{HEADER_LABEL} {', '.join(terms[:MAX_HEADER_TERMS])}"] if terms else []) + new_body
+        return "\n".join(lines) if lines else (prev_summary or "")
+
+
+def should_use_llm_summary(turn_index: int, every: int, summarizer: Optional[LocalSummarizer]) -> bool:
+    """로컬 요약기가 없거나 N턴째(1-based)면 LLM 요약"""
+    return summarizer is None or every <= 1 or (turn_index + 1) % every == 0
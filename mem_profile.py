@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional
+
+
+# =========================================================
+# 세션별 메모리 / 할당 위치 프로파일링 (MEM_PROFILE=1 일 때만)
+# - 세션: rerun 이 끝날 때 st.session_state 키별 deep size (세션당 MEM_PROFILE_INTERVAL 초에 1번)
+#   순회(최대 MAX_OBJECTS 개)와 스냅샷은 백그라운드 스레드 1개에서 → rerun 은 간격 확인만 하고 끝남
+#   공용 캐시 객체(persona_rules 원소 등)를 참조하면 그 세션에도 크기가 잡힘 → 세션 간 합계는 과대
+# - 프로세스: tracemalloc 상위 할당 위치 + 직전 스냅샷 대비 증가량, 열린 matplotlib Figure 수, max RSS
+# - 보기: ?ops=1 사이드바, 기록: MEM_PROFILE_DUMP(JSONL) 에 스냅샷 1줄씩
+#     python mem_profile.py report stats/mem_profile.jsonl
+# =========================================================
+MAX_OBJECTS = 200_000       # deep size 순회 상한 (큰 세션에서도 rerun 이 멈추지 않게)
+SESSION_TTL = 3600.0        # 이 시간 동안 rerun 이 없던 세션은 목록에서 제거
+TOP_N = 15
+
+# 크기를 따라가지 않는 타입 (공용 런타임 객체)
+_OPAQUE = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+    type(threading.Lock()), threading.Thread, threading.Event, threading.Condition,
+)
+
+
+def deep_size(obj: Any, seen: Optional[set] = None, limit: int = MAX_OBJECTS) -> int:
+    """컨테이너/객체 속성을 따라간 대략적 바이트 수 (seen 을 넘기면 중복 제외)"""
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    visited = 0
+    while stack and visited < limit:
+        o = stack.pop()
+        oid = id(o)
+        if oid in seen or isinstance(o, _OPAQUE):
+            continue
+        seen.add(oid)
+        visited += 1
+        try:
+            total += sys.getsizeof(o)
+        except TypeError:
+            continue
+        if isinstance(o, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        if isinstance(o, Mapping):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            d = getattr(o, "__dict__", None)
+            if isinstance(d, dict):
+                stack.append(d)
+            for slot in getattr(type(o), "__slots__", ()) or ():
+                if isinstance(slot, str) and hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return total
+
+
+def session_breakdown(state: Mapping[str, Any]) -> Dict[str, int]:
+    """키별 deep size (큰 순). 앞 키에서 센 객체는 뒤 키에서 다시 세지 않음"""
+    seen: set = set()
+    sizes = {str(k): deep_size(v, seen) for k, v in state.items()}
+    return dict(sorted(sizes.items(), key=lambda kv: kv[1], reverse=True))
+
+
+def open_figures() -> int:
+    if "matplotlib.pyplot" not in sys.modules:
+        return 0
+    return len(sys.modules["matplotlib.pyplot"].get_fignums())
+
+
+def max_rss_bytes() -> int:
+    # linux: KB, macOS: bytes
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class MemProfiler:
+    def __init__(self, interval: float = 60.0, dump_path: Optional[str] = None, frames: int = 1, top_n: int = TOP_N):
+        self.interval = interval
+        self.dump_path = dump_path
+        self.top_n = top_n
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._lock = threading.Lock()
+        self._snap_lock = threading.Lock()     # snapshot 끼리 직렬화 (_prev 비교/교체, _latest, 덤프)
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._pending: set = set()             # 백그라운드 기록이 대기/진행 중인 세션
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mem-profile")
+        self._prev: Optional[tracemalloc.Snapshot] = None
+        self._last_snapshot = 0.0
+        self._latest: Dict[str, Any] = {}
+
+    # -----------------------------
+    # 세션
+    # -----------------------------
+    def record_session(self, sid: str, state: Mapping[str, Any], force: bool = False) -> None:
+        now = time.time()
+        with self._lock:
+            last = self._sessions.get(sid, {}).get("ts", 0.0)
+            if not force and now - last < self.interval:
+                self._sessions[sid]["seen"] = now
+                return
+        sizes = session_breakdown(state)
+        with self._lock:
+            self._sessions[sid] = {"ts": now, "seen": now, "bytes": sum(sizes.values()), "keys": sizes}
+            for k in [k for k, v in self._sessions.items() if now - v["seen"] > SESSION_TTL]:
+                del self._sessions[k]
+
+    def record_async(self, sid: str, state: Mapping[str, Any]) -> None:
+        """rerun 끝에서 호출: 간격 확인만 요청 스레드에서, deep size 순회/스냅샷은 백그라운드에서"""
+        now = time.time()
+        with self._lock:
+            session_due = sid not in self._pending and now - self._sessions.get(sid, {}).get("ts", 0.0) >= self.interval
+            if session_due:
+                self._pending.add(sid)
+            elif sid in self._sessions:
+                self._sessions[sid]["seen"] = now
+            snapshot_due = now - self._last_snapshot >= self.interval
+            if snapshot_due:
+                self._last_snapshot = now
+        if session_due or snapshot_due:
+            self._executor.submit(self._record_in_background, sid if session_due else None, state, snapshot_due)
+
+    def _record_in_background(self, sid: Optional[str], state: Mapping[str, Any], snapshot_due: bool) -> None:
+        try:
+            if sid is not None:
+                self.record_session(sid, state, force=True)
+            if snapshot_due:
+                self.snapshot()
+        except (OSError, RuntimeError):
+            # RuntimeError: 순회 중 다음 rerun 이 세션 값을 바꿈 → 다음 간격에 다시 기록
+            pass
+        finally:
+            if sid is not None:
+                with self._lock:
+                    self._pending.discard(sid)
+
+    # -----------------------------
+    # 프로세스 스냅샷
+    # -----------------------------
+    def _filtered(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._snap_lock:
+            snap = self._filtered()
+            top = [
+                {"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "bytes": s.size, "count": s.count}
+                for s in snap.statistics("lineno")[: self.top_n]
+            ]
+            growth = []
+            if self._prev is not None:
+                growth = [
+                    {"where": f"{d.traceback[0].filename}:{d.traceback[0].lineno}", "bytes_diff": d.size_diff, "bytes": d.size}
+                    for d in snap.compare_to(self._prev, "lineno")[: self.top_n]
+                    if d.size_diff > 0
+                ]
+            self._prev = snap
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                sessions = {
+                    sid: {"bytes": v["bytes"], "keys": dict(list(v["keys"].items())[:10]), "ts": v["ts"]}
+                    for sid, v in self._sessions.items()
+                }
+            self._latest = {
+                "ts": time.time(),
+                "pid": os.getpid(),
+                "traced_bytes": current,
+                "traced_peak_bytes": peak,
+                "max_rss_bytes": max_rss_bytes(),
+                "open_figures": open_figures(),
+                "sessions": sessions,
+                "top": top,
+                "growth": growth,
+            }
+            if self.dump_path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.dump_path)), exist_ok=True)
+                with open(self.dump_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self._latest, ensure_ascii=False) + "\n")
+            return self._latest
+
+    def latest(self) -> Dict[str, Any]:
+        return self._latest
+
+
+# =========================================================
+# CLI: JSONL 요약
+# =========================================================
+def summarize(path: str, top_n: int = 10) -> Dict[str, Any]:
+    samples: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                samples.append(json.loads(line))
+            except ValueError:
+                continue
+    if not samples:
+        return {"samples": 0}
+
+    session_max: Dict[str, int] = defaultdict(int)
+    key_max: Dict[str, int] = defaultdict(int)
+    for s in samples:
+        for sid, v in s.get("sessions", {}).items():
+            session_max[sid] = max(session_max[sid], v["bytes"])
+            for k, b in v.get("keys", {}).items():
+                key_max[k] = max(key_max[k], b)
+
+    first_top = {t["where"]: t["bytes"] for t in samples[0].get("top", [])}
+    last_top = samples[-1].get("top", [])
+    return {
+        "samples": len(samples),
+        "pids": sorted({s["pid"] for s in samples}),
+        "max_rss_bytes": max(s.get("max_rss_bytes", 0) for s in samples),
+        "open_figures_last": samples[-1].get("open_figures", 0),
+        "largest_sessions": sorted(session_max.items(), key=lambda kv: kv[1], reverse=True)[:top_n],
+        "largest_keys": sorted(key_max.items(), key=lambda kv: kv[1], reverse=True)[:top_n],
+        "top_allocators_last": last_top[:top_n],
+        "grown_since_first": sorted(
+            ({"where": t["where"], "bytes_diff": t["bytes"] - first_top.get(t["where"], 0)} for t in last_top),
+            key=lambda d: d["bytes_diff"], reverse=True,
+        )[:top_n],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="메모리 프로파일 JSONL 요약")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("report")
+    r.add_argument("path")
+    r.add_argument("--top", type=int, default=10)
+    args = ap.parse_args(argv)
+
+    print(json.dumps(summarize(args.path, args.top), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
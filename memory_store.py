@@ -0,0 +1,229 @@
+import argparse
+import fcntl
+import hashlib
+import hmac
+import json
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from local_summary import LocalSummarizer
+
+
+# =========================================================
+# 사용자별 장기 기억 (지난 상담 종료 요약 = episode)
+# - <root>/<sha256(uid)>/episodes.jsonl 한 파일에 사용자 기억 전부 (작게 유지)
+# - 검색: playbook 어휘(감정/키워드) 겹침 × 최근성 → top-k 를 글자 수 예산 안에서만 프롬프트에 넣음
+# - compaction: episode 가 MAX_EPISODES 를 넘으면 오래된 것들을 rollup 1개로 합침
+#   → 사용자당 항목 수 상한이 있어 오래 쓴 사용자도 저장/검색 비용이 일정
+# - 사용자 식별: ?uid=<id>.<HMAC 서명> 토큰 (USER_ID_SECRET 로 서명) 만 인정
+#   서명이 없거나 틀리면 사용자 없음 → 기억 읽기/쓰기 안 함 (세션 id 로 저장하지 않음)
+# - 쓰기는 사용자 디렉터리의 .lock 파일 flock 으로 프로세스 간에도 직렬화
+# =========================================================
+EPISODES_FILE = "episodes.jsonl"
+LOCK_FILE = ".lock"
+SIG_CHARS = 32
+
+MAX_EPISODES = 12      # 이 개수를 넘으면 compaction
+KEEP_RECENT = 6        # compaction 후에도 원문 그대로 남길 최근 episode 수
+TOP_K = 2
+CHAR_BUDGET = 600      # 프롬프트에 넣는 기억 전체 글자 수 상한
+RECENCY_HALF_LIFE_DAYS = 30.0
+ROLLUP_TERMS = 8
+ROLLUP_CONCERNS = 2
+
+
+def user_key(uid: str) -> str:
+    # 디렉터리 이름에 원래 식별자를 쓰지 않음 (경로 조작/노출 방지)
+    return hashlib.sha256(uid.encode("utf-8")).hexdigest()[:32]
+
+
+def sign_user_id(uid: str, secret: str) -> str:
+    """uid → "<uid>.<서명>" (인증을 마친 쪽에서 발급해 ?uid= 로 넘김)"""
+    sig = hmac.new(secret.encode("utf-8"), uid.encode("utf-8"), hashlib.sha256).hexdigest()[:SIG_CHARS]
+    return f"{uid}.{sig}"
+
+
+def verify_user_token(token: Optional[str], secret: Optional[str]) -> Optional[str]:
+    """서명이 맞으면 uid, 아니면 None (secret 이 없으면 항상 None)"""
+    if not token or not secret or "." not in token:
+        return None
+    uid = token.rsplit(".", 1)[0]
+    if not uid or not hmac.compare_digest(sign_user_id(uid, secret), token):
+        return None
+    return uid
+
+
+def _strip_labels(text: str) -> str:
+    # "[감정]" 같은 양식 라벨이 용어로 잡히지 않게
+    return re.sub(r"\[[^\[\]]*\]", " ", text or "")
+
+
+def _label_lines(text: str, label: str) -> List[str]:
+    return [ln.strip() for ln in (text or "").splitlines() if ln.strip().startswith(label)]
+
+
+class MemoryStore:
+    def __init__(self, root: str, summarizer: LocalSummarizer):
+        self.root = Path(root)
+        self.summarizer = summarizer
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, uid: str) -> Path:
+        return self.root / user_key(uid) / EPISODES_FILE
+
+    @contextmanager
+    def _locked(self, uid: str):
+        """같은 프로세스(스레드 락) + 다른 워커(flock) 모두 직렬화"""
+        path = self._path(uid)
+        with self._lock(user_key(uid)):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path.parent / LOCK_FILE, "a") as lf:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield path
+                finally:
+                    fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+    # -----------------------------
+    # 읽기/쓰기
+    # -----------------------------
+    def episodes(self, uid: str) -> List[Dict[str, Any]]:
+        path = self._path(uid)
+        if not path.is_file():
+            return []
+        out = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    continue  # 쓰다 끊긴 마지막 줄
+        return out
+
+    def _rewrite(self, path: Path, episodes: List[Dict[str, Any]]) -> None:
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for ep in episodes:
+                f.write(json.dumps(ep, ensure_ascii=False) + "\n")
+        os.replace(tmp, path)
+
+    def add_episode(self, uid: str, summary: str) -> Dict[str, Any]:
+        ep = {
+            "id": uuid.uuid4().hex,
+            "kind": "episode",
+            "ts": time.time(),
+            "count": 1,
+            "summary": summary.strip(),
+            "terms": self.summarizer.terms_in(_strip_labels(summary)),
+        }
+        with self._locked(uid) as path:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(ep, ensure_ascii=False) + "\n")
+            episodes = self.episodes(uid)
+            if len(episodes) > MAX_EPISODES:
+                self._rewrite(path, self.compact(episodes))
+        return ep
+
+    # -----------------------------
+    # compaction
+    # -----------------------------
+    def compact(self, episodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """오래된 episode(+기존 rollup)를 rollup 1개로 합치고 최근 KEEP_RECENT 개는 유지"""
+        episodes = sorted(episodes, key=lambda e: e["ts"])
+        old, recent = episodes[:-KEEP_RECENT], episodes[-KEEP_RECENT:]
+        if len(old) < 2:
+            return episodes
+
+        terms: Counter = Counter()
+        for e in old:
+            # rollup 은 이미 여러 회차를 합친 것이므로 그 회차 수만큼 가중
+            terms.update({t: e.get("count", 1) for t in e.get("terms", [])})
+        concerns = [ln for e in old for ln in _label_lines(e["summary"], "[핵심 고민]")]
+        concerns = sorted(concerns, key=self.summarizer.salience, reverse=True)[:ROLLUP_CONCERNS]
+        steps = [ln for e in old for ln in _label_lines(e["summary"], "[다음 한 걸음]")]
+
+        count = sum(e.get("count", 1) for e in old)
+        d0 = time.strftime("%Y-%m-%d", time.localtime(old[0].get("ts_from", old[0]["ts"])))
+        d1 = time.strftime("%Y-%m-%d", time.localtime(old[-1]["ts"]))
+        top_terms = [t for t, _ in terms.most_common(ROLLUP_TERMS)]
+        lines = [f"[지난 상담 {count}회 누적] {d0} ~ {d1}"]
+        if top_terms:
+            lines.append(f"[반복 감정/키워드] {', '.join(top_terms)}")
+        lines += concerns + steps[-1:]
+
+        rollup = {
+            "id": uuid.uuid4().hex,
+            "kind": "rollup",
+            "ts": old[-1]["ts"],
+            "ts_from": old[0].get("ts_from", old[0]["ts"]),
+            "count": count,
+            "summary": "\n".join(lines),
+            "terms": top_terms,
+        }
+        return [rollup] + recent
+
+    # -----------------------------
+    # 검색
+    # -----------------------------
+    def search(self, uid: str, query: str, k: int = TOP_K) -> List[Dict[str, Any]]:
+        episodes = self.episodes(uid)
+        if not episodes:
+            return []
+        q_terms = set(self.summarizer.terms_in(_strip_labels(query)))
+        now = time.time()
+
+        def score(e: Dict[str, Any]) -> float:
+            overlap = sum(self.summarizer.term_weights.get(t, 1.0) for t in q_terms.intersection(e.get("terms", [])))
+            age_days = max(0.0, (now - e["ts"]) / 86400)
+            recency = math.pow(0.5, age_days / RECENCY_HALF_LIFE_DAYS)
+            # 겹치는 용어가 없어도 가장 최근 기억은 약하게 남도록 recency 를 더함
+            return overlap * (0.5 + 0.5 * recency) + 0.1 * recency
+
+        return sorted(episodes, key=score, reverse=True)[:k]
+
+    def context(self, uid: str, query: str, k: int = TOP_K, budget: int = CHAR_BUDGET) -> str:
+        """top-k 기억을 budget 글자 안에서 프롬프트용 문자열로"""
+        blocks: List[str] = []
+        used = 0
+        for e in self.search(uid, query, k):
+            when = time.strftime("%Y-%m-%d", time.localtime(e["ts"]))
+            block = f"({when})\n{e['summary']}" if e["kind"] == "episode" else e["summary"]
+            if used + len(block) > budget:
+                remain = budget - used
+                if remain < 80:
+                    break
+                block = block[: remain - 1] + "…"
+            blocks.append(block)
+            used += len(block)
+        return "\n\n".join(blocks)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from config import USER_ID_SECRET
+
+    ap = argparse.ArgumentParser(description="장기 기억용 사용자 토큰 발급")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    t = sub.add_parser("sign")
+    t.add_argument("uid")
+    args = ap.parse_args(argv)
+
+    if not USER_ID_SECRET:
+        raise SystemExit("USER_ID_SECRET 이 설정되지 않았습니다.")
+    print(sign_user_id(args.uid, USER_ID_SECRET))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from scheduler import LAST_SLOT_MS
+
+
+# =========================================================
+# 호출 위치별 모델 티어 라우팅
+# - 티어 2개: fast(요약 유지/짧은 일반 턴) / strong(위험 턴/종료 요약/긴 턴)
+# - 호출 위치(site)마다 fast / strong / auto 지정 (MODEL_ROUTES)
+#     auto: 위험 모드가 아니고 사용자 발화가 짧으면 fast, 아니면 strong
+# - 자동 강등: strong 티어 최근 p95 지연 > 예산, 또는 시간창 내 지출 > 예산이면
+#   위험 모드가 아닌 호출은 fast 로 (위험 모드 호출은 항상 strong 유지)
+#   지연 표본은 시간창이 지나면 버려지므로 강등 상태는 저절로 풀림
+#   지연은 스케줄러 슬롯 안의 제공자 호출 시간만 (로컬 대기열이 길어서 강등되지 않게)
+# - 결정/지연/토큰/지출은 metrics() 로 (?ops=1 사이드바)
+# =========================================================
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+ROUTE_AUTO = "auto"
+
+DEFAULT_ROUTES = {
+    "answer": ROUTE_AUTO,
+    "answer_risk": TIER_STRONG,
+    "history_summary": TIER_FAST,
+    "final_summary": TIER_STRONG,
+}
+
+# USD / 1M 토큰 (입력, 출력) — 목록에 없는 모델은 지출 0 으로 계산
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-5": (1.25, 10.00),
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+MIN_LATENCY_SAMPLES = 5
+
+
+def parse_routes(spec: Optional[str]) -> Dict[str, str]:
+    """"answer=auto,history_summary=fast" → DEFAULT_ROUTES 에 덮어쓴 dict"""
+    routes = dict(DEFAULT_ROUTES)
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        site, tier = (x.strip() for x in part.split("=", 1))
+        if tier in (TIER_FAST, TIER_STRONG, ROUTE_AUTO):
+            routes[site] = tier
+    return routes
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+class _TimedWindow:
+    """최근 window 초 안의 (시각, 값) 표본"""
+
+    def __init__(self, window_sec: float):
+        self.window_sec = window_sec
+        self.samples: Deque[Tuple[float, float]] = deque()
+        self._lock = threading.Lock()
+
+    def _trim_locked(self, now: float) -> None:
+        while self.samples and now - self.samples[0][0] > self.window_sec:
+            self.samples.popleft()
+
+    def add(self, value: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.samples.append((now, value))
+            self._trim_locked(now)
+
+    def values(self) -> list:
+        with self._lock:
+            self._trim_locked(time.monotonic())
+            return [v for _, v in self.samples]
+
+    def p95(self, min_samples: int = MIN_LATENCY_SAMPLES) -> Optional[float]:
+        xs = sorted(self.values())
+        if len(xs) < min_samples:
+            return None
+        return xs[min(len(xs) - 1, int(round(0.95 * (len(xs) - 1))))]
+
+    def total(self) -> float:
+        return sum(self.values())
+
+
+class RoutedLLM:
+    """선택된 티어 LLM — invoke 시 지연/토큰을 라우터에 기록 (나머지 속성은 위임)"""
+
+    def __init__(self, router: "ModelRouter", tier: str):
+        self.router = router
+        self.tier = tier
+        self.inner = router.tiers[tier]["llm"]
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        token = LAST_SLOT_MS.set(None)
+        try:
+            msg = self.inner.invoke(prompt, *args, **kwargs)
+            latency_ms = LAST_SLOT_MS.get()
+        finally:
+            LAST_SLOT_MS.reset(token)
+        self.router.record(self.tier, latency_ms, getattr(msg, "usage_metadata", None))
+        return msg
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        tiers: Dict[str, Dict[str, Any]],
+        routes: Optional[Dict[str, str]] = None,
+        short_turn_chars: int = 40,
+        p95_budget_ms: float = 0.0,
+        spend_budget_usd: float = 0.0,
+        window_sec: float = 3600.0,
+        latency_window_sec: float = 300.0,
+    ):
+        """tiers: {"fast": {"llm": ..., "model": "gpt-5-mini"}, "strong": {...}}, 예산 0 = 제한 없음"""
+        self.tiers = tiers
+        self.routes = routes or dict(DEFAULT_ROUTES)
+        self.short_turn_chars = short_turn_chars
+        self.p95_budget_ms = p95_budget_ms
+        self.spend_budget_usd = spend_budget_usd
+        self._latency = {t: _TimedWindow(latency_window_sec) for t in tiers}
+        self._spend = _TimedWindow(window_sec)
+        self._lock = threading.Lock()
+        self._decisions: Counter = Counter()
+        self._calls: Counter = Counter()
+        self._tokens: Dict[str, Counter] = {t: Counter() for t in tiers}
+
+    # -----------------------------
+    # 선택
+    # -----------------------------
+    def downgrade_reason(self) -> Optional[str]:
+        if self.spend_budget_usd > 0 and self._spend.total() > self.spend_budget_usd:
+            return "spend_budget"
+        if self.p95_budget_ms > 0:
+            p95 = self._latency[TIER_STRONG].p95()
+            if p95 is not None and p95 > self.p95_budget_ms:
+                return "p95_budget"
+        return None
+
+    def choose(self, site: str, risk: bool = False, user_message: str = "") -> Tuple[str, str]:
+        """→ (tier, reason)"""
+        route = self.routes.get(site, TIER_STRONG)
+        if route == ROUTE_AUTO:
+            if risk:
+                tier, reason = TIER_STRONG, "risk"
+            elif len((user_message or "").strip()) <= self.short_turn_chars:
+                tier, reason = TIER_FAST, "short_turn"
+            else:
+                tier, reason = TIER_STRONG, "long_turn"
+        else:
+            tier, reason = route, "route"
+
+        if tier == TIER_STRONG and not risk:
+            why = self.downgrade_reason()
+            if why:
+                tier, reason = TIER_FAST, why
+        if tier not in self.tiers:
+            tier = TIER_STRONG
+        return tier, reason
+
+    def pick(self, site: str, risk: bool = False, user_message: str = "") -> RoutedLLM:
+        tier, reason = self.choose(site, risk, user_message)
+        with self._lock:
+            self._decisions[f"{site}:{tier}:{reason}"] += 1
+        return RoutedLLM(self, tier)
+
+    # -----------------------------
+    # 기록 / 지표
+    # -----------------------------
+    def record(self, tier: str, latency_ms: Optional[float], usage: Optional[Dict[str, Any]] = None) -> None:
+        """latency_ms=None: 다른 호출의 결과를 공유받아 제공자 지연이 없음 (지연 표본에서 제외)"""
+        usage = usage or {}
+        tin = int(usage.get("input_tokens") or 0)
+        tout = int(usage.get("output_tokens") or 0)
+        if latency_ms is not None:
+            self._latency[tier].add(latency_ms)
+        self._spend.add(estimate_cost(self.tiers[tier].get("model", ""), tin, tout))
+        with self._lock:
+            self._calls[tier] += 1
+            self._tokens[tier].update({"input_tokens": tin, "output_tokens": tout})
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            decisions = dict(self._decisions)
+            calls = dict(self._calls)
+            tokens = {t: dict(c) for t, c in self._tokens.items()}
+        p95 = {t: w.p95() for t, w in self._latency.items()}
+        return {
+            "models": {t: cfg.get("model") for t, cfg in self.tiers.items()},
+            "routes": self.routes,
+            "decisions": decisions,
+            "calls": calls,
+            "tokens": tokens,
+            "p95_ms": {t: (round(v, 1) if v is not None else None) for t, v in p95.items()},
+            "p95_budget_ms": self.p95_budget_ms,
+            "spend_window_usd": round(self._spend.total(), 6),
+            "spend_budget_usd": self.spend_budget_usd,
+            "downgrade": self.downgrade_reason(),
+        }
@@ -0,0 +1,193 @@
+import argparse
+import os
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from hnsw_tuner import DEFAULT_CONFIG_PATH, create_hnsw_collection, load_hnsw_config, read_collection
+from shared_index import COLLECTIONS, DEFAULT_PERSIST_ROOT
+
+
+# =========================================================
+# doc_type 별 물리 분할 컬렉션 + 라우터
+# - counsel_db / risk_protocol / user_profile 을 doc_type 마다 별도 HNSW 색인으로 분할
+#     <root>/<collection>/ 안에 "<collection>.<doc_type>" 컬렉션들
+# - 라우터: filter 의 doc_type 으로 분할 색인 1개만 검색 (사후 필터 없음 → 항상 k개)
+#   나머지 조건(step_id 등)만 그 색인에 where 로 전달
+# - doc_type 이 없는 검색은 질의를 1번만 임베딩해 모든 분할을 검색 후 거리순 병합
+# - 생성: python partitioned_store.py build  (임베딩 API 호출 없음)
+# =========================================================
+PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_PARTITION_ROOT = PROJECT_ROOT / "chroma_partitioned"
+
+HNSW_DEFAULTS = {"max_neighbors": 16, "ef_construction": 100, "ef_search": 100}
+
+
+def partition_name(collection: str, doc_type: str) -> str:
+    return f"{collection}.{doc_type}"
+
+
+def split_doc_type(where: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """where → (doc_type, 나머지 조건). doc_type 이 $eq/값 하나로 지정된 경우만 라우팅"""
+    if not where:
+        return None, None
+    clauses = list(where["$and"]) if set(where) == {"$and"} else [{k: v} for k, v in where.items()]
+    doc_type = None
+    rest = []
+    for c in clauses:
+        if set(c) == {"doc_type"}:
+            cond = c["doc_type"]
+            if isinstance(cond, dict) and set(cond) == {"$eq"}:
+                cond = cond["$eq"]
+            if not isinstance(cond, dict):
+                doc_type = cond
+                continue
+        rest.append(c)
+    if not rest:
+        return doc_type, None
+    return doc_type, (rest[0] if len(rest) == 1 else {"$and": rest})
+
+
+def build_partitions(persist_root: str, out_root: str, collection: str, hnsw: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    import chromadb
+
+    data = read_collection(os.path.join(persist_root, collection), collection)
+    groups: Dict[str, List[int]] = defaultdict(list)
+    for i, md in enumerate(data["metadatas"]):
+        groups[str((md or {}).get("doc_type") or "unknown")].append(i)
+
+    params = {**HNSW_DEFAULTS, **(hnsw or {})}
+    out = Path(out_root) / collection
+    tmp = out.with_name(f"{out.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    client = chromadb.PersistentClient(path=str(tmp))
+    counts = {}
+    for doc_type, rows in groups.items():
+        part = {
+            "ids": [data["ids"][i] for i in rows],
+            "embeddings": data["embeddings"][rows],
+            "documents": [data["documents"][i] for i in rows],
+            "metadatas": [data["metadatas"][i] for i in rows],
+        }
+        create_hnsw_collection(
+            client, partition_name(collection, doc_type),
+            int(params["max_neighbors"]), int(params["ef_construction"]), int(params["ef_search"]), part,
+        )
+        counts[doc_type] = len(rows)
+
+    old = out.with_name(f"{out.name}.old-{os.getpid()}")
+    if out.exists():
+        out.rename(old)
+    tmp.rename(out)
+    shutil.rmtree(old, ignore_errors=True)
+    return counts
+
+
+class PartitionedStore:
+    """doc_type → 분할 스토어 라우터 (앱이 쓰는 Chroma 검색/조회 API만)"""
+
+    def __init__(self, partitions: Dict[str, Any], embedding_function: Any = None):
+        self.partitions = partitions
+        self._embedding_function = embedding_function
+
+    @property
+    def embeddings(self) -> Any:
+        return self._embedding_function
+
+    def _targets(self, where: Optional[Dict[str, Any]]) -> Tuple[List[Any], Optional[Dict[str, Any]]]:
+        doc_type, rest = split_doc_type(where)
+        if doc_type is None:
+            return list(self.partitions.values()), rest
+        store = self.partitions.get(doc_type)
+        return ([store] if store is not None else []), rest
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        stores, rest = self._targets(filter)
+        hits: List[Tuple[Document, float]] = []
+        for store in stores:
+            hits.extend(store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=rest))
+        # 모든 분할이 같은 l2 공간 → 거리 그대로 병합
+        return sorted(hits, key=lambda x: x[1])[:k]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Tuple[Document, float]]:
+        stores, _ = self._targets(filter)
+        if not stores:
+            return []
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        include: Optional[List[str]] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        stores, rest = self._targets(where)
+        include = include or ["documents", "metadatas"]
+        out: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        for store in stores:
+            got = store.get(ids=ids, where=rest, include=include)
+            for key in out:
+                if got.get(key) is not None:
+                    out[key].extend(list(got[key]))
+        if limit is not None:
+            out = {key: v[:limit] for key, v in out.items()}
+        return {key: (v if key == "ids" or key in include else None) for key, v in out.items()}
+
+
+def load_partitioned_store(partition_root: str, collection: str, embedding_function: Any = None) -> PartitionedStore:
+    import chromadb
+    from langchain_chroma import Chroma
+
+    path = Path(partition_root) / collection
+    if not path.is_dir():
+        raise FileNotFoundError(
+            f"partitioned index not found: {path}\n"
+            f"먼저 `python partitioned_store.py build` 로 분할 색인을 생성하세요."
+        )
+    client = chromadb.PersistentClient(path=str(path))
+    prefix = f"{collection}."
+    partitions = {
+        c.name[len(prefix):]: Chroma(client=client, collection_name=c.name, embedding_function=embedding_function)
+        for c in client.list_collections()
+        if c.name.startswith(prefix)
+    }
+    return PartitionedStore(partitions, embedding_function)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="doc_type 별 분할 컬렉션 생성")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--persist-root", default=str(DEFAULT_PERSIST_ROOT))
+    b.add_argument("--out", default=str(DEFAULT_PARTITION_ROOT))
+    b.add_argument("--collections", nargs="*", default=list(COLLECTIONS))
+    b.add_argument("--hnsw-config", default=str(DEFAULT_CONFIG_PATH), help="hnsw_tuner.py tune 결과 (있으면 사용)")
+    args = ap.parse_args(argv)
+
+    hnsw = load_hnsw_config(args.hnsw_config)
+    for name in args.collections:
+        counts = build_partitions(args.persist_root, args.out, name, hnsw.get(name))
+        print(f"[build] {name}: " + ", ".join(f"{t}={n}" for t, n in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import atexit
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from memory_store import user_key
+
+
+# =========================================================
+# user_profile 컬렉션 write-behind (doc_type="user_state", 사용자당 문서 1개)
+# - update(): 메모리 버퍼에 사용자별로 합쳐 두고(같은 사용자 여러 번 → 1건) 저널에 1줄 추가 후 바로 반환
+#   → 턴/제출 처리 시간에 임베딩·VectorDB 쓰기가 들어가지 않음
+# - 백그라운드 스레드가 FLUSH_INTERVAL 마다 또는 버퍼가 MAX_BATCH 명이면
+#   기존 상태 일괄 조회 → 병합 → embed_documents 1번 → upsert 1번
+# - 저널: <dir>/journal-<pid>.jsonl (추가 + fsync). flush 직전에 sealed-<pid>-<seq>.jsonl 로 봉인하고
+#   upsert 가 성공하면 삭제. 시작 시 죽은 프로세스의 저널/봉인 파일을 내 sealed 이름으로 rename 해서
+#   가져온 뒤(rename 은 원자적 → 동시에 시작한 워커 중 한 곳만 가져감) 다시 flush
+# - 저널 항목마다 eid 를 두고 문서 메타데이터 applied_eids 에 최근 적용분을 남김
+#   → upsert 후 봉인 파일 삭제 전에 죽어 재생돼도 incr 가 두 번 더해지지 않음
+# - 조회 → 병합 → 임베딩은 lock 밖에서, <dir>/.write.lock flock 안에서는 다시 조회해 메타데이터가 그대로인지
+#   확인하고 upsert 만 (임베딩 네트워크 호출이 호스트 전체 lock 을 잡지 않게). 그 사이 다른 워커가 같은 문서를
+#   바꿨으면 lock 을 풀고 다시 병합·임베딩 (WRITE_RETRIES 번 실패하면 다음 flush 에 재시도)
+# =========================================================
+DOC_TYPE = "user_state"
+FLUSH_INTERVAL = 5.0
+MAX_BATCH = 32
+SUMMARY_CHARS = 400
+APPLIED_EIDS_KEEP = 128   # 문서마다 기억하는 최근 적용 항목 수
+WRITE_LOCK = ".write.lock"
+WRITE_RETRIES = 3
+
+_JOURNAL_RE = re.compile(r"^(journal|sealed)-(\d+)(?:-(\d+))?\.jsonl$")
+
+# 문서 본문에 쓰는 필드 (라벨, 필드)
+STATE_LABELS = (
+    ("[유형]", "type_name"),
+    ("[애착]", "attachment_type"),
+    ("[감정조절]", "emotion_reg"),
+    ("[효능감]", "efficacy"),
+    ("[최근 감정/키워드]", "recent_terms"),
+    ("[최근 상담 요약]", "last_summary"),
+)
+
+
+def state_doc_id(uid: str) -> str:
+    return f"{DOC_TYPE}:{user_key(uid)}"
+
+
+def render_state_doc(fields: Dict[str, Any]) -> str:
+    lines = ["[사용자 상태]"]
+    for label, key in STATE_LABELS:
+        if fields.get(key) not in (None, ""):
+            lines.append(f"{label} {fields[key]}")
+    if "self_model" in fields:
+        lines.append(
+            f"[점수] 자기 {fields['self_model']:.0f} · 타인 {fields['other_model']:.0f} · "
+            f"표현 {fields['expression_score']:.1f} · 효능감 {fields['efficacy_score']:.1f}"
+        )
+    if fields.get("sessions"):
+        lines.append(f"[상담 횟수] {fields['sessions']}회 (위험 신호 {fields.get('risk_sessions', 0)}회)")
+    return "\n".join(lines)
+
+
+def _scalar(v: Any) -> Any:
+    # Chroma 메타데이터는 str/int/float/bool 만
+    if isinstance(v, (str, int, float, bool)):
+        return v
+    return json.dumps(v, ensure_ascii=False)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _new_pending(uid_key: Optional[str]) -> Dict[str, Any]:
+    return {"uid_key": uid_key, "set": {}, "incr": {}, "ts": 0.0}
+
+
+def _merge(dst: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    """버퍼 항목 병합: set 은 덮어쓰기, incr 은 항목(eid)별로 보관 (적용 여부를 eid 로 판단)"""
+    dst["set"].update(entry.get("set") or {})
+    if entry.get("eid"):
+        dst["incr"][entry["eid"]] = entry.get("incr") or {}
+    else:
+        # 버퍼끼리 합칠 때 (entry 가 _new_pending 형태)
+        dst["incr"].update(entry.get("incr") or {})
+    dst["ts"] = max(dst.get("ts", 0.0), entry.get("ts", 0.0))
+
+
+class ProfileWriter:
+    def __init__(
+        self,
+        resolve_target: Callable[[], Tuple[Any, Any]],
+        journal_dir: str,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_batch: int = MAX_BATCH,
+    ):
+        """resolve_target() → (chromadb Collection, embed_documents 를 가진 객체)
+        첫 flush 때 백그라운드 스레드에서 호출 (VectorDB 로드도 호출 측 대기 시간에 들어가지 않게)"""
+        self._resolve_target = resolve_target
+        self._target: Optional[Tuple[Any, Any]] = None
+        self.dir = Path(journal_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._pending: Dict[str, Dict[str, Any]] = {}   # doc id → {"set", "incr": {eid: incr}, "ts"}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._seq = 0
+        self._journal_path = self.dir / f"journal-{os.getpid()}.jsonl"
+        self._stats = {"updates": 0, "coalesced": 0, "flushes": 0, "docs_written": 0, "errors": 0, "replayed_skipped": 0}
+        self._last_error: Optional[str] = None
+
+        # 같은 pid 의 이전 실행이 남긴 저널도 가져가도록 저널을 열기 전에 복구
+        self._recover()
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._flush_loop, name="profile-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # -----------------------------
+    # 쓰기 (호출 측 스레드, 빠름)
+    # -----------------------------
+    def update(self, uid: str, set_fields: Optional[Dict[str, Any]] = None, incr: Optional[Dict[str, int]] = None) -> None:
+        entry = {
+            "id": state_doc_id(uid), "eid": uuid.uuid4().hex, "uid_key": user_key(uid),
+            "set": set_fields or {}, "incr": incr or {}, "ts": time.time(),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._journal.write(line)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._add_locked(entry)
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def _add_locked(self, entry: Dict[str, Any]) -> None:
+        self._stats["updates"] += 1
+        cur = self._pending.get(entry["id"])
+        if cur is None:
+            cur = self._pending[entry["id"]] = _new_pending(entry.get("uid_key"))
+        else:
+            self._stats["coalesced"] += 1
+        _merge(cur, entry)
+
+    # -----------------------------
+    # flush (백그라운드)
+    # -----------------------------
+    def _flush_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break  # 마지막 flush 는 close() 가 함
+            self.flush()
+
+    def _sealed_name(self, seq: int) -> str:
+        return f"sealed-{os.getpid()}-{seq:06d}.jsonl"
+
+    def _seal_locked(self) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """버퍼를 꺼내고 현재 저널을 봉인 → (배치, 봉인 번호). 재시도 배치처럼 새 저널 줄이 없으면 봉인 생략"""
+        batch, self._pending = self._pending, {}
+        if batch and self._journal.tell() > 0:
+            self._journal.close()
+            self._seq += 1
+            os.replace(self._journal_path, self.dir / self._sealed_name(self._seq))
+            self._journal = open(self._journal_path, "a", encoding="utf-8")
+        return batch, self._seq
+
+    def flush(self) -> int:
+        """버퍼 전체를 일괄 upsert → 기록한 문서 수 (실패하면 버퍼로 되돌리고 0)"""
+        with self._flush_lock:
+            with self._lock:
+                batch, sealed_seq = self._seal_locked()
+            if not batch:
+                return 0
+            try:
+                n = self._write_batch(batch)
+            except Exception as e:
+                with self._lock:
+                    # 그 사이 들어온 최신 값이 이기도록: 실패한 배치를 먼저 깔고 현재 버퍼를 덮어씀
+                    newer, self._pending = self._pending, {}
+                    for doc_id, cur in list(batch.items()) + list(newer.items()):
+                        base = self._pending.setdefault(doc_id, _new_pending(cur.get("uid_key")))
+                        _merge(base, cur)
+                    self._stats["errors"] += 1
+                    self._last_error = f"{type(e).__name__}: {e}"
+                return 0
+            # 성공: 이번 및 이전(실패 후 재시도로 포함된) 봉인 파일 삭제
+            upto = self._sealed_name(sealed_seq)
+            for path in self._sealed_files(os.getpid()):
+                if path.name <= upto:
+                    path.unlink(missing_ok=True)
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["docs_written"] += n
+            return n
+
+    def _write_batch(self, batch: Dict[str, Dict[str, Any]]) -> int:
+        if self._target is None:
+            self._target = self._resolve_target()
+        collection, embeddings = self._target
+        ids = list(batch)
+        existing = self._get_metadatas(collection, ids)
+        for _ in range(WRITE_RETRIES):
+            docs, metas, skipped = self._merge_batch(batch, existing)
+            vectors = embeddings.embed_documents(docs)
+            with open(self.dir / WRITE_LOCK, "a") as lf:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+                current = self._get_metadatas(collection, ids)
+                if current == existing:
+                    collection.upsert(ids=ids, embeddings=vectors, documents=docs, metadatas=metas)
+                    with self._lock:
+                        self._stats["replayed_skipped"] += skipped
+                    return len(ids)
+            existing = current  # 임베딩하는 사이 다른 워커가 씀 → 새 상태로 다시 병합
+        raise RuntimeError(f"user_state 동시 갱신 충돌 {WRITE_RETRIES}회")
+
+    @staticmethod
+    def _get_metadatas(collection: Any, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        got = collection.get(ids=ids, include=["metadatas"])
+        return {i: (md or {}) for i, md in zip(got.get("ids") or [], got.get("metadatas") or [])}
+
+    @staticmethod
+    def _merge_batch(
+        batch: Dict[str, Dict[str, Any]], existing: Dict[str, Dict[str, Any]]
+    ) -> Tuple[List[str], List[Dict[str, Any]], int]:
+        """기존 메타데이터 + 배치 → (문서들, 메타데이터들, applied_eids 로 건너뛴 incr 수)"""
+        docs: List[str] = []
+        metas: List[Dict[str, Any]] = []
+        skipped = 0
+        for doc_id, entry in batch.items():
+            fields = dict(existing.get(doc_id, {}))
+            applied: List[str] = json.loads(fields.pop("applied_eids", None) or "[]")
+            fields.update(entry["set"])
+            for eid, incr in entry["incr"].items():
+                if eid in applied:
+                    skipped += 1
+                    continue  # 이미 upsert 된 항목의 재생
+                for k, v in incr.items():
+                    fields[k] = int(fields.get(k) or 0) + v
+                applied.append(eid)
+            fields.update({
+                "doc_type": DOC_TYPE, "user_key": entry.get("uid_key") or "", "updated_at": entry["ts"],
+                "applied_eids": json.dumps(applied[-APPLIED_EIDS_KEEP:]),
+            })
+            docs.append(render_state_doc(fields))
+            metas.append({k: _scalar(v) for k, v in fields.items() if v is not None})
+        return docs, metas, skipped
+
+    # -----------------------------
+    # 복구 / 종료
+    # -----------------------------
+    def _sealed_files(self, pid: int) -> List[Path]:
+        return sorted(self.dir.glob(f"sealed-{pid}-*.jsonl"))
+
+    def _recover(self) -> None:
+        """죽은 프로세스(및 같은 pid 의 이전 실행)가 남긴 저널/봉인 파일을 내 봉인 파일로 가져와 버퍼로
+        (가져온 파일은 다음 flush 가 성공하면 내 봉인 파일과 함께 삭제)"""
+        me = os.getpid()
+        candidates: List[Path] = []
+        for path in sorted(self.dir.iterdir()):
+            m = _JOURNAL_RE.match(path.name)
+            if not m:
+                continue
+            pid = int(m.group(2))
+            if pid == me and m.group(3):
+                self._seq = max(self._seq, int(m.group(3)))
+            if pid == me or not _pid_alive(pid):
+                candidates.append(path)
+
+        claimed: List[Path] = []
+        for path in candidates:
+            self._seq += 1
+            target = self.dir / self._sealed_name(self._seq)
+            try:
+                os.rename(path, target)
+            except FileNotFoundError:
+                continue  # 다른 워커가 먼저 가져감
+            claimed.append(target)
+
+        entries: List[Dict[str, Any]] = []
+        for path in claimed:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # 쓰다 끊긴 마지막 줄
+        if not entries:
+            for path in claimed:
+                path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            for entry in sorted(entries, key=lambda e: e.get("ts", 0.0)):
+                entry.setdefault("eid", uuid.uuid4().hex)  # eid 이전 형식
+                self._add_locked(entry)
+        self._wake.set()
+
+    def close(self) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=self.flush_interval)
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._journal.close()
+                # 남은 것이 없으면 빈 저널 정리
+                if self._journal_path.exists() and self._journal_path.stat().st_size == 0:
+                    self._journal_path.unlink(missing_ok=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending), "last_error": self._last_error}
@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from shared_index import (
+    COLLECTIONS, DEFAULT_MMAP_ROOT, DEFAULT_PERSIST_ROOT, MANIFEST_FILE, VECTORS_FILE, MmapVectorStore,
+)
+
+
+# =========================================================
+# 축소 차원 + 양자화 벡터 인덱스 (shared_index mmap export 위에 추가)
+# - text-embedding-3-large 는 앞쪽 차원만 잘라도(Matryoshka) 의미가 유지됨
+#   → 앞 dim 개만 남기고 다시 정규화
+# - int8: 차원별 스케일로 [-127, 127] 양자화 (float 3072 대비 48배 작음 @256)
+# - binary: 부호 비트만 packbits (Hamming 거리, float 대비 384배 작음 @256)
+# - 검색: 양자화 벡터로 후보 k×oversample 개 → 원본 float 벡터(mmap)로 정확 L2 재정렬
+#   (원본은 후보 행 페이지만 읽으므로 상주 메모리는 양자화 배열 크기 수준)
+# - 생성: python quant_index.py build  /  비교: python quant_index.py bench
+# =========================================================
+QUANT_FILE = "quant.json"
+KINDS = ("int8", "binary")
+MIN_CANDIDATES = 32
+
+# 0~255 의 1 비트 개수 (Hamming 거리용)
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+
+def truncate_normalize(x: np.ndarray, dim: int) -> np.ndarray:
+    t = np.asarray(x, dtype=np.float32)[..., :dim]
+    n = np.linalg.norm(t, axis=-1, keepdims=True)
+    return t / np.maximum(n, 1e-12)
+
+
+def _codes_file(dim: int, kind: str) -> str:
+    return f"q{dim}_{kind}.npy"
+
+
+def _scale_file(dim: int) -> str:
+    return f"q{dim}_int8_scale.npy"
+
+
+def _save_atomic(path: Path, arr: np.ndarray) -> None:
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}.npy")
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def build_quantized(index_dir: str, dim: int, kinds: Sequence[str] = KINDS) -> Dict[str, Any]:
+    """export 된 vectors.npy → 축소/양자화 파일 생성 (export 를 다시 하면 다시 build)"""
+    d = Path(index_dir)
+    vectors = np.load(d / VECTORS_FILE, mmap_mode="r")
+    if dim > vectors.shape[1]:
+        raise ValueError(f"dim={dim} > 원본 차원 {vectors.shape[1]}")
+    t = truncate_normalize(vectors, dim)
+
+    info: Dict[str, Any] = {}
+    if (d / QUANT_FILE).is_file():
+        with open(d / QUANT_FILE, "r", encoding="utf-8") as f:
+            info = json.load(f)
+    built = info.setdefault("built", {})
+
+    for kind in kinds:
+        if kind == "int8":
+            scale = (np.abs(t).max(axis=0) / 127.0).astype(np.float32)
+            scale = np.maximum(scale, 1e-12)
+            codes = np.clip(np.rint(t / scale), -127, 127).astype(np.int8)
+            _save_atomic(d / _scale_file(dim), scale)
+        elif kind == "binary":
+            codes = np.packbits(t > 0, axis=1)
+        else:
+            raise ValueError(f"unknown kind: {kind}")
+        _save_atomic(d / _codes_file(dim, kind), codes)
+        built[f"{dim}/{kind}"] = {"dim": dim, "kind": kind, "bytes": int(codes.nbytes), "count": int(len(codes))}
+
+    with open(d / QUANT_FILE, "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return info
+
+
+class QuantizedVectorStore(MmapVectorStore):
+    """양자화 후보 검색 + float 재정렬 (검색 결과/점수 형식은 MmapVectorStore 와 동일한 L2)"""
+
+    def __init__(
+        self,
+        index_dir: str,
+        embedding_function: Any = None,
+        dim: int = 256,
+        kind: str = "int8",
+        oversample: int = 8,
+    ):
+        super().__init__(index_dir, embedding_function=embedding_function)
+        path = self.index_dir / _codes_file(dim, kind)
+        if not path.is_file():
+            raise FileNotFoundError(
+                f"quantized index not found: {path}\n"
+                f"먼저 `python quant_index.py build --dim {dim} --kinds {kind}` 로 생성하세요."
+            )
+        self.dim = dim
+        self.kind = kind
+        self.oversample = oversample
+        # 양자화 배열은 작으므로 메모리에 올림 (원본 float 는 mmap 그대로)
+        self.codes = np.load(path)
+        self.scale = np.load(self.index_dir / _scale_file(dim)) if kind == "int8" else None
+
+    def coarse_scores(self, q: np.ndarray, idx: Optional[np.ndarray]) -> np.ndarray:
+        """클수록 가까움"""
+        qt = truncate_normalize(q, self.dim)
+        codes = self.codes if idx is None else self.codes[idx]
+        if self.kind == "int8":
+            return codes.astype(np.float32) @ (qt * self.scale)
+        qbits = np.packbits(qt > 0)
+        return -_POPCOUNT[np.bitwise_xor(codes, qbits)].sum(axis=1, dtype=np.int32).astype(np.float32)
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        q = np.asarray(embedding, dtype=np.float32)
+        rows = self._rows(filter)
+        idx = np.arange(len(self.ids)) if rows is None else rows
+        if not len(idx):
+            return []
+
+        coarse = self.coarse_scores(q, rows)
+        n_cand = min(len(idx), max(k * self.oversample, MIN_CANDIDATES))
+        part = np.argpartition(-coarse, n_cand - 1)[:n_cand] if n_cand < len(idx) else np.arange(len(idx))
+        cand = np.sort(idx[part])  # 행 순서대로 읽어 mmap 접근을 순차적으로
+
+        dists = self.sqnorms[cand] - 2.0 * (self.vectors[cand] @ q) + float(q @ q)
+        k = min(k, len(cand))
+        top = np.argsort(dists)[:k]
+        return [
+            (Document(id=self.ids[cand[i]], page_content=self.documents[cand[i]], metadata=self.metadatas[cand[i]]),
+             float(dists[i]))
+            for i in top
+        ]
+
+
+def load_quant_store(
+    mmap_root: str,
+    collection_name: str,
+    embedding_function: Any = None,
+    dim: int = 256,
+    kind: str = "int8",
+    oversample: int = 8,
+) -> QuantizedVectorStore:
+    index_dir = Path(mmap_root) / collection_name
+    if not (index_dir / MANIFEST_FILE).is_file():
+        raise FileNotFoundError(
+            f"mmap index not found: {index_dir}\n"
+            f"먼저 `python shared_index.py export` 후 `python quant_index.py build` 를 실행하세요."
+        )
+    return QuantizedVectorStore(str(index_dir), embedding_function, dim=dim, kind=kind, oversample=oversample)
+
+
+# =========================================================
+# 벤치마크: 현재 Chroma(float, HNSW) 결과 대비 recall@k / 지연 / 상주 크기
+# - 질의는 저장된 문서 임베딩(+선택적 노이즈)을 사용 → API 호출 없음
+# =========================================================
+def _pct(xs: List[float], q: float) -> float:
+    return float(np.percentile(np.asarray(xs), q)) if xs else 0.0
+
+
+def bench(
+    persist_root: str,
+    mmap_root: str,
+    collection_name: str,
+    dims: Sequence[int],
+    kinds: Sequence[str],
+    k: int,
+    oversample: int,
+    n_queries: int,
+    noise: float,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    import chromadb
+
+    index_dir = os.path.join(mmap_root, collection_name)
+    exact = MmapVectorStore(index_dir)
+    vectors = np.asarray(exact.vectors)
+    rng = np.random.default_rng(seed)
+    pick = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    queries = vectors[pick] + noise * rng.standard_normal((len(pick), vectors.shape[1])).astype(np.float32)
+
+    col = chromadb.PersistentClient(path=os.path.join(persist_root, collection_name)).get_collection(collection_name)
+    truth = col.query(query_embeddings=queries.tolist(), n_results=k, include=[])["ids"]
+
+    def run(store: MmapVectorStore) -> Tuple[float, List[float]]:
+        hits, lat = 0, []
+        for q, want in zip(queries, truth):
+            t0 = time.perf_counter()
+            got = store.similarity_search_by_vector_with_score(q.tolist(), k=k)
+            lat.append((time.perf_counter() - t0) * 1000)
+            hits += len({d.id for d, _ in got} & set(want))
+        return hits / max(1, sum(len(w) for w in truth)), lat
+
+    results = []
+    recall, lat = run(exact)
+    results.append({
+        "config": f"float{vectors.shape[1]} (exact)", "recall": recall,
+        "p50_ms": _pct(lat, 50), "p95_ms": _pct(lat, 95), "bytes": int(vectors.nbytes),
+    })
+    for dim in dims:
+        build_quantized(index_dir, dim, kinds)
+        for kind in kinds:
+            store = QuantizedVectorStore(index_dir, dim=dim, kind=kind, oversample=oversample)
+            recall, lat = run(store)
+            results.append({
+                "config": f"{kind}@{dim} (x{oversample} rerank)", "recall": recall,
+                "p50_ms": _pct(lat, 50), "p95_ms": _pct(lat, 95),
+                "bytes": int(store.codes.nbytes + (store.scale.nbytes if store.scale is not None else 0)),
+            })
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="축소 차원 + 양자화 인덱스 생성/벤치마크")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build")
+    b.add_argument("--mmap-root", default=str(DEFAULT_MMAP_ROOT))
+    b.add_argument("--collections", nargs="*", default=list(COLLECTIONS))
+    b.add_argument("--dim", type=int, default=256)
+    b.add_argument("--kinds", nargs="*", default=list(KINDS), choices=KINDS)
+
+    bb = sub.add_parser("bench")
+    bb.add_argument("--persist-root", default=str(DEFAULT_PERSIST_ROOT))
+    bb.add_argument("--mmap-root", default=str(DEFAULT_MMAP_ROOT))
+    bb.add_argument("--collection", default="counsel_db", choices=COLLECTIONS)
+    bb.add_argument("--dims", nargs="*", type=int, default=[128, 256, 512, 1024])
+    bb.add_argument("--kinds", nargs="*", default=list(KINDS), choices=KINDS)
+    bb.add_argument("--k", type=int, default=4)
+    bb.add_argument("--oversample", type=int, default=8)
+    bb.add_argument("--queries", type=int, default=200)
+    bb.add_argument("--noise", type=float, default=0.01, help="질의 벡터에 더할 가우시안 노이즈 표준편차")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        for name in args.collections:
+            info = build_quantized(os.path.join(args.mmap_root, name), args.dim, args.kinds)
+            for key, v in info["built"].items():
+                print(f"[build] {name} {key}: {v['count']} × {v['bytes'] // max(1, v['count'])} bytes")
+    else:
+        rows = bench(
+            args.persist_root, args.mmap_root, args.collection, args.dims, args.kinds,
+            args.k, args.oversample, args.queries, args.noise,
+        )
+        print(f"{'config':<28} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8} {'bytes':>12}")
+        for r in rows:
+            print(f"{r['config']:<28} {r['recall']:>9.3f} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {r['bytes']:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import argparse
+import atexit
+import fcntl
+import json
+import os
+import re
+import shutil
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from survey import QUESTIONS
+
+
+# =========================================================
+# 설문 결과 / 턴 메타데이터 append-only 컬럼 로그
+# - 행은 메모리 버퍼에 모았다가 청크 단위로 기록
+#     <root>/<table>/chunk-<ns>-<host>-<pid>-<seq>/<column>.npy + meta.json
+#   (임시 디렉터리에 쓰고 rename → 읽는 쪽은 완성된 청크만 봄)
+# - 문자열 범주(유형/스타일 등)는 int8 코드로 저장, 어휘는 CATEGORIES
+# - scan(): 컬럼별 np.load(mmap_mode="r") 후 이어붙여 벡터 연산
+# - append() 는 버퍼에 넣기만 함 → 청크 기록은 백그라운드 스레드 (flush_rows 가 차면 깨움, 아니면 FLUSH_INTERVAL 마다)
+#   기록 실패 시 행은 버퍼로 되돌리고 다음 주기에 재시도 (MAX_BUFFER_ROWS 넘는 오래된 행은 버림)
+# - compact(): 작은 청크를 큰 청크로 병합 (python result_log.py compact, 앱에서는 COMPACT_INTERVAL 마다)
+#   <root>/<table>/.compact.lock flock 으로 프로세스 간 1개만 실행 (백그라운드는 잠겨 있으면 건너뜀)
+# =========================================================
+PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_LOG_DIR = PROJECT_ROOT / "stats" / "result_log"
+
+CATEGORIES: Dict[str, List[str]] = {
+    "base": ["안정형", "불안형", "회피형", "거부형"],
+    "style": ["표현형", "억제형"],
+    "eff": ["높음", "낮음"],
+}
+
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    "survey": {
+        "ts": "f8",
+        **{q["key"]: "i1" for q in QUESTIONS},
+        "self_model": "f4",
+        "other_model": "f4",
+        "expression": "f4",
+        "efficacy": "f4",
+        "base": "i1",
+        "style": "i1",
+        "eff": "i1",
+    },
+    "turn": {
+        "ts": "f8",
+        "sid": "S32",
+        "turn": "i4",
+        "risk_mode": "i1",
+        "level": "i1",          # L0~L3 → 0~3, 없으면 -1
+        "latency_ms": "f4",
+        "input_tokens": "i4",
+        "output_tokens": "i4",
+    },
+}
+
+FLUSH_ROWS = 512
+FLUSH_INTERVAL = 30.0
+MAX_BUFFER_ROWS = 8 * FLUSH_ROWS   # 기록이 계속 실패할 때 테이블당 메모리에 남기는 최대 행 수 (오래된 것부터 버림)
+COMPACT_TARGET_ROWS = 1_000_000
+COMPACT_INTERVAL = 3600.0
+LOCK_FILE = ".compact.lock"
+
+
+def encode_category(column: str, value: Optional[str]) -> int:
+    vocab = CATEGORIES[column]
+    return vocab.index(value) if value in vocab else -1
+
+
+def encode_level(level: Optional[str]) -> int:
+    m = re.fullmatch(r"L(\d)", str(level or ""))
+    return int(m.group(1)) if m else -1
+
+
+def _chunk_dirs(table_dir: Path) -> List[Path]:
+    if not table_dir.is_dir():
+        return []
+    dirs = sorted(p for p in table_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+    # 병합 청크가 대체한 원본은 (삭제 전이라도) 건너뜀
+    replaced = set()
+    metas = {}
+    for p in dirs:
+        try:
+            with open(p / "meta.json", "r", encoding="utf-8") as f:
+                metas[p] = json.load(f)
+        except (OSError, ValueError):
+            continue
+        replaced.update(metas[p].get("replaces", []))
+    return [p for p in dirs if p in metas and p.name not in replaced]
+
+
+def _write_chunk(table_dir: Path, name: str, columns: Dict[str, np.ndarray], replaces: Optional[List[str]] = None) -> Path:
+    table_dir.mkdir(parents=True, exist_ok=True)
+    tmp = table_dir / f".{name}.tmp"
+    tmp.mkdir()
+    try:
+        rows = 0
+        for col, arr in columns.items():
+            np.save(tmp / f"{col}.npy", arr)
+            rows = len(arr)
+        meta = {"rows": rows, "columns": {c: a.dtype.str for c, a in columns.items()}, "replaces": replaces or []}
+        with open(tmp / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        final = table_dir / name
+        os.rename(tmp, final)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)   # 실패한 임시 디렉터리를 남기지 않음
+        raise
+    return final
+
+
+@contextmanager
+def _compact_lock(table_dir: Path, blocking: bool = True):
+    """프로세스 간 compact 직렬화 → 잠금을 얻었으면 True (blocking=False 에서 이미 잠겨 있으면 False)"""
+    table_dir.mkdir(parents=True, exist_ok=True)
+    with open(table_dir / LOCK_FILE, "a") as lf:
+        try:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+
+class ResultLog:
+    """테이블별 행 버퍼 → 일정 행 수/시간마다 백그라운드 스레드가 컬럼 청크로 기록"""
+
+    def __init__(
+        self,
+        root: str,
+        flush_rows: int = FLUSH_ROWS,
+        flush_interval: float = FLUSH_INTERVAL,
+        compact_interval: float = COMPACT_INTERVAL,
+    ):
+        """compact_interval: 이 간격마다 작은 청크 병합 (0 = 끔)"""
+        self.root = Path(root)
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {t: [] for t in SCHEMAS}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._seq = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="result-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def append(self, table: str, row: Dict[str, Any]) -> None:
+        """버퍼에 넣기만 함 (디스크 기록은 백그라운드)"""
+        row = dict(row)
+        row.setdefault("ts", time.time())
+        with self._lock:
+            buf = self._buffers[table]
+            buf.append(row)
+            if len(buf) > MAX_BUFFER_ROWS:
+                del buf[: len(buf) - MAX_BUFFER_ROWS]
+            full = len(buf) >= self.flush_rows
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """버퍼 전체 기록 (실패한 테이블은 행을 버퍼로 되돌리고 OSError)"""
+        with self._flush_lock:
+            with self._lock:
+                batches, self._buffers = self._buffers, {t: [] for t in SCHEMAS}
+            error: Optional[OSError] = None
+            for table, rows in batches.items():
+                if not rows:
+                    continue
+                try:
+                    self._write_rows(table, rows)
+                except OSError as e:
+                    error = error or e
+                    with self._lock:
+                        buf = self._buffers[table] = rows + self._buffers[table]
+                        if len(buf) > MAX_BUFFER_ROWS:
+                            del buf[: len(buf) - MAX_BUFFER_ROWS]
+            if error is not None:
+                raise error
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._flush_quietly()
+
+    def _flush_quietly(self) -> bool:
+        try:
+            self.flush()
+            return True
+        except OSError:
+            return False  # 디스크 문제로 앱이 죽지 않게 (다음 주기에 재시도)
+
+    def _compact_quietly(self) -> None:
+        for table in SCHEMAS:
+            try:
+                compact(str(self.root), table, blocking=False)
+            except (OSError, ValueError):
+                pass  # 다른 프로세스가 방금 지운 청크 등 → 다음 주기에 다시
+
+    def _flush_loop(self) -> None:
+        last_compact = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break  # 마지막 flush 는 close() 가 함
+            if not self._flush_quietly():
+                # 버퍼가 찬 채로 append 마다 깨우지 않도록 실패하면 한 주기 쉼
+                self._stop.wait(self.flush_interval)
+            if self.compact_interval > 0 and time.monotonic() - last_compact >= self.compact_interval:
+                last_compact = time.monotonic()
+                self._compact_quietly()
+
+    def _write_rows(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        columns = {
+            col: np.array([r.get(col, -1 if dtype.startswith("i") else 0) for r in rows], dtype=dtype)
+            for col, dtype in SCHEMAS[table].items()
+        }
+        self._seq += 1
+        name = f"chunk-{time.time_ns()}-{socket.gethostname()}-{os.getpid()}-{self._seq:06d}"
+        _write_chunk(self.root / table, name, columns)
+
+
+# =========================================================
+# 읽기 / 병합
+# =========================================================
+def iter_chunks(root: str, table: str, columns: Optional[List[str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+    cols = columns or list(SCHEMAS[table])
+    for d in _chunk_dirs(Path(root) / table):
+        try:
+            yield {c: np.load(d / f"{c}.npy", mmap_mode="r") for c in cols}
+        except FileNotFoundError:
+            continue  # 병합으로 방금 지워진 청크
+
+
+def scan(root: str, table: str, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    cols = columns or list(SCHEMAS[table])
+    parts: Dict[str, List[np.ndarray]] = {c: [] for c in cols}
+    for chunk in iter_chunks(root, table, cols):
+        for c in cols:
+            parts[c].append(chunk[c])
+    return {
+        c: (np.concatenate(v) if v else np.empty(0, dtype=SCHEMAS[table][c]))
+        for c, v in parts.items()
+    }
+
+
+def compact(root: str, table: str, target_rows: int = COMPACT_TARGET_ROWS, blocking: bool = True) -> int:
+    """target_rows 미만 청크들을 모아 병합 → 병합한 청크 수 (프로세스 간 lock, 잠겨 있고 blocking=False 면 0)"""
+    table_dir = Path(root) / table
+    with _compact_lock(table_dir, blocking) as locked:
+        return _compact_locked(table_dir, table, target_rows) if locked else 0
+
+
+def _compact_locked(table_dir: Path, table: str, target_rows: int) -> int:
+    small = []
+    for d in _chunk_dirs(table_dir):
+        with open(d / "meta.json", "r", encoding="utf-8") as f:
+            if json.load(f)["rows"] < target_rows:
+                small.append(d)
+
+    merged = 0
+    group: List[Path] = []
+    rows = 0
+
+    def write_group(group: List[Path]) -> None:
+        columns = {
+            c: np.concatenate([np.load(d / f"{c}.npy") for d in group]).astype(dtype)
+            for c, dtype in SCHEMAS[table].items()
+        }
+        # 새 청크가 보이는 순간부터 원본은 replaces 로 가려짐 → 그 다음 삭제
+        _write_chunk(table_dir, f"{group[-1].name}-c{len(group)}", columns, replaces=[d.name for d in group])
+        for d in group:
+            with open(d / "meta.json", "r", encoding="utf-8") as f:
+                leftovers = json.load(f).get("replaces", [])
+            for name in leftovers:
+                shutil.rmtree(table_dir / name, ignore_errors=True)
+            shutil.rmtree(d, ignore_errors=True)
+
+    for d in small:
+        with open(d / "meta.json", "r", encoding="utf-8") as f:
+            n = json.load(f)["rows"]
+        if group and rows + n > target_rows:
+            if len(group) > 1:
+                write_group(group)
+                merged += len(group)
+            group, rows = [], 0
+        group.append(d)
+        rows += n
+    if len(group) > 1:
+        write_group(group)
+        merged += len(group)
+    return merged
+
+
+def summarize(root: str) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+
+    s = scan(root, "survey", ["base", "style", "eff", "self_model", "other_model"])
+    n = len(s["base"])
+    out["survey"] = {"rows": n}
+    if n:
+        out["survey"]["base"] = {
+            name: int(c) for name, c in zip(CATEGORIES["base"], np.bincount(s["base"][s["base"] >= 0], minlength=4))
+        }
+        out["survey"]["self_model_mean"] = round(float(s["self_model"].mean()), 2)
+        out["survey"]["other_model_mean"] = round(float(s["other_model"].mean()), 2)
+
+    t = scan(root, "turn", ["sid", "risk_mode", "level", "latency_ms", "input_tokens", "output_tokens"])
+    n = len(t["risk_mode"])
+    out["turn"] = {"rows": n}
+    if n:
+        lat = t["latency_ms"]
+        out["turn"].update({
+            "sessions": int(len(np.unique(t["sid"]))),
+            "risk_share": round(float(t["risk_mode"].mean()), 4),
+            "levels": {f"L{i}": int(c) for i, c in enumerate(np.bincount(t["level"][t["level"] >= 0], minlength=4))},
+            "latency_p50_ms": round(float(np.percentile(lat, 50)), 1),
+            "latency_p95_ms": round(float(np.percentile(lat, 95)), 1),
+            "input_tokens": int(t["input_tokens"].sum(dtype=np.int64)),
+            "output_tokens": int(t["output_tokens"].sum(dtype=np.int64)),
+        })
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="설문/턴 컬럼 로그 요약·병합")
+    ap.add_argument("cmd", choices=["summary", "compact"])
+    ap.add_argument("--dir", default=str(DEFAULT_LOG_DIR))
+    ap.add_argument("--target-rows", type=int, default=COMPACT_TARGET_ROWS)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "summary":
+        print(json.dumps(summarize(args.dir), ensure_ascii=False, indent=2))
+    else:
+        for table in SCHEMAS:
+            print(f"[compact] {table}: {compact(args.dir, table, args.target_rows)} chunks merged")
+
+
+if __name__ == "__main__":
+    main()
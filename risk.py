@@ -0,0 +1,93 @@
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+
+# =========================================================
+# 위험 신호 감지 + Level/Step 파싱 (순수 함수, VectorDB 불필요)
+# =========================================================
+RISK_BADGE = "🚨 위험신호 발견"
+
+# L3 표현 묶음 (묶음마다 안내할 긴급 연락처가 다름 → crisis_path.HOTLINE_LINES)
+L3_TRIGGER_GROUPS: Dict[str, List[str]] = {
+    "self_harm": [r"자해", r"자살", r"죽고\s*싶", r"살\s*의미"],
+    "violence": [r"폭력", r"때리", r"죽여"],
+}
+
+# Level 판정용 로컬 패턴 (t06 risk map 의 [대표표현]/[판정기준] 기준, 높은 Level 우선)
+LEVEL_PATTERNS: Dict[str, List[str]] = {
+    "L3": [p for pats in L3_TRIGGER_GROUPS.values() for p in pats],
+    "L2": [
+        r"스토킹", r"위치\s*추적", r"감시", r"통제", r"협박", r"가스라이팅",
+        r"숨이\s*막혀", r"패닉", r"공황", r"아무것도\s*못\s*하겠",
+    ],
+    "L1": [r"쓸모\s*없", r"아무것도\s*아니"],
+}
+LEVEL_REGEX = {lvl: re.compile("|".join(f"(?:{p})" for p in pats)) for lvl, pats in LEVEL_PATTERNS.items()}
+
+# 위험 모드 = L3 + L2 패턴 (LEVEL_PATTERNS 에서 만들어 즉시 응답 경로와 항상 같은 판정)
+RISK_LEVELS = ("L3", "L2")
+RISK_PATTERNS = [p for lvl in RISK_LEVELS for p in LEVEL_PATTERNS[lvl]]
+
+# 패턴 목록을 하나의 정규식으로 미리 컴파일 (발화 1번 스캔)
+RISK_REGEX = re.compile("|".join(f"(?:{p})" for p in RISK_PATTERNS))
+
+
+def detect_risk_mode(user_message: str) -> bool:
+    return RISK_REGEX.search(user_message or "") is not None
+
+
+def assign_level(text: str) -> Tuple[str, List[str]]:
+    """VectorDB 없이 Level 판정 → (Level, 걸린 표현들). 해당 없음은 L0"""
+    t = text or ""
+    for lvl, rx in LEVEL_REGEX.items():
+        hits = [m.group(0) for m in rx.finditer(t)]
+        if hits:
+            return lvl, hits
+    return "L0", []
+
+
+def parse_required_steps_from_text(page_content: str) -> List[str]:
+    m = re.search(r"\[필수Step\]\s*(.+)", page_content)
+    if not m:
+        return []
+    raw = m.group(1).strip()
+    parts = [p.strip() for p in re.split(r"[→>\-]|,", raw) if p.strip()]
+    out: List[str] = []
+    for p in parts:
+        mm = re.search(r"step\s*([0-9]+)", p, flags=re.IGNORECASE)
+        if mm:
+            out.append(f"STEP_{mm.group(1)}")
+    return out
+
+
+def get_required_steps(level_doc) -> List[str]:
+    md = level_doc.metadata or {}
+    rs = md.get("required_steps")
+    if isinstance(rs, list) and rs:
+        if len(rs) == 1 and isinstance(rs[0], str) and "Step" in rs[0]:
+            return parse_required_steps_from_text(f"[필수Step] {rs[0]}")
+        out = [x.upper() for x in rs if isinstance(x, str) and x.upper().startswith("STEP_")]
+        if out:
+            return out
+    return parse_required_steps_from_text(level_doc.page_content)
+
+
+def extract_level(md: Dict[str, Any]) -> str:
+    keys = md.get("keys")
+    if isinstance(keys, dict):
+        lvl = keys.get("level")
+        if lvl is not None:
+            return str(lvl)
+    if isinstance(keys, str):
+        try:
+            parsed = json.loads(keys)
+            if isinstance(parsed, dict) and parsed.get("level") is not None:
+                return str(parsed.get("level"))
+        except Exception:
+            pass
+    if md.get("level") is not None:
+        return str(md.get("level"))
+    if md.get("row_id") is not None:
+        return str(md.get("row_id"))
+    return "UNKNOWN"
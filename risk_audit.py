@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Deque, Dict, IO, Iterator, List, Optional, Tuple
+
+from risk import assign_level, detect_risk_mode
+
+
+# =========================================================
+# 대화 기록 아카이브 사후 위험 감사 (오프라인 배치)
+# - 입력: JSONL, 한 줄 = 대화 1개
+#     {"id": "...", "messages": [{"role": "user", "content": "..."}, ...]}
+# - 사용자 발화마다 detect_risk_mode + assign_level (로컬 정규식, VectorDB/LLM 없음)
+# - 출력: 대화별 Level 타임라인 JSONL (입력 순서 유지)
+# - 줄 묶음(batch)을 프로세스 풀에 보내고, 동시에 떠 있는 묶음 수를 제한
+#   → 입력이 수 GB여도 메모리는 batch × in-flight 만큼만 사용
+#   (python risk_audit.py archive.jsonl -o timelines.jsonl --workers 8)
+# =========================================================
+LEVEL_ORDER = {"L0": 0, "L1": 1, "L2": 2, "L3": 3}
+
+
+def audit_conversation(conv: Dict[str, Any]) -> Dict[str, Any]:
+    timeline: List[str] = []
+    hits: List[Dict[str, Any]] = []
+    turn = 0
+    for m in conv.get("messages") or []:
+        if m.get("role") != "user":
+            continue
+        text = m.get("content") or ""
+        level, terms = assign_level(text)
+        risk_mode = detect_risk_mode(text)
+        timeline.append(level)
+        if level != "L0" or risk_mode:
+            hits.append({"turn": turn, "level": level, "risk_mode": risk_mode, "terms": terms})
+        turn += 1
+
+    max_level = max(timeline, key=LEVEL_ORDER.__getitem__) if timeline else "L0"
+    return {
+        "id": conv.get("id") or conv.get("conversation_id"),
+        "user_turns": turn,
+        "max_level": max_level,
+        "first_risk_turn": hits[0]["turn"] if hits else None,
+        "timeline": timeline,
+        "hits": hits,
+    }
+
+
+def audit_lines(lines: List[str]) -> Tuple[str, Counter]:
+    """워커 프로세스: 원본 줄 묶음 → (결과 JSONL 텍스트, 집계) — 파싱/직렬화도 워커에서"""
+    out = []
+    stats: Counter = Counter()
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            res = audit_conversation(json.loads(line))
+            stats["conversations"] += 1
+            stats[f"max_{res['max_level']}"] += 1
+        except (ValueError, AttributeError, TypeError) as e:
+            res = {"error": f"{type(e).__name__}: {e}", "line": line[:200]}
+            stats["errors"] += 1
+        out.append(json.dumps(res, ensure_ascii=False) + "\n")
+    return "".join(out), stats
+
+
+def _batches(f: IO[str], size: int) -> Iterator[List[str]]:
+    while True:
+        batch = list(islice(f, size))
+        if not batch:
+            return
+        yield batch
+
+
+def run_audit(
+    src: IO[str],
+    dst: IO[str],
+    workers: int,
+    batch_size: int = 500,
+    max_in_flight: Optional[int] = None,
+) -> Counter:
+    stats: Counter = Counter()
+    max_in_flight = max_in_flight or workers * 2
+
+    def emit(result: Tuple[str, Counter]) -> None:
+        text, part = result
+        dst.write(text)
+        stats.update(part)
+
+    if workers <= 1:
+        for batch in _batches(src, batch_size):
+            emit(audit_lines(batch))
+        return stats
+
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for batch in _batches(src, batch_size):
+            pending.append(pool.submit(audit_lines, batch))
+            # ✅ in-flight 상한: 가장 오래된 묶음을 먼저 기록 (순서 유지 + 메모리 상한)
+            while len(pending) >= max_in_flight:
+                emit(pending.popleft().result())
+        while pending:
+            emit(pending.popleft().result())
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="대화 기록 JSONL 위험 Level 일괄 감사")
+    ap.add_argument("input", help="대화 JSONL 경로 ('-' 이면 stdin)")
+    ap.add_argument("-o", "--output", default="-", help="타임라인 JSONL 경로 (기본 stdout)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--max-in-flight", type=int, default=None, help="동시에 처리 중인 묶음 수 (기본 workers×2)")
+    args = ap.parse_args(argv)
+
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        stats = run_audit(src, dst, args.workers, args.batch_size, args.max_in_flight)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    print(
+        f"[risk_audit] {stats['conversations']} conversations, {stats['errors']} errors, "
+        f"max level L0={stats['max_L0']} L1={stats['max_L1']} L2={stats['max_L2']} L3={stats['max_L3']} "
+        f"({time.perf_counter() - t0:.1f}s, workers={args.workers})",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+import contextvars
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+# =========================================================
+# 프로세스 공용 LLM/임베딩 호출 스케줄러
+# - 토큰 버킷으로 초당 요청 수 제한 (옵션: SQLite 파일로 프로세스 간 공유, rate <= 0 이면 제한 없음)
+# - 동시 실행 수 제한
+# - 우선순위(위험 모드 턴 우선) + 세션별 라운드로빈(공정 큐)
+# - 초당 한도 토큰은 슬롯을 내줄 때(dispatch) 함께 받음 → 토큰이 없으면 아무에게도 슬롯을 주지 않고
+#   타이머로 다시 dispatch (한도에 걸린 호출이 슬롯을 쥔 채 잠들지 않고, 토큰도 우선순위 순서로 배분)
+#   공유 버킷(SQLite)은 스케줄러 lock 안에서 호출되므로 busy 대기를 짧게 → 다른 워커가 DB 를 잡고 있으면
+#   "토큰 없음"으로 보고 타이머로 재시도 (이 프로세스의 acquire/release/metrics 가 멈추지 않게)
+# =========================================================
+PRIORITY_RISK = 0
+PRIORITY_NORMAL = 1
+
+DEFAULT_SESSION = "_anonymous"
+
+SHARED_BUCKET_BUSY_MS = 50      # 공유 버킷 SQLite busy 대기 상한
+SHARED_BUCKET_RETRY_SEC = 0.05  # busy 일 때 다음 dispatch 까지
+
+# 현재 호출이 어느 세션/우선순위에 속하는지 (스크립트 스레드마다 독립)
+_CALL_CTX: contextvars.ContextVar[Tuple[str, int]] = contextvars.ContextVar(
+    "llm_call_ctx", default=(DEFAULT_SESSION, PRIORITY_NORMAL)
+)
+
+
+# 마지막 ScheduledLLM 호출이 슬롯을 받은 뒤 실제로 걸린 시간(ms) — 대기열 시간 제외
+# (model_router 가 호출 전에 None 으로 초기화하고 호출 후 읽음, 공유 결과만 받은 호출은 None)
+LAST_SLOT_MS: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_slot_ms", default=None)
+
+
+class SchedulerTimeout(TimeoutError):
+    pass
+
+
+@contextmanager
+def call_context(session_id: Optional[str] = None, risk: Optional[bool] = None):
+    """with 블록 안의 LLM/임베딩 호출에 세션/우선순위 부여 (중첩 시 지정한 값만 덮어씀)"""
+    cur_sid, cur_pri = _CALL_CTX.get()
+    sid = session_id if session_id is not None else cur_sid
+    pri = cur_pri if risk is None else (PRIORITY_RISK if risk else PRIORITY_NORMAL)
+    token = _CALL_CTX.set((sid, pri))
+    try:
+        yield
+    finally:
+        _CALL_CTX.reset(token)
+
+
+# -----------------------------
+# 토큰 버킷
+# -----------------------------
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.ts = clock()
+        self._lock = threading.Lock()
+
+    def try_take(self, n: float = 1.0) -> float:
+        """성공하면 0, 부족하면 기다려야 할 초를 반환"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return 0.0
+            return (n - self.tokens) / self.rate
+
+
+class SharedTokenBucket:
+    """여러 워커 프로세스가 같은 SQLite 파일로 한도를 공유하는 토큰 버킷"""
+
+    def __init__(self, path: str, name: str, rate: float, capacity: Optional[float] = None):
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._lock = threading.Lock()
+        self.busy = 0
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_bucket (name TEXT PRIMARY KEY, tokens REAL, ts REAL)"
+        )
+        # 이후 호출은 스케줄러 lock 안 → 오래 기다리지 않음
+        self._conn.execute(f"PRAGMA busy_timeout = {SHARED_BUCKET_BUSY_MS}")
+
+    def try_take(self, n: float = 1.0) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            cur = self._conn.cursor()
+            try:
+                cur.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError:
+                self.busy += 1
+                return SHARED_BUCKET_RETRY_SEC  # 다른 워커가 DB 를 잡고 있음 → 토큰 없음으로 보고 재시도
+            try:
+                now = time.time()
+                row = cur.execute("SELECT tokens, ts FROM token_bucket WHERE name = ?", (self.name,)).fetchone()
+                tokens, ts = row if row else (self.capacity, now)
+                tokens = min(self.capacity, tokens + max(0.0, now - ts) * self.rate)
+                wait = 0.0
+                if tokens >= n:
+                    tokens -= n
+                else:
+                    wait = (n - tokens) / self.rate
+                cur.execute(
+                    "INSERT OR REPLACE INTO token_bucket (name, tokens, ts) VALUES (?, ?, ?)",
+                    (self.name, tokens, now),
+                )
+                cur.execute("COMMIT")
+                return wait
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+
+# -----------------------------
+# 공정 큐 스케줄러
+# -----------------------------
+class _Ticket:
+    __slots__ = ("session_id", "priority", "event", "granted", "t_enq")
+
+    def __init__(self, session_id: str, priority: int, t_enq: float):
+        self.session_id = session_id
+        self.priority = priority
+        self.event = threading.Event()
+        self.granted = False
+        self.t_enq = t_enq
+
+
+class FairScheduler:
+    def __init__(self, name: str, max_concurrency: int, bucket: Optional[Any] = None, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.bucket = bucket
+        self.clock = clock
+        self._lock = threading.Lock()
+        # priority -> (session_id -> 대기 티켓들), 세션 순서가 곧 라운드로빈 순서
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Ticket]]"] = {
+            PRIORITY_RISK: OrderedDict(),
+            PRIORITY_NORMAL: OrderedDict(),
+        }
+        self._in_flight = 0
+        self._dispatched = 0
+        self._wait_total = 0.0
+        self._timeouts = 0
+        self._throttled = 0
+        self._timer: Optional[threading.Timer] = None
+
+    def _has_waiting_locked(self) -> bool:
+        return any(self._queues[pri] for pri in self._queues)
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._dispatch_locked()
+
+    def _dispatch_locked(self) -> None:
+        while self._in_flight < self.max_concurrency and self._has_waiting_locked():
+            if self.bucket is not None:
+                wait = self.bucket.try_take()
+                if wait > 0:
+                    # 토큰이 찰 때 다시 dispatch (그 사이 온 더 높은 우선순위 요청이 먼저 받음)
+                    self._throttled += 1
+                    if self._timer is None:
+                        self._timer = threading.Timer(wait, self._on_timer)
+                        self._timer.daemon = True
+                        self._timer.start()
+                    return
+            ticket = None
+            for pri in sorted(self._queues):
+                sessions = self._queues[pri]
+                if sessions:
+                    sid, q = sessions.popitem(last=False)
+                    ticket = q.popleft()
+                    if q:
+                        sessions[sid] = q  # 남은 요청은 맨 뒤로 (다른 세션 먼저)
+                    break
+            if ticket is None:
+                return
+            ticket.granted = True
+            self._in_flight += 1
+            self._dispatched += 1
+            self._wait_total += self.clock() - ticket.t_enq
+            ticket.event.set()
+
+    def acquire(self, session_id: str, priority: int, timeout: Optional[float] = None) -> None:
+        ticket = _Ticket(session_id, priority, self.clock())
+        with self._lock:
+            self._queues[priority].setdefault(session_id, deque()).append(ticket)
+            self._dispatch_locked()
+
+        if not ticket.event.wait(timeout):
+            with self._lock:
+                if not ticket.granted:
+                    q = self._queues[priority].get(session_id)
+                    if q is not None:
+                        q.remove(ticket)
+                        if not q:
+                            del self._queues[priority][session_id]
+                    self._timeouts += 1
+                    raise SchedulerTimeout(f"{self.name} 스케줄러 대기 시간 초과")
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch_locked()
+
+    @contextmanager
+    def slot(self, session_id: Optional[str] = None, priority: Optional[int] = None, timeout: Optional[float] = None):
+        ctx_sid, ctx_pri = _CALL_CTX.get()
+        self.acquire(session_id or ctx_sid, ctx_pri if priority is None else priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            depth = {
+                ("risk" if pri == PRIORITY_RISK else "normal"): sum(len(q) for q in sessions.values())
+                for pri, sessions in self._queues.items()
+            }
+            waiting_sessions = len({sid for sessions in self._queues.values() for sid in sessions})
+            return {
+                "name": self.name,
+                "queue_depth": depth,
+                "waiting_sessions": waiting_sessions,
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "dispatched": self._dispatched,
+                "timeouts": self._timeouts,
+                "throttled": self._throttled,
+                "bucket_busy": getattr(self.bucket, "busy", 0),
+                "avg_wait_ms": round(1000 * self._wait_total / self._dispatched, 1) if self._dispatched else 0.0,
+            }
+
+
+# -----------------------------
+# 클라이언트 래퍼
+# -----------------------------
+class ScheduledLLM:
+    """llm.invoke 를 스케줄러 슬롯 안에서 실행 (나머지 속성은 그대로 위임)"""
+
+    def __init__(self, inner: Any, scheduler: FairScheduler, timeout: Optional[float] = None):
+        self.inner = inner
+        self.scheduler = scheduler
+        self.timeout = timeout
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        with self.scheduler.slot(timeout=self.timeout):
+            t0 = time.perf_counter()
+            try:
+                return self.inner.invoke(prompt, *args, **kwargs)
+            finally:
+                LAST_SLOT_MS.set((time.perf_counter() - t0) * 1000)
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
+
+
+class ScheduledEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, scheduler: FairScheduler, timeout: Optional[float] = None):
+        self.inner = inner
+        self.scheduler = scheduler
+        self.timeout = timeout
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self.scheduler.slot(timeout=self.timeout):
+            return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self.scheduler.slot(timeout=self.timeout):
+            return self.inner.embed_query(text)
@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+# =========================================================
+# 읽기 전용 memory-mapped 벡터 인덱스
+# - Chroma 컬렉션을 1번만 export → 모든 워커가 같은 파일을 mmap (zero copy)
+# - 페이지는 OS 페이지 캐시에 1벌만 올라가므로 워커당 상주 메모리가 줄고,
+#   새 워커는 SQLite/HNSW 로딩 없이 바로 검색 가능
+# - ids / 문서 / 메타데이터(JSON)도 utf-8 blob + offsets .npy 로 저장해 mmap → 워커 힙에는
+#   검색 결과로 돌려주는 행만 디코딩해서 올라감 (예전 export 의 docs.json 은 그대로 읽음)
+# - 검색은 numpy 정확 검색(L2, Chroma 기본 space와 동일)
+# =========================================================
+PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_PERSIST_ROOT = PROJECT_ROOT / "chroma_store"
+DEFAULT_MMAP_ROOT = PROJECT_ROOT / "index_mmap"
+COLLECTIONS = ("user_profile", "counsel_db", "risk_protocol")
+
+VECTORS_FILE = "vectors.npy"
+SQNORMS_FILE = "sqnorms.npy"
+DOCS_FILE = "docs.json"          # 예전 export 형식 (없으면 아래 blob 파일)
+MANIFEST_FILE = "manifest.json"
+
+
+# -----------------------------
+# export (Chroma → mmap 파일)
+# -----------------------------
+def export_collection(persist_dir: str, collection_name: str, out_dir: str) -> Dict[str, Any]:
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_dir)
+    col = client.get_collection(collection_name)
+    got = col.get(include=["embeddings", "documents", "metadatas"])
+
+    vectors = np.asarray(got["embeddings"], dtype=np.float32)
+    if vectors.ndim != 2 or not len(vectors):
+        raise ValueError(f"{collection_name}: 내보낼 임베딩이 없습니다.")
+
+    # 다른 워커가 읽는 중일 수 있으므로 임시 디렉터리에 쓰고 교체
+    out = Path(out_dir)
+    tmp = out.with_name(f"{out.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    np.save(tmp / VECTORS_FILE, vectors)
+    np.save(tmp / SQNORMS_FILE, np.einsum("ij,ij->i", vectors, vectors))
+    _save_strings(tmp, "ids", got["ids"])
+    _save_strings(tmp, "documents", [d or "" for d in got["documents"]])
+    _save_strings(tmp, "metadatas", [json.dumps(md or {}, ensure_ascii=False) for md in got["metadatas"]])
+    manifest = {
+        "collection": collection_name,
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "space": "l2",
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(tmp / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    old = out.with_name(f"{out.name}.old-{os.getpid()}")
+    if out.exists():
+        out.rename(old)
+    tmp.rename(out)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+# -----------------------------
+# 문자열 열 (utf-8 blob + offsets, mmap)
+# -----------------------------
+def _save_strings(out_dir: Path, field: str, values: Sequence[str]) -> None:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(out_dir / f"{field}_blob.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(out_dir / f"{field}_offsets.npy", offsets)
+
+
+class MmapStrings(Sequence):
+    """mmap 된 blob 에서 i 번째 문자열만 디코딩 (json_values=True 면 json.loads 결과)"""
+
+    def __init__(self, index_dir: Path, field: str, json_values: bool = False):
+        self.blob = np.load(index_dir / f"{field}_blob.npy", mmap_mode="r")
+        self.offsets = np.load(index_dir / f"{field}_offsets.npy", mmap_mode="r")
+        self.json_values = json_values
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        text = self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+        return (json.loads(text) or {}) if self.json_values else text
+
+
+# -----------------------------
+# metadata filter (Chroma where 문법 중 앱에서 쓰는 부분)
+# -----------------------------
+def _match_value(actual: Any, cond: Any) -> bool:
+    if isinstance(cond, dict):
+        for op, v in cond.items():
+            if op == "$eq" and actual != v:
+                return False
+            if op == "$ne" and actual == v:
+                return False
+            if op == "$in" and actual not in v:
+                return False
+            if op == "$nin" and actual in v:
+                return False
+        return True
+    return actual == cond
+
+
+def match_where(md: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(match_where(md, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(match_where(md, c) for c in cond):
+                return False
+        elif not _match_value((md or {}).get(key), cond):
+            return False
+    return True
+
+
+class MmapVectorStore:
+    """Chroma(langchain) 중 앱이 쓰는 읽기 API만 제공하는 read-only 스토어"""
+
+    def __init__(self, index_dir: str, embedding_function: Any = None):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.ids: Sequence[str]
+        self.documents: Sequence[str]
+        self.metadatas: Sequence[Dict[str, Any]]
+        if (self.index_dir / DOCS_FILE).is_file():
+            # 예전 export: 전부 힙으로 읽음 (python shared_index.py export 로 다시 만들면 mmap)
+            with open(self.index_dir / DOCS_FILE, "r", encoding="utf-8") as f:
+                docs = json.load(f)
+            self.ids = docs["ids"]
+            self.documents = docs["documents"]
+            self.metadatas = [md or {} for md in docs["metadatas"]]
+        else:
+            self.ids = MmapStrings(self.index_dir, "ids")
+            self.documents = MmapStrings(self.index_dir, "documents")
+            self.metadatas = MmapStrings(self.index_dir, "metadatas", json_values=True)
+
+        # ✅ mmap_mode="r": 파일을 복사하지 않고 페이지 캐시를 그대로 공유
+        self.vectors = np.load(self.index_dir / VECTORS_FILE, mmap_mode="r")
+        self.sqnorms = np.load(self.index_dir / SQNORMS_FILE, mmap_mode="r")
+        self._embedding_function = embedding_function
+        self._mask_cache: Dict[str, np.ndarray] = {}
+
+    @property
+    def embeddings(self) -> Any:
+        return self._embedding_function
+
+    def _rows(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, ensure_ascii=False)
+        rows = self._mask_cache.get(key)
+        if rows is None:
+            rows = np.array(
+                [i for i, md in enumerate(self.metadatas) if match_where(md, where)], dtype=np.int64
+            )
+            self._mask_cache[key] = rows
+        return rows
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        q = np.asarray(embedding, dtype=np.float32)
+        rows = self._rows(filter)
+        if rows is None:
+            dists = self.sqnorms - 2.0 * (self.vectors @ q)
+            idx = np.arange(len(self.ids))
+        else:
+            if not len(rows):
+                return []
+            dists = self.sqnorms[rows] - 2.0 * (self.vectors[rows] @ q)
+            idx = rows
+        dists = dists + float(q @ q)
+
+        k = min(k, len(dists))
+        top = np.argpartition(dists, k - 1)[:k] if k < len(dists) else np.arange(len(dists))
+        top = top[np.argsort(dists[top])]
+        return [
+            (Document(id=self.ids[idx[i]], page_content=self.documents[idx[i]], metadata=self.metadatas[idx[i]]),
+             float(dists[i]))
+            for i in top
+        ]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Tuple[Document, float]]:
+        if self._embedding_function is None:
+            raise ValueError("query 검색에는 embedding_function이 필요합니다.")
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        include: Optional[List[str]] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        rows = self._rows(where)
+        rows = list(range(len(self.ids))) if rows is None else rows.tolist()
+        if ids is not None:
+            wanted = set(ids)
+            rows = [i for i in rows if self.ids[i] in wanted]
+        if limit is not None:
+            rows = rows[:limit]
+        include = include or ["documents", "metadatas"]
+        out: Dict[str, Any] = {"ids": [self.ids[i] for i in rows]}
+        out["documents"] = [self.documents[i] for i in rows] if "documents" in include else None
+        out["metadatas"] = [self.metadatas[i] for i in rows] if "metadatas" in include else None
+        out["embeddings"] = self.vectors[rows] if "embeddings" in include else None
+        return out
+
+
+def load_mmap_store(mmap_root: str, collection_name: str, embedding_function: Any = None) -> MmapVectorStore:
+    index_dir = Path(mmap_root) / collection_name
+    if not (index_dir / MANIFEST_FILE).is_file():
+        raise FileNotFoundError(
+            f"mmap index not found: {index_dir}\n"
+            f"먼저 `python shared_index.py export` 로 인덱스 파일을 생성하세요."
+        )
+    return MmapVectorStore(str(index_dir), embedding_function=embedding_function)
+
+
+# =========================================================
+# CLI
+# =========================================================
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Chroma 컬렉션 → 읽기 전용 mmap 인덱스 export")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("--persist-root", default=str(DEFAULT_PERSIST_ROOT))
+    ex.add_argument("--out", default=str(DEFAULT_MMAP_ROOT))
+    ex.add_argument("--collections", nargs="*", default=list(COLLECTIONS))
+    args = ap.parse_args(argv)
+
+    if args.cmd == "export":
+        for name in args.collections:
+            m = export_collection(os.path.join(args.persist_root, name), name, os.path.join(args.out, name))
+            print(f"[export] {name}: {m['count']} docs × {m['dim']} dim → {os.path.join(args.out, name)}")
+
+
+if __name__ == "__main__":
+    main()
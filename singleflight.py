@@ -0,0 +1,117 @@
+import copy
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from llm_client import to_openai_messages
+
+
+# =========================================================
+# 동일 요청 합치기 (single-flight)
+# - 같은 키의 호출이 진행 중이면 새로 보내지 않고 그 결과를 함께 받음
+#   (결과를 저장해 두는 캐시가 아님: 끝나는 즉시 키 삭제)
+# - 배포 직후/캐시 만료 직후 여러 세션이 같은 질의 임베딩·프롬프트를 동시에 보낼 때 1번만 호출
+# - 스케줄러(ScheduledLLM/ScheduledEmbeddings) 바깥에 둠 → 기다리는 쪽은 슬롯/초당 한도를 쓰지 않음
+# =========================================================
+class _Call:
+    __slots__ = ("event", "result", "error", "done", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+        self.done = False       # fn 이 값 또는 Exception 으로 끝났는지
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executed": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """→ (결과, 공유 여부). 먼저 온 호출만 fn 실행, 나머지는 그 결과(또는 Exception)를 그대로 받음
+        먼저 온 스레드가 KeyboardInterrupt/SystemExit 등으로 끝나면 기다리던 쪽은 각자 fn 을 실행"""
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["shared"] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._stats["executed"] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if not call.done:
+                return fn(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            call.done = True
+        except Exception as e:
+            call.error = e
+            call.done = True
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"name": self.name, **self._stats, "in_flight": len(self._calls)}
+
+
+def _digest(obj: Any) -> str:
+    return hashlib.sha256(json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SingleFlightEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, group: SingleFlight):
+        self.inner = inner
+        self.group = group
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.group.do(("q", text), lambda: self.inner.embed_query(text))[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.group.do(("d", _digest(list(texts))), lambda: self.inner.embed_documents(texts))[0]
+
+
+class SingleFlightLLM:
+    """llm.invoke 합치기 (모델별 인스턴스마다 group 1개, 나머지 속성은 위임)"""
+
+    def __init__(self, inner: Any, group: SingleFlight):
+        self.inner = inner
+        self.group = group
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        if args or kwargs:
+            # stop/config 등 추가 인자가 있으면 키가 모호하므로 그대로 호출
+            return self.inner.invoke(prompt, *args, **kwargs)
+        msg, shared = self.group.do(_digest(to_openai_messages(prompt)), lambda: self.inner.invoke(prompt))
+        if not shared:
+            return msg
+        # 토큰/지출은 실제로 호출한 쪽에서만 집계되도록 사용량을 비운 사본
+        out = copy.copy(msg)
+        try:
+            out.usage_metadata = None
+        except (AttributeError, TypeError, ValueError):
+            pass
+        return out
+
+    def __getattr__(self, name: str):
+        return getattr(self.inner, name)
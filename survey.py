@@ -0,0 +1,174 @@
+from typing import Any, Dict, List, Optional
+
+
+# =========================================================
+# 설문 문항 + 채점 (분류 기준값 포함)
+# =========================================================
+CUT = 4.5           # (기존 4.0 → 4.5)
+GRAY = 0.35         # 애매 구간 폭(±)
+
+
+def hi_lo(score: float) -> str:
+    # 1~7 평균 기준: 4.5 이상이면 높음, 4.5 미만이면 낮음
+    return "높음" if score >= CUT else "낮음"
+
+
+def expr_style(expr_score: float) -> str:
+    # 애매하면 상담에서만 참고하고, 결과는 한쪽으로 확정(강제 분류)
+    # 원하시면 '중간형' 표시로 바꿀 수도 있습니다.
+    return "표현형" if expr_score >= CUT else "억제형"
+
+
+def rev7(x: int) -> int:
+    return 8 - x
+
+
+def mean(xs: List[float]) -> float:
+    return sum(xs) / len(xs) if xs else 4.0
+
+
+def safe_mean(xs: List[Optional[float]]) -> float:
+    xs2 = [x for x in xs if x is not None]
+    return sum(xs2) / len(xs2) if xs2 else 0.0
+
+
+def internal_ratio(pos_vals: List[float], neg_raw_vals: List[float], eps: float = 1e-9) -> float:
+    """pos / (pos + neg)  -> 0~1"""
+    P = safe_mean(pos_vals)
+    N = safe_mean(neg_raw_vals)
+    return P / (P + N + eps)
+
+
+def base_type(self_m_pct: float, other_m_pct: float) -> str:
+    x = self_m_pct >= 50
+    y = other_m_pct >= 50
+    if x and y:
+        return "안정형"
+    if (not x) and y:
+        return "불안형"
+    if x and (not y):
+        return "회피형"
+    return "거부형"
+
+
+QUESTIONS: List[Dict[str, Any]] = []
+
+# -----------------------------
+# 1) Self Model (5문항)
+# - pos 3개, neg 2개(역채점)
+# -----------------------------
+self_pos_texts = [
+    "실수해도 ‘내가 무가치해진 건 아니다’라고 비교적 빨리 정리하는 편이다.",
+    "중요한 결정을 앞두면, 결국은 내가 감당할 수 있다는 쪽에 더 무게가 실린다.",
+    "비판을 들어도, 내 전체를 부정당한 느낌보단 ‘부분 피드백’으로 받아들이려 한다.",
+]
+self_neg_texts = [
+    "상대 반응이 차가우면 ‘내가 문제라서’라는 해석이 먼저 떠오르는 편이다.",
+    "사랑받으려면 ‘지금의 나’로는 부족하다는 생각이 종종 든다.",
+]
+
+for i, t in enumerate(self_pos_texts, start=1):
+    QUESTIONS.append({"key": f"s{i}", "text": t, "scale": "self_pos", "reverse": False})
+for j, t in enumerate(self_neg_texts, start=4):
+    QUESTIONS.append({"key": f"s{j}", "text": t, "scale": "self_neg", "reverse": True})
+
+
+# -----------------------------
+# 2) Other Model (5문항)
+# - pos 3개, neg 2개(역채점)
+# -----------------------------
+other_pos_texts = [
+    "도움을 요청하면, 대체로 사람들은 나를 해치기보다 도우려 했던 경험이 더 많다.",
+    "관계가 깊어질수록 ‘연결이 생긴다’는 기대가 비교적 자연스럽다.",
+    "내가 솔직히 말해도, 상대가 전부 공격으로 받진 않을 거라고 생각하는 편이다.",
+]
+other_neg_texts = [
+    "가까워질수록 ‘언젠가 상처받을 것 같다’는 경계가 먼저 올라오는 편이다.",
+    "호의를 받아도 ‘속에 다른 의도가 있을 수 있다’는 의심이 스치는 편이다.",
+]
+
+for i, t in enumerate(other_pos_texts, start=1):
+    QUESTIONS.append({"key": f"o{i}", "text": t, "scale": "other_pos", "reverse": False})
+for j, t in enumerate(other_neg_texts, start=4):
+    QUESTIONS.append({"key": f"o{j}", "text": t, "scale": "other_neg", "reverse": True})
+
+
+# -----------------------------
+# 3) Emotion Reg (6문항)
+# - 표현(역채점한 억제) 3문항
+# - 재평가 3문항(참고용, 분류에는 직접 안 쓰더라도 상담에 도움됨)
+# -----------------------------
+expr_supp_texts = [
+    "감정이 커져도 ‘티 안 나게’ 정리하려는 편이다.",
+    "좋아도 싫어도 표정/말투가 크게 드러나지 않게 조절하는 편이다.",
+    "갈등이 생기면 감정을 말하기보다 일단 눌러두고 넘어가려 한다.",
+]
+reapp_texts = [
+    "기분이 가라앉으면, 일부러 의미/좋은 점을 찾아 해석을 바꿔보는 편이다.",
+    "상대 말에 상처받아도 ‘그럴 수도 있지’로 마음을 정리하려 한다.",
+    "스트레스가 오면, 상황을 더 차분한 관점으로 다시 보는 편이다.",
+]
+
+# 억제문항을 역채점해서 '표현 점수'로 만듦
+for i, t in enumerate(expr_supp_texts, start=1):
+    QUESTIONS.append({"key": f"e{i}", "text": t, "scale": "erq_expr", "reverse": True})
+for i, t in enumerate(reapp_texts, start=4):
+    QUESTIONS.append({"key": f"e{i}", "text": t, "scale": "erq_reapp", "reverse": False})
+
+
+# -----------------------------
+# 4) Self-efficacy (6문항)
+# -----------------------------
+eff_texts = [
+    "불안해도 ‘일단 해보자’로 시작하는 편이다.",
+    "막히면 포기보다 ‘다른 방법’을 찾아보는 쪽이 더 빠르다.",
+    "실패해도 ‘내 능력 전체’로 일반화하기보다 다음 시도를 준비하는 편이다.",
+    "조언을 들으면 ‘비판’보다 ‘업그레이드 기회’로 받아들이려 한다.",
+    "부담이 커도 도망치기보다 ‘작게 쪼개서’ 처리하려 한다.",
+    "긴장해도 해야 할 일의 핵심만 잡고 계속 진행할 수 있는 편이다.",
+]
+for i, t in enumerate(eff_texts, start=1):
+    QUESTIONS.append({"key": f"g{i}", "text": t, "scale": "eff", "reverse": False})
+
+
+def get_vals(scale: str, answers: Dict[str, int]) -> List[int]:
+    vals: List[int] = []
+    for q in QUESTIONS:
+        if q["scale"] == scale:
+            v = answers.get(q["key"], 4)
+            if q["reverse"]:
+                v = rev7(v)
+            vals.append(v)
+    return vals
+
+
+def get_vals_raw(scale: str, answers: Dict[str, int]) -> List[int]:
+    vals: List[int] = []
+    for q in QUESTIONS:
+        if q["scale"] == scale:
+            vals.append(answers.get(q["key"], 4))
+    return vals
+
+
+def compute_scores(answers: Dict[str, int]) -> Dict[str, Any]:
+    """설문 응답 → 척도 점수 + 유형 축 (결과 화면/통계/궁합 공용)"""
+    self_pos = get_vals("self_pos", answers)
+    self_neg_raw = get_vals_raw("self_neg", answers)
+    other_pos = get_vals("other_pos", answers)
+    other_neg_raw = get_vals_raw("other_neg", answers)
+
+    self_model = internal_ratio(self_pos, self_neg_raw) * 100
+    other_model = internal_ratio(other_pos, other_neg_raw) * 100
+
+    expression = mean(get_vals("erq_expr", answers))
+    efficacy = mean(get_vals("eff", answers))
+
+    return {
+        "self_model": self_model,
+        "other_model": other_model,
+        "expression": expression,
+        "efficacy": efficacy,
+        "base": base_type(self_model, other_model),
+        "style": expr_style(expression),
+        "eff": hi_lo(efficacy),
+    }
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# 루트의 평면 모듈(config, crisis_path, ...)을 그대로 import
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
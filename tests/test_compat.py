@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from compat import FEATURES, combine, components, main, pair_matrix, to_features, to_matrix, top_k_matches
+
+
+def _rows(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).random((n, len(FEATURES)), dtype=np.float32)
+
+
+@pytest.mark.parametrize("same_set", [False, True])
+def test_top_k_empty_inputs(same_set):
+    empty = _rows(0)
+    idx, scores = top_k_matches(empty, empty, k=5, same_set=same_set)
+    assert idx.shape == (0, 0) and scores.shape == (0, 0)
+
+
+def test_top_k_single_row_same_set_has_no_match():
+    one = _rows(1)
+    idx, scores = top_k_matches(one, one, k=5, same_set=True)
+    assert idx.shape == (1, 0) and scores.shape == (1, 0)
+
+
+def test_top_k_single_row_against_other_set():
+    idx, scores = top_k_matches(_rows(1, 1), _rows(1, 2), k=5)
+    assert idx.tolist() == [[0]] and scores.shape == (1, 1)
+
+
+def test_top_k_matches_brute_force_and_skips_self():
+    A = _rows(30)
+    idx, scores = top_k_matches(A, A, k=3, same_set=True)
+    full = pair_matrix(A, A)
+    np.fill_diagonal(full, -np.inf)
+    expected = np.argsort(-full, axis=1)[:, :3]
+    assert (idx == expected).all()
+    assert not (idx == np.arange(30)[:, None]).any()
+    assert np.allclose(scores, np.take_along_axis(full, expected, axis=1))
+
+
+def test_pair_matrix_matches_components():
+    A, B = _rows(4, 1), _rows(5, 2)
+    ref = combine(components(A[:, None, :], B[None, :, :]))
+    assert np.allclose(pair_matrix(A, B), ref, atol=1e-3)
+
+
+def test_to_features_accepts_columns():
+    s = {"self_model": 50.0, "other_model": 80.0, "expression": 4.0, "efficacy": 7.0}
+    cols = {key: np.array([v, v]) for key, v in s.items()}
+    assert np.allclose(to_features(cols), to_matrix([s, s]))
+
+
+def test_match_cli_on_empty_log(tmp_path, capsys):
+    main(["match", "--log-dir", str(tmp_path)])
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from crisis_path import crisis_response, deny_network, load_crisis_templates
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = str(ROOT / "data")
+FAST_REPLY_BUDGET_SEC = 3.0     # AppTest 1회 실행 오버헤드 포함 (LLM 을 기다리면 LLM_TIMEOUT 이상)
+HOTLINE = "1393"
+BOUNDARY = "조언이나 방법을 제시해 드릴 수는 없어요"
+
+
+# =========================================================
+# crisis_response (네트워크 차단 상태)
+# =========================================================
+@pytest.fixture(scope="module")
+def templates():
+    return load_crisis_templates(DATA_DIR)
+
+
+@pytest.mark.parametrize("message, level", [
+    ("요즘 너무 힘들어서 죽고 싶어요", "L3"),
+    ("애인이 위치 추적까지 해서 숨이 막혀요", "L2"),
+])
+def test_crisis_response_without_network(templates, message, level):
+    with deny_network():
+        t0 = time.perf_counter()
+        out = crisis_response(message, templates, fast_levels=("L3", "L2"))
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+    assert out is not None and out["level"] == level
+    assert elapsed_ms < 5
+    assert out["text"].startswith("🚨")
+    assert BOUNDARY not in out["text"]
+    assert "STEP_3" not in out["steps"]
+
+
+def test_hotline_only_for_l3(templates):
+    assert HOTLINE in templates["L3"]["text"]
+    assert HOTLINE not in templates["L2"]["text"]
+
+
+def test_non_crisis_message_is_not_fast_path(templates):
+    assert crisis_response("요즘 연락이 뜸해서 서운해요", templates) is None
+
+
+def test_l2_keeps_retrieval_path_by_default(templates):
+    # L2 (스토킹/통제/패닉) 는 기본값에서 risk_protocol 검색 + LLM 답변으로
+    assert crisis_response("애인이 위치 추적까지 해서 숨이 막혀요", templates) is None
+
+
+def test_violence_gets_violence_hotline(templates):
+    out = crisis_response("남자친구가 때리는데 어떻게 해야 할지 모르겠어요", templates)
+    assert out is not None and out["level"] == "L3"
+    assert "112" in out["text"] and "1366" in out["text"]
+    assert HOTLINE not in out["text"]
+
+
+def test_self_harm_with_violence_gets_both_hotlines(templates):
+    out = crisis_response("맨날 때리는데 이제 죽고 싶어요", templates)
+    assert HOTLINE in out["text"] and "1366" in out["text"]
+
+
+# =========================================================
+# run_turn (app.py) — LLM 제공자가 멈추거나 오류를 낼 때도 즉시 응답
+# =========================================================
+class _StubProvider(BaseHTTPRequestHandler):
+    mode = "hang"                  # "hang": 응답 없음 / "error": 500
+    release = threading.Event()
+    calls = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        type(self).calls += 1
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.mode == "hang":
+            self.release.wait(30)
+        body = json.dumps({"error": {"message": "stub provider down", "type": "server_error"}}).encode()
+        self.send_response(500)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope="module")
+def stub_app(tmp_path_factory):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # VectorDB 는 열 때 파일을 다시 쓰므로 복사본 사용, 부수 기록은 모두 끔
+    store = tmp_path_factory.mktemp("chroma") / "chroma_store"
+    shutil.copytree(ROOT / "chroma_store", store)
+    env = {
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_port}/v1",
+        "PERSIST_ROOT": str(store),
+        "LLM_TIMEOUT": "5",
+        "WARMUP_ON_START": "0",
+        "RESULT_LOG": "0",
+        "PROFILE_WRITER": "0",
+        "THRESHOLD_SKETCH": "0",
+        "USER_MEMORY": "0",
+        "CRISIS_FAST_PATH": "1",
+        "CRISIS_ELABORATE": "1",
+    }
+    with pytest.MonkeyPatch.context() as mp:
+        for k, v in env.items():
+            mp.setenv(k, v)
+        yield server
+    _StubProvider.release.set()
+    server.shutdown()
+
+
+def _chat_app():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    with open(os.path.join(DATA_DIR, "persona_rules.json"), encoding="utf-8") as f:
+        at.session_state["persona_rule"] = json.load(f)[0]
+    at.session_state["mode"] = "chat"
+    at.session_state["profile"] = {"attachment_type": "불안형", "emotion_reg": "표현형", "efficacy": "낮음", "nickname": ""}
+    at.run()
+    assert not at.exception
+    return at
+
+
+@pytest.mark.parametrize("mode", ["hang", "error"])
+def test_run_turn_fast_path_when_provider_down(stub_app, mode):
+    _StubProvider.mode = mode
+    at = _chat_app()
+
+    t0 = time.perf_counter()
+    at.chat_input[0].set_value("죽고 싶어요 너무 힘들어요").run()
+    elapsed = time.perf_counter() - t0
+
+    assert not at.exception
+    assert elapsed < FAST_REPLY_BUDGET_SEC
+    messages = at.session_state["messages"]
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[1]["content"].startswith("🚨")
+    assert HOTLINE in messages[1]["content"]
+    assert BOUNDARY not in messages[1]["content"]
+
+    # 보충 답변은 멈춰 있거나 실패 → 다시 실행해도 안전 안내는 그대로, 예외 없음
+    at.run()
+    assert not at.exception
+    assert at.session_state["messages"][:2] == messages[:2]
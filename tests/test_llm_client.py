@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+from typing import Callable, List
+
+import httpx
+import pytest
+
+from llm_client import _POOLS, AsyncLLMClient, LLMRequestError
+
+
+def _ok(content: str = "안녕하세요") -> httpx.Response:
+    return httpx.Response(200, json={
+        "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+    })
+
+
+class Stub:
+    """요청마다 responses[i] 를 호출해 응답 (마지막 것을 반복)"""
+
+    def __init__(self, *responses: Callable):
+        self.responses = list(responses)
+        self.calls = 0
+        self.cancelled = 0
+        self.bodies: List[dict] = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.bodies.append(json.loads(request.content))
+        fn = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        try:
+            out = fn()
+            return await out if asyncio.iscoroutine(out) else out
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def _hang(seconds: float = 10.0):
+    async def _wait():
+        await asyncio.sleep(seconds)
+        return _ok("늦은 응답")
+    return _wait
+
+
+@pytest.fixture
+def make_client():
+    clients: List[AsyncLLMClient] = []
+    transports = {}   # 같은 stub 이면 같은 transport → 같은 공용 풀
+
+    def _make(stub: Stub, **kwargs) -> AsyncLLMClient:
+        opts = dict(model="stub", base_url="http://stub/v1", api_key="x", backoff_base=0.01, timeout=5.0)
+        opts.update(kwargs)
+        transport = transports.setdefault(id(stub), httpx.MockTransport(stub))
+        client = AsyncLLMClient(transport=transport, **opts)
+        clients.append(client)
+        return client
+
+    yield _make
+    for c in clients:
+        c.close()
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_retryable_status(make_client, status):
+    stub = Stub(lambda: httpx.Response(status, headers={"retry-after": "0"}), _ok)
+    resp = make_client(stub).invoke("hi")
+    assert resp.content == "안녕하세요"
+    assert stub.calls == 2
+    assert resp.usage_metadata == {"input_tokens": 3, "output_tokens": 2, "total_tokens": 5}
+
+
+def test_retries_transport_error(make_client):
+    def _refuse():
+        raise httpx.ConnectError("refused")
+    stub = Stub(_refuse, _ok)
+    assert make_client(stub).invoke("hi").content == "안녕하세요"
+    assert stub.calls == 2
+
+
+def test_gives_up_after_max_retries(make_client):
+    stub = Stub(lambda: httpx.Response(503))
+    with pytest.raises(LLMRequestError, match="재시도 2회"):
+        make_client(stub, max_retries=2).invoke("hi")
+    assert stub.calls == 3
+
+
+def test_non_retryable_status_fails_fast(make_client):
+    stub = Stub(lambda: httpx.Response(400, json={"error": "bad request"}))
+    with pytest.raises(LLMRequestError, match="HTTP 400"):
+        make_client(stub).invoke("hi")
+    assert stub.calls == 1
+
+
+def test_deadline_bounds_whole_call(make_client):
+    stub = Stub(_hang())
+    t0 = time.perf_counter()
+    with pytest.raises(LLMRequestError, match="마감 시간"):
+        make_client(stub).invoke("hi", deadline=0.3)
+    assert time.perf_counter() - t0 < 1.0
+
+
+def test_deadline_includes_retry_backoff(make_client):
+    stub = Stub(lambda: httpx.Response(429, headers={"retry-after": "5"}))
+    t0 = time.perf_counter()
+    with pytest.raises(LLMRequestError, match="마감 시간"):
+        make_client(stub, timeout=0.3).invoke("hi")
+    assert time.perf_counter() - t0 < 1.0
+    assert stub.calls == 1
+
+
+def test_hedge_uses_faster_request_and_cancels_slow_one(make_client):
+    stub = Stub(_hang(), _ok)
+    client = make_client(stub, hedge=True, hedge_min_delay=0.05)
+    for _ in range(client.latency.min_samples):
+        client.latency.add(0.05)
+
+    t0 = time.perf_counter()
+    resp = client.invoke("hi")
+    assert time.perf_counter() - t0 < 1.0
+    assert resp.hedged and resp.content == "안녕하세요"
+    assert stub.calls == 2 and stub.bodies[0] == stub.bodies[1]
+    # 느린 첫 요청은 취소됨 (루프 스레드에서 처리되므로 잠깐 대기)
+    for _ in range(50):
+        if stub.cancelled:
+            break
+        time.sleep(0.01)
+    assert stub.cancelled == 1
+
+
+def test_no_hedge_without_latency_history(make_client):
+    stub = Stub(_ok)
+    resp = make_client(stub, hedge=True, hedge_min_delay=0.01).invoke("hi")
+    assert not resp.hedged and stub.calls == 1
+
+
+def test_clients_for_different_models_share_pool_and_concurrency(make_client):
+    async def _slow():
+        await asyncio.sleep(0.2)
+        return _ok()
+
+    stub = Stub(_slow)
+    fast = make_client(stub, model="fast-model", max_concurrency=1)
+    strong = make_client(stub, model="strong-model", max_concurrency=1)
+    assert fast._pool is strong._pool
+
+    t0 = time.perf_counter()
+    futs = [fast.ainvoke("a"), strong.ainvoke("b")]
+
+    async def _both():
+        return await asyncio.gather(*futs)
+
+    asyncio.run(_both())
+    # 동시성 한도 1 을 두 모델이 함께 쓰므로 순서대로 실행
+    assert time.perf_counter() - t0 >= 0.4
+    assert sorted(b["model"] for b in stub.bodies) == ["fast-model", "strong-model"]
+
+
+def test_model_per_request_and_pool_closed_by_last_client(make_client):
+    stub = Stub(_ok)
+    a = make_client(stub, model="m1")
+    b = make_client(stub, model="m2")
+    a.invoke("hi", model="override")
+    assert stub.bodies[-1]["model"] == "override"
+
+    key = a._pool_key
+    a.close()
+    assert key in _POOLS and b.invoke("hi").content == "안녕하세요"
+    b.close()
+    assert key not in _POOLS
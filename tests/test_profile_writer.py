@@ -0,0 +1,105 @@
+import fcntl
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+
+from profile_writer import WRITE_LOCK, WRITE_RETRIES, ProfileWriter, state_doc_id
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.upserts = 0
+
+    def get(self, ids: List[str], include: List[str]) -> Dict[str, Any]:
+        hit = [i for i in ids if i in self.docs]
+        return {"ids": hit, "metadatas": [dict(self.docs[i]) for i in hit]}
+
+    def upsert(self, ids, embeddings, documents, metadatas) -> None:
+        self.upserts += 1
+        for i, md in zip(ids, metadatas):
+            self.docs[i] = dict(md)
+
+
+class FakeEmbeddings:
+    def __init__(self, on_embed: Optional[Callable[[], None]] = None):
+        self.on_embed = on_embed
+        self.calls = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.on_embed:
+            self.on_embed()
+        return [[0.0] for _ in texts]
+
+
+@pytest.fixture
+def make_writer(tmp_path):
+    writers: List[ProfileWriter] = []
+
+    def _make(collection: FakeCollection, embeddings: FakeEmbeddings) -> ProfileWriter:
+        w = ProfileWriter(lambda: (collection, embeddings), str(tmp_path / "journal"), flush_interval=3600)
+        writers.append(w)
+        return w
+
+    yield _make
+    for w in writers:
+        w.close()
+
+
+def _lock_is_free(journal_dir) -> bool:
+    with open(journal_dir / WRITE_LOCK, "a") as lf:
+        try:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+        return True
+
+
+def test_embedding_runs_outside_write_lock(make_writer, tmp_path):
+    seen = []
+    col = FakeCollection()
+    writer = make_writer(col, FakeEmbeddings(lambda: seen.append(_lock_is_free(tmp_path / "journal"))))
+    writer.update("u1", {"base": "안정형"}, {"sessions": 1})
+    assert writer.flush() == 1
+    assert seen == [True]
+    assert col.docs[state_doc_id("u1")]["sessions"] == 1
+
+
+def test_concurrent_write_during_embedding_is_merged(make_writer):
+    col = FakeCollection()
+    doc_id = state_doc_id("u1")
+
+    def other_worker_writes():
+        # 첫 임베딩 도중 다른 워커가 같은 문서를 갱신
+        if "sessions" not in col.docs.get(doc_id, {}):
+            col.docs[doc_id] = {"sessions": 5, "applied_eids": "[\"other\"]"}
+
+    emb = FakeEmbeddings(other_worker_writes)
+    writer = make_writer(col, emb)
+    writer.update("u1", incr={"sessions": 1})
+    assert writer.flush() == 1
+    assert emb.calls == 2 and col.upserts == 1
+    assert col.docs[doc_id]["sessions"] == 6
+
+
+def test_gives_up_after_retries_and_keeps_batch(make_writer):
+    col = FakeCollection()
+    doc_id = state_doc_id("u1")
+    counter = {"n": 0}
+
+    def always_conflict():
+        counter["n"] += 1
+        col.docs[doc_id] = {"sessions": counter["n"]}
+
+    writer = make_writer(col, FakeEmbeddings(always_conflict))
+    writer.update("u1", incr={"sessions": 1})
+    assert writer.flush() == 0
+    assert counter["n"] == WRITE_RETRIES and col.upserts == 0
+    assert writer.metrics()["errors"] == 1
+
+    # 충돌이 끝나면 다음 flush 에서 기록 (배치는 버퍼에 남아 있음)
+    writer._target = (col, FakeEmbeddings())
+    assert writer.flush() == 1
+    assert col.docs[doc_id]["sessions"] == WRITE_RETRIES + 1
@@ -0,0 +1,86 @@
+import fcntl
+import time
+from pathlib import Path
+
+import numpy as np
+
+import result_log
+from result_log import LOCK_FILE, ResultLog, compact, scan
+
+
+def _turn(i: int) -> dict:
+    return {"sid": "s", "turn": i, "risk_mode": 0, "level": -1, "latency_ms": 1.0, "input_tokens": 1, "output_tokens": 1}
+
+
+def _wait_for(cond, timeout: float = 5.0) -> bool:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_append_only_buffers_and_background_thread_writes(tmp_path, monkeypatch):
+    writes = []
+    orig = result_log._write_chunk
+
+    def _spy(*args, **kwargs):
+        writes.append(time.monotonic())
+        return orig(*args, **kwargs)
+
+    monkeypatch.setattr(result_log, "_write_chunk", _spy)
+    log = ResultLog(str(tmp_path), flush_rows=3, flush_interval=60, compact_interval=0)
+    for i in range(3):
+        log.append("turn", _turn(i))
+    # flush_rows 가 차면 백그라운드 스레드가 기록
+    assert _wait_for(lambda: len(scan(str(tmp_path), "turn")["turn"]) == 3)
+    assert len(writes) == 1
+    log.close()
+
+
+def test_write_failure_keeps_rows_and_leaves_no_tmp_dirs(tmp_path, monkeypatch):
+    log = ResultLog(str(tmp_path), flush_rows=1000, flush_interval=60, compact_interval=0)
+    log.append("turn", _turn(0))
+
+    def _fail(path, arr):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "save", _fail)
+    assert not log._flush_quietly()
+    assert not any(p.name.endswith(".tmp") for p in (tmp_path / "turn").iterdir())
+
+    monkeypatch.undo()
+    log.append("turn", _turn(1))
+    log.flush()
+    assert scan(str(tmp_path), "turn")["turn"].tolist() == [0, 1]
+    log.close()
+
+
+def test_compact_merges_and_skips_when_locked(tmp_path):
+    log = ResultLog(str(tmp_path), flush_rows=1000, flush_interval=60, compact_interval=0)
+    for i in range(3):
+        log.append("turn", _turn(i))
+        log.flush()
+    table_dir = Path(tmp_path) / "turn"
+    assert len([p for p in table_dir.iterdir() if p.is_dir()]) == 3
+
+    with open(table_dir / LOCK_FILE, "a") as lf:
+        fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+        assert compact(str(tmp_path), "turn", blocking=False) == 0
+
+    assert compact(str(tmp_path), "turn") == 3
+    assert len([p for p in table_dir.iterdir() if p.is_dir()]) == 1
+    assert sorted(scan(str(tmp_path), "turn")["turn"].tolist()) == [0, 1, 2]
+    log.close()
+
+
+def test_flush_loop_compacts_periodically(tmp_path):
+    log = ResultLog(str(tmp_path), flush_rows=1, flush_interval=0.05, compact_interval=0.2)
+    for i in range(4):
+        log.append("turn", _turn(i))
+        time.sleep(0.06)
+    table_dir = Path(tmp_path) / "turn"
+    assert _wait_for(lambda: len([p for p in table_dir.iterdir() if p.is_dir()]) == 1)
+    assert sorted(scan(str(tmp_path), "turn")["turn"].tolist()) == [0, 1, 2, 3]
+    log.close()
@@ -0,0 +1,173 @@
+import sqlite3
+import threading
+import time
+from typing import List
+
+import pytest
+
+from scheduler import (
+    PRIORITY_NORMAL, PRIORITY_RISK, SHARED_BUCKET_RETRY_SEC,
+    FairScheduler, SchedulerTimeout, SharedTokenBucket, TokenBucket,
+)
+
+
+class FakeClock:
+    def __init__(self, t: float = 1000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+    def advance(self, sec: float) -> None:
+        self.t += sec
+
+
+def _wait_for(cond, timeout: float = 5.0) -> None:
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.005)
+
+
+def _depth(sched: FairScheduler) -> int:
+    return sum(sched.metrics()["queue_depth"].values())
+
+
+class _Waiters:
+    """acquire 를 스레드에서 하나씩 순서대로 큐에 넣고, 슬롯을 받은 순서를 기록"""
+
+    def __init__(self, sched: FairScheduler):
+        self.sched = sched
+        self.granted: List[str] = []
+        self.errors: List[BaseException] = []
+        self.threads: List[threading.Thread] = []
+
+    def add(self, label: str, session_id: str, priority: int = PRIORITY_NORMAL, timeout=None) -> None:
+        before = _depth(self.sched)
+
+        def _run():
+            try:
+                self.sched.acquire(session_id, priority, timeout)
+                self.granted.append(label)
+            except BaseException as e:
+                self.errors.append(e)
+
+        t = threading.Thread(target=_run, daemon=True)
+        t.start()
+        self.threads.append(t)
+        _wait_for(lambda: _depth(self.sched) == before + 1 or label in self.granted)
+
+    def release_next(self) -> str:
+        n = len(self.granted)
+        self.sched.release()
+        _wait_for(lambda: len(self.granted) == n + 1)
+        return self.granted[-1]
+
+
+# -----------------------------
+# 토큰 버킷
+# -----------------------------
+def test_token_bucket_refills_with_clock():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    assert bucket.try_take() == 0 and bucket.try_take() == 0
+    assert bucket.try_take() == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert bucket.try_take() == 0
+    clock.advance(10)                     # capacity 이상은 쌓이지 않음
+    assert bucket.try_take() == 0 and bucket.try_take() == 0
+    assert bucket.try_take() > 0
+
+
+def test_token_bucket_disabled_when_rate_zero():
+    bucket = TokenBucket(rate=0)
+    assert all(bucket.try_take() == 0 for _ in range(100))
+
+
+def test_shared_bucket_busy_returns_retry_instead_of_blocking(tmp_path):
+    path = str(tmp_path / "bucket.db")
+    bucket = SharedTokenBucket(path, "llm", rate=5)
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        t0 = time.perf_counter()
+        assert bucket.try_take() == SHARED_BUCKET_RETRY_SEC
+        assert time.perf_counter() - t0 < 1.0
+        assert bucket.busy == 1
+    finally:
+        holder.execute("ROLLBACK")
+    assert bucket.try_take() == 0
+
+
+# -----------------------------
+# 공정 큐
+# -----------------------------
+def test_round_robin_between_sessions():
+    sched = FairScheduler("t", max_concurrency=1)
+    sched.acquire("holder", PRIORITY_NORMAL)
+    w = _Waiters(sched)
+    for label in ("a1", "a2", "a3"):
+        w.add(label, "A")
+    w.add("b1", "B")
+    w.add("c1", "C")
+
+    order = [w.release_next() for _ in range(5)]
+    assert order == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_risk_priority_goes_first():
+    sched = FairScheduler("t", max_concurrency=1)
+    sched.acquire("holder", PRIORITY_NORMAL)
+    w = _Waiters(sched)
+    w.add("n1", "A")
+    w.add("n2", "B")
+    w.add("r1", "C", PRIORITY_RISK)
+    assert sched.metrics()["queue_depth"] == {"risk": 1, "normal": 2}
+
+    assert [w.release_next() for _ in range(3)] == ["r1", "n1", "n2"]
+
+
+def test_timeout_removes_ticket_and_counts():
+    clock = FakeClock()
+    sched = FairScheduler("t", max_concurrency=1, clock=clock)
+    sched.acquire("holder", PRIORITY_NORMAL)
+    with pytest.raises(SchedulerTimeout):
+        sched.acquire("A", PRIORITY_NORMAL, timeout=0.05)
+    m = sched.metrics()
+    assert m["timeouts"] == 1 and m["waiting_sessions"] == 0 and _depth(sched) == 0
+
+    # 빈 큐에서 release 해도 다른 요청에 슬롯이 넘어가지 않음
+    sched.release()
+    assert sched.metrics()["in_flight"] == 0
+
+
+def test_wait_accounting_uses_clock():
+    clock = FakeClock()
+    sched = FairScheduler("t", max_concurrency=1, clock=clock)
+    sched.acquire("holder", PRIORITY_NORMAL)
+    w = _Waiters(sched)
+    w.add("a", "A")
+    clock.advance(2.0)
+    w.release_next()
+    m = sched.metrics()
+    assert m["dispatched"] == 2 and m["avg_wait_ms"] == pytest.approx(1000.0)
+
+
+def test_rate_limit_holds_no_slot_and_redispatches_on_timer():
+    clock = FakeClock()
+    sched = FairScheduler("t", max_concurrency=4, bucket=TokenBucket(rate=1, capacity=1, clock=clock), clock=clock)
+    sched.acquire("A", PRIORITY_NORMAL)
+    w = _Waiters(sched)
+    w.add("n", "B")
+    w.add("r", "C", PRIORITY_RISK)
+
+    m = sched.metrics()
+    assert m["in_flight"] == 1 and m["throttled"] >= 1   # 토큰이 없으면 슬롯도 주지 않음
+    clock.advance(1.0)
+    sched._on_timer()
+    _wait_for(lambda: w.granted)
+    assert w.granted == ["r"]                            # 토큰이 차면 우선순위 순서로
+    clock.advance(1.0)
+    sched._on_timer()
+    _wait_for(lambda: len(w.granted) == 2)
+    assert w.granted == ["r", "n"]
@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+
+from shared_index import MANIFEST_FILE, SQNORMS_FILE, VECTORS_FILE, MmapStrings, MmapVectorStore, _save_strings
+
+
+def _write_index(path, ids, documents, metadatas, vectors):
+    path.mkdir()
+    np.save(path / VECTORS_FILE, vectors)
+    np.save(path / SQNORMS_FILE, np.einsum("ij,ij->i", vectors, vectors))
+    _save_strings(path, "ids", ids)
+    _save_strings(path, "documents", documents)
+    _save_strings(path, "metadatas", [json.dumps(md, ensure_ascii=False) for md in metadatas])
+    with open(path / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump({"count": len(ids), "dim": vectors.shape[1]}, f)
+
+
+def test_strings_round_trip_without_heap_copy(tmp_path):
+    values = ["", "안녕하세요 🐈‍⬛", "plain", "줄\n바꿈"]
+    _save_strings(tmp_path, "documents", values)
+    s = MmapStrings(tmp_path, "documents")
+    assert isinstance(s.blob, np.memmap) and isinstance(s.offsets, np.memmap)
+    assert list(s) == values and s[-1] == values[-1] and s[1:3] == values[1:3]
+
+
+def test_store_search_and_filter_from_mmapped_text(tmp_path):
+    vectors = np.eye(3, 4, dtype=np.float32)
+    metadatas = [{"doc_type": "playbook", "n": 1}, {"doc_type": "risk"}, {"doc_type": "playbook", "n": 3}]
+    _write_index(tmp_path / "col", ["a", "b", "c"], ["문서 A", "문서 B", "문서 C"], metadatas, vectors)
+
+    store = MmapVectorStore(str(tmp_path / "col"))
+    assert isinstance(store.documents, MmapStrings)
+    hits = store.similarity_search_by_vector_with_score(vectors[2], k=2, filter={"doc_type": "playbook"})
+    assert [d.id for d, _ in hits] == ["c", "a"]
+    assert hits[0][0].page_content == "문서 C" and hits[0][0].metadata == metadatas[2]
+    assert store.get(ids=["b"])["metadatas"] == [metadatas[1]]
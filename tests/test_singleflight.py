@@ -0,0 +1,162 @@
+import threading
+from typing import Any, List, Tuple
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from singleflight import SingleFlight, SingleFlightEmbeddings, SingleFlightLLM
+
+
+def _run_concurrently(n: int, target) -> List[Tuple[str, Any]]:
+    """n 개 스레드에서 target() → [("ok", 값) 또는 ("err", 예외)]"""
+    out: List[Tuple[str, Any]] = []
+    lock = threading.Lock()
+
+    def _one():
+        try:
+            r = ("ok", target())
+        except BaseException as e:  # 테스트에서 KeyboardInterrupt 도 결과로 모음
+            r = ("err", e)
+        with lock:
+            out.append(r)
+
+    threads = [threading.Thread(target=_one) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(out) == n
+    return out
+
+
+def _gated(group: SingleFlight, result_fn, followers: int):
+    """리더가 fn 안에서 followers 명이 합류할 때까지 기다린 뒤 result_fn() 실행"""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        for _ in range(500):
+            if group.metrics()["shared"] >= followers:
+                break
+            threading.Event().wait(0.01)
+        return result_fn()
+
+    return fn, calls
+
+
+def test_followers_share_leader_result():
+    group = SingleFlight("t")
+    fn, calls = _gated(group, lambda: object(), followers=7)
+    results = _run_concurrently(8, lambda: group.do("k", fn))
+
+    assert len(calls) == 1
+    values = {id(v[0]) for _, v in results}
+    assert len(values) == 1
+    assert sorted(v[1] for _, v in results) == [False] + [True] * 7
+    assert group.metrics() == {"name": "t", "calls": 8, "executed": 1, "shared": 7, "in_flight": 0}
+
+
+def test_leader_exception_propagates_to_followers():
+    group = SingleFlight("t")
+
+    def boom():
+        raise ValueError("upstream 500")
+
+    fn, calls = _gated(group, boom, followers=3)
+    results = _run_concurrently(4, lambda: group.do("k", fn))
+
+    assert len(calls) == 1
+    assert all(kind == "err" and isinstance(e, ValueError) for kind, e in results)
+
+
+def test_base_exception_is_not_shared():
+    group = SingleFlight("t")
+    state = {"first": True}
+
+    def interrupted_once():
+        if state.pop("first", False):
+            raise KeyboardInterrupt
+        return "retried"
+
+    fn, calls = _gated(group, interrupted_once, followers=2)
+    results = _run_concurrently(3, lambda: group.do("k", fn))
+
+    # 인터럽트는 리더 스레드에서만, 기다리던 쪽은 각자 다시 실행
+    errors = [e for kind, e in results if kind == "err"]
+    assert len(errors) == 1 and isinstance(errors[0], KeyboardInterrupt)
+    assert sorted(v for kind, v in results if kind == "ok") == [("retried", False)] * 2
+    assert len(calls) == 3
+
+
+def test_key_released_after_call():
+    group = SingleFlight("t")
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert group.do("k", fn) == (1, False)
+    assert group.do("k", fn) == (2, False)   # 결과를 캐시하지 않음
+    assert group.metrics()["in_flight"] == 0
+
+    def boom():
+        raise RuntimeError("x")
+
+    with pytest.raises(RuntimeError):
+        group.do("e", boom)
+    assert group.do("e", lambda: "ok") == ("ok", False)
+
+
+class _FakeLLM:
+    def __init__(self, group: SingleFlight, followers: int):
+        self.group = group
+        self.followers = followers
+        self.calls = 0
+
+    def invoke(self, prompt, *args, **kwargs):
+        self.calls += 1
+        for _ in range(500):
+            if self.group.metrics()["shared"] >= self.followers:
+                break
+            threading.Event().wait(0.01)
+        return AIMessage(content="답변", usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+
+
+def test_llm_shared_copies_have_no_usage():
+    group = SingleFlight("llm")
+    inner = _FakeLLM(group, followers=3)
+    llm = SingleFlightLLM(inner, group)
+    results = _run_concurrently(4, lambda: llm.invoke("같은 질문"))
+
+    assert inner.calls == 1
+    msgs = [m for _, m in results]
+    assert all(m.content == "답변" for m in msgs)
+    with_usage = [m for m in msgs if m.usage_metadata]
+    assert len(with_usage) == 1 and with_usage[0].usage_metadata["input_tokens"] == 10
+
+
+def test_llm_with_extra_args_bypasses_group():
+    group = SingleFlight("llm")
+    inner = _FakeLLM(group, followers=0)
+    llm = SingleFlightLLM(inner, group)
+    llm.invoke("q", stop=["\n"])
+    assert group.metrics()["calls"] == 0 and inner.calls == 1
+
+
+def test_embeddings_key_by_text():
+    class _Emb:
+        calls = 0
+
+        def embed_query(self, text):
+            _Emb.calls += 1
+            return [float(len(text))]
+
+        def embed_documents(self, texts):
+            _Emb.calls += 1
+            return [[float(len(t))] for t in texts]
+
+    emb = SingleFlightEmbeddings(_Emb(), SingleFlight("emb"))
+    assert emb.embed_query("abc") == [3.0]
+    assert emb.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+    assert _Emb.calls == 2
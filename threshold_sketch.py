@@ -0,0 +1,275 @@
+import argparse
+import fcntl
+import glob
+import json
+import math
+import os
+import random
+import re
+import socket
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from survey import CUT, GRAY
+
+
+# =========================================================
+# 설문 점수 분포 스트리밍 집계 (KLL 분위수 스케치)
+# - 척도별(자기/타인 모형 %, 표현, 효능감) 고정 메모리 스케치를 설문 완료마다 갱신
+# - 워커(프로세스)마다 자기 파일에만 저장 → 리포트 시 전부 merge
+#   파일 이름에 실행마다 새 run id 를 붙임 → pid 가 재사용돼도 이전 워커 파일을 덮어쓰지 않음
+# - compact: 이 호스트에서 pid 가 죽은 워커 파일만 archive 로 합침
+#   (살아 있는 워커는 메모리에 누적 스케치를 갖고 있어 다음 기록 때 파일을 다시 씀 → 합치면 이중 집계)
+# - 리포트: 현재 CUT/GRAY 기준 분포 + 재보정 제안값
+# =========================================================
+PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_SKETCH_DIR = PROJECT_ROOT / "stats" / "sketches"
+
+SCALES = ("self_model", "other_model", "expression", "efficacy")
+REPORT_QUANTILES = (0.05, 0.10, 0.25, 0.50, 0.75, 0.90, 0.95)
+GRAY_TARGET_SHARE = 0.20   # 제안 GRAY: 제안 CUT ± GRAY 안에 전체의 20%가 들어가도록
+
+ARCHIVE_FILE = "sketch-archive.json"
+LOCK_FILE = ".compact.lock"
+
+_WORKER_RE = re.compile(r"^sketch-(?P<host>.+)-(?P<pid>\d+)(?:-(?P<run>[0-9a-f]+))?\.json$")
+
+
+class KLLSketch:
+    """KLL 분위수 스케치: 항목 수와 무관하게 O(k) 메모리, merge 가능"""
+
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: Optional[int] = None):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.compactors: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.compactors) - h - 1
+        return max(2, int(math.ceil(self.k * (self.c ** depth))))
+
+    def _compress(self) -> None:
+        while sum(len(c) for c in self.compactors) >= sum(self._capacity(h) for h in range(len(self.compactors))):
+            for h in range(len(self.compactors)):
+                items = self.compactors[h]
+                if len(items) < self._capacity(h):
+                    continue
+                if h + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items.sort()
+                keep = items[-1:] if len(items) % 2 else []
+                even = items[: len(items) - len(keep)]
+                # 짝/홀 위치 중 하나만 남기고 가중치를 2배로 (상위 층으로 이동)
+                self.compactors[h + 1].extend(even[self._rng.randint(0, 1)::2])
+                self.compactors[h] = keep
+                break
+
+    def update(self, x: float) -> None:
+        x = float(x)
+        self.n += 1
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+        self.compactors[0].append(x)
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for h, items in enumerate(other.compactors):
+            self.compactors[h].extend(items)
+        self.n += other.n
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+
+    def _weighted(self) -> List[Tuple[float, int]]:
+        return sorted((x, 2 ** h) for h, items in enumerate(self.compactors) for x in items)
+
+    def quantile(self, q: float) -> Optional[float]:
+        pairs = self._weighted()
+        if not pairs:
+            return None
+        total = sum(w for _, w in pairs)
+        target = q * total
+        acc = 0
+        for x, w in pairs:
+            acc += w
+            if acc >= target:
+                return x
+        return pairs[-1][0]
+
+    def rank(self, x: float) -> float:
+        """x 미만 비율 (0~1)"""
+        pairs = self._weighted()
+        total = sum(w for _, w in pairs)
+        return (sum(w for v, w in pairs if v < x) / total) if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "c": self.c, "n": self.n, "min": self.min, "max": self.max, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "KLLSketch":
+        sk = cls(k=d.get("k", 200), c=d.get("c", 2 / 3))
+        sk.n = d.get("n", 0)
+        sk.min = d.get("min")
+        sk.max = d.get("max")
+        sk.compactors = [list(map(float, c)) for c in d.get("compactors") or [[]]]
+        return sk
+
+
+class ScaleSketches:
+    def __init__(self, k: int = 200):
+        self.sketches: Dict[str, KLLSketch] = {s: KLLSketch(k=k) for s in SCALES}
+
+    def record(self, scores: Dict[str, Any]) -> None:
+        for s in SCALES:
+            if scores.get(s) is not None:
+                self.sketches[s].update(scores[s])
+
+    def merge(self, other: "ScaleSketches") -> None:
+        for s in SCALES:
+            self.sketches[s].merge(other.sketches[s])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {s: sk.to_dict() for s, sk in self.sketches.items()}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ScaleSketches":
+        out = cls()
+        for s in SCALES:
+            if s in d:
+                out.sketches[s] = KLLSketch.from_dict(d[s])
+        return out
+
+
+def _atomic_write_json(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class SketchStore:
+    """프로세스별 스케치 파일 (sketch-<host>-<pid>-<run>.json) 에 설문 완료마다 저장"""
+
+    def __init__(self, sketch_dir: str):
+        self.dir = Path(sketch_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.dir / f"sketch-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+        self.sketches = ScaleSketches()
+        self._lock = threading.Lock()
+
+    def record(self, scores: Dict[str, Any]) -> None:
+        with self._lock:
+            self.sketches.record(scores)
+            _atomic_write_json(self.path, self.sketches.to_dict())
+
+
+def load_merged(sketch_dir: str) -> ScaleSketches:
+    merged = ScaleSketches()
+    for p in sorted(glob.glob(os.path.join(sketch_dir, "sketch-*.json"))):
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                merged.merge(ScaleSketches.from_dict(json.load(f)))
+        except (OSError, ValueError):
+            continue  # 쓰는 중이거나 깨진 파일은 건너뜀
+    return merged
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _finished_workers(sketch_dir: str) -> List[str]:
+    """이 호스트에서 종료된 워커의 스케치 파일 (다른 호스트 파일은 그 호스트에서 compact)"""
+    host = socket.gethostname()
+    out = []
+    for p in sorted(glob.glob(os.path.join(sketch_dir, "sketch-*.json"))):
+        m = _WORKER_RE.match(Path(p).name)
+        if not m or Path(p).name == ARCHIVE_FILE or m.group("host") != host:
+            continue
+        if not _pid_alive(int(m.group("pid"))):
+            out.append(p)
+    return out
+
+
+def compact(sketch_dir: str) -> int:
+    """종료된 워커 파일들을 archive 1개로 합치고 삭제 (동시 실행은 lock 파일로 직렬화)"""
+    archive = Path(sketch_dir) / ARCHIVE_FILE
+    with open(Path(sketch_dir) / LOCK_FILE, "a") as lf:
+        fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+        merged = ScaleSketches()
+        if archive.is_file():
+            with open(archive, "r", encoding="utf-8") as f:
+                merged.merge(ScaleSketches.from_dict(json.load(f)))
+
+        done = _finished_workers(sketch_dir)
+        for p in done:
+            with open(p, "r", encoding="utf-8") as f:
+                merged.merge(ScaleSketches.from_dict(json.load(f)))
+        if done:
+            _atomic_write_json(archive, merged.to_dict())
+            for p in done:
+                os.remove(p)
+    return len(done)
+
+
+# =========================================================
+# 재보정 리포트
+# =========================================================
+def recalibration_report(sk: ScaleSketches) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"current": {"CUT": CUT, "GRAY": GRAY}, "scales": {}}
+    for s in SCALES:
+        k = sk.sketches[s]
+        if not k.n:
+            report["scales"][s] = {"n": 0}
+            continue
+        entry: Dict[str, Any] = {
+            "n": k.n,
+            "min": k.min,
+            "max": k.max,
+            "quantiles": {f"p{int(q * 100)}": round(k.quantile(q), 3) for q in REPORT_QUANTILES},
+        }
+        if s in ("self_model", "other_model"):
+            # base_type 은 50% 기준
+            entry["share_high"] = round(1 - k.rank(50), 3)
+        else:
+            entry["share_high"] = round(1 - k.rank(CUT), 3)
+            entry["share_in_gray"] = round(k.rank(CUT + GRAY) - k.rank(CUT - GRAY), 3)
+            lo = k.quantile(0.5 - GRAY_TARGET_SHARE / 2)
+            hi = k.quantile(0.5 + GRAY_TARGET_SHARE / 2)
+            entry["suggested_CUT"] = round(k.quantile(0.5), 3)
+            entry["suggested_GRAY"] = round((hi - lo) / 2, 3)
+        report["scales"][s] = entry
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="설문 점수 분위수 스케치 리포트/정리")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rp = sub.add_parser("report")
+    rp.add_argument("--dir", default=str(DEFAULT_SKETCH_DIR))
+    cp = sub.add_parser("compact")
+    cp.add_argument("--dir", default=str(DEFAULT_SKETCH_DIR))
+    args = ap.parse_args(argv)
+
+    if args.cmd == "report":
+        print(json.dumps(recalibration_report(load_merged(args.dir)), ensure_ascii=False, indent=2))
+    elif args.cmd == "compact":
+        print(f"[compact] {compact(args.dir)} files → {ARCHIVE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# =========================================================
+# 서버 시작 시 warm-up + readiness 신호
+# - 프로세스당 1번, 백그라운드 스레드에서 무거운 리소스를 미리 로드
+#   (Chroma 클라이언트, LLM 클라이언트, persona_rules, risk step 인덱스, 폰트, 선택: 첫 임베딩 왕복)
+# - 진행 상태는 warmup_status(), 완료 여부는 is_ready()/wait_ready()
+# - READY_FILE 을 지정하면 완료 시 파일을 써서 배포 readiness probe 가 확인 가능
+#   (python warmup.py --check <READY_FILE>)
+# =========================================================
+WarmupTask = Tuple[str, Callable[[], Any]]
+
+
+class WarmupState:
+    def __init__(self, task_names: List[str]):
+        self.tasks: Dict[str, Dict[str, Any]] = {name: {"status": "pending"} for name in task_names}
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+        self.ready = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "finished": self.done.is_set(),
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "tasks": {k: dict(v) for k, v in self.tasks.items()},
+        }
+
+
+_STATE: Optional[WarmupState] = None
+_LOCK = threading.Lock()
+
+
+def _write_ready_file(path: str, state: WarmupState) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state.snapshot(), f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _run(state: WarmupState, tasks: List[WarmupTask], ready_file: Optional[str]) -> None:
+    ok = True
+    for name, fn in tasks:
+        info = state.tasks[name]
+        info["status"] = "running"
+        t0 = time.perf_counter()
+        try:
+            fn()
+            info["status"] = "done"
+        except Exception as e:
+            ok = False
+            info["status"] = "failed"
+            info["error"] = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        info["seconds"] = round(time.perf_counter() - t0, 3)
+
+    state.ready = ok
+    state.finished_at = time.time()
+    if ready_file and ok:
+        _write_ready_file(ready_file, state)
+    state.done.set()
+
+
+def start_warmup(tasks: List[WarmupTask], ready_file: Optional[str] = None) -> WarmupState:
+    """프로세스당 최초 1회만 실행 (이후 호출은 기존 상태를 반환)"""
+    global _STATE
+    with _LOCK:
+        if _STATE is None:
+            _STATE = WarmupState([name for name, _ in tasks])
+            threading.Thread(target=_run, args=(_STATE, tasks, ready_file), name="warmup", daemon=True).start()
+        return _STATE
+
+
+def warmup_status() -> Dict[str, Any]:
+    return _STATE.snapshot() if _STATE is not None else {"ready": False, "finished": False, "tasks": {}}
+
+
+def is_ready() -> bool:
+    return _STATE is not None and _STATE.ready
+
+
+def wait_ready(timeout: Optional[float] = None) -> bool:
+    """warm-up 이 끝날 때까지 대기 (시작 전이면 바로 False)"""
+    if _STATE is None:
+        return False
+    _STATE.done.wait(timeout)
+    return _STATE.ready
+
+
+# =========================================================
+# CLI: readiness probe
+# =========================================================
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="warm-up readiness 확인")
+    ap.add_argument("--check", metavar="READY_FILE", required=True)
+    ap.add_argument("--max-age", type=float, default=None, help="이 초보다 오래된 ready 파일은 무시")
+    args = ap.parse_args(argv)
+
+    try:
+        with open(args.check, "r", encoding="utf-8") as f:
+            snap = json.load(f)
+    except (OSError, ValueError):
+        print("not ready")
+        return 1
+    if not snap.get("ready"):
+        print("not ready")
+        return 1
+    if args.max_age is not None and time.time() - (snap.get("finished_at") or 0) > args.max_age:
+        print("stale")
+        return 1
+    print(f"ready (pid={snap.get('pid')})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())